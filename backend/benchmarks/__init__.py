@@ -0,0 +1 @@
+"""Micro-benchmarks for Selecta hot paths."""
@@ -0,0 +1,314 @@
+"""In-memory stand-in for ``google.cloud.bigquery.Client`` used by benchmarks.
+
+The fake produces real ``bigquery.table.Row`` objects and ``SchemaField``
+schemas so the code under test follows the same paths it does against the
+live service, minus the network.
+"""
+
+import itertools
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from google.cloud import bigquery
+from google.cloud.bigquery.job import QueryPlanEntry
+from google.cloud.bigquery.table import Row
+
+COLUMN_TYPES = (
+    "INT64",
+    "FLOAT64",
+    "NUMERIC",
+    "STRING",
+    "BOOL",
+    "DATE",
+    "TIMESTAMP",
+    "BYTES",
+    "REPEATED",
+    "RECORD",
+)
+
+_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _value_factory(column_type: str, rng: random.Random) -> Callable[[int], Any]:
+    if column_type == "INT64":
+        return lambda i: rng.randint(0, 1_000_000)
+    if column_type == "FLOAT64":
+        return lambda i: rng.random() * 1000
+    if column_type == "NUMERIC":
+        return lambda i: Decimal(rng.randint(0, 10_000_000)) / Decimal(100)
+    if column_type == "STRING":
+        return lambda i: f"category_{i % 17}"
+    if column_type == "BOOL":
+        return lambda i: i % 2 == 0
+    if column_type == "DATE":
+        return lambda i: date(2024, 1, 1) + timedelta(days=i % 365)
+    if column_type == "TIMESTAMP":
+        return lambda i: _EPOCH + timedelta(minutes=i)
+    if column_type == "BYTES":
+        return lambda i: f"blob-{i}".encode("utf-8")
+    if column_type == "REPEATED":
+        return lambda i: [rng.randint(0, 100) for _ in range(3)]
+    if column_type == "RECORD":
+        return lambda i: {
+            "amount": Decimal(i) / Decimal(10),
+            "at": date(2024, 1, 1) + timedelta(days=i % 30),
+        }
+    raise ValueError(f"Unsupported synthetic column type: {column_type}")
+
+
+def _schema_field(name: str, column_type: str) -> bigquery.SchemaField:
+    if column_type == "REPEATED":
+        return bigquery.SchemaField(name, "INT64", mode="REPEATED")
+    if column_type == "RECORD":
+        return bigquery.SchemaField(
+            name,
+            "RECORD",
+            fields=(
+                bigquery.SchemaField("amount", "NUMERIC"),
+                bigquery.SchemaField("at", "DATE"),
+            ),
+        )
+    return bigquery.SchemaField(name, column_type)
+
+
+@dataclass
+class SyntheticTable:
+    """Deterministic synthetic result set with a BigQuery-shaped schema."""
+
+    schema: List[bigquery.SchemaField]
+    rows: List[Row]
+
+    @property
+    def columns(self) -> List[str]:
+        return [schema_field.name for schema_field in self.schema]
+
+    def as_dicts(self) -> List[Dict[str, Any]]:
+        return [dict(row.items()) for row in self.rows]
+
+
+def make_synthetic_table(
+    num_rows: int = 100,
+    column_types: Optional[Sequence[str]] = None,
+    width: Optional[int] = None,
+    seed: int = 7,
+) -> SyntheticTable:
+    """Build ``num_rows`` rows; ``width`` cycles through ``column_types``."""
+    rng = random.Random(seed)
+    types = list(column_types or COLUMN_TYPES)
+    if width is not None:
+        types = list(itertools.islice(itertools.cycle(types), width))
+
+    names = [f"{column_type.lower()}_{index}" for index, column_type in enumerate(types)]
+    factories = [_value_factory(column_type, rng) for column_type in types]
+    field_to_index = {name: index for index, name in enumerate(names)}
+    rows = [Row(tuple(factory(i) for factory in factories), field_to_index) for i in range(num_rows)]
+    schema = [_schema_field(name, column_type) for name, column_type in zip(names, types)]
+    return SyntheticTable(schema=schema, rows=rows)
+
+
+class FakeRowIterator(list):
+    """List of rows that also exposes the ``RowIterator`` attributes we read."""
+
+    def __init__(
+        self,
+        rows: Sequence[Row],
+        schema: Sequence[bigquery.SchemaField],
+        total_rows: Optional[int] = None,
+        next_page_token: Optional[str] = None,
+        job: Optional["FakeQueryJob"] = None,
+    ) -> None:
+        super().__init__(rows)
+        self.schema = list(schema)
+        self.total_rows = len(rows) if total_rows is None else total_rows
+        self.next_page_token = next_page_token
+        # Statistics ``query_and_wait`` exposes on its ``RowIterator``.
+        self.job_id = getattr(job, "job_id", None)
+        self.query_id = f"fake_query_{uuid.uuid4().hex[:12]}"
+        self.location = getattr(job, "location", None)
+        self.total_bytes_processed = getattr(job, "total_bytes_processed", None)
+        self.slot_millis = getattr(job, "slot_millis", None)
+        self.created = getattr(job, "created", None)
+        self.started = getattr(job, "started", None)
+        self.ended = getattr(job, "ended", None)
+
+
+def _synthetic_plan(started: datetime, run_ms: int, num_rows: int) -> List[QueryPlanEntry]:
+    start_ms = int(started.timestamp() * 1000)
+    split = run_ms * 3 // 4
+    stages = [
+        ("S00: Input", start_ms, start_ms + split, {"readMsAvg": split // 2, "readMsMax": split}),
+        ("S01: Output", start_ms + split, start_ms + run_ms, {"writeMsAvg": 1, "writeMsMax": 1}),
+    ]
+    return [
+        QueryPlanEntry.from_api_repr(
+            {
+                "name": name,
+                "id": str(index),
+                "status": "COMPLETE",
+                "startMs": str(begin),
+                "endMs": str(end),
+                "recordsRead": str(num_rows),
+                "recordsWritten": str(num_rows),
+                "waitMsAvg": "0",
+                "waitMsMax": "0",
+                "computeMsAvg": "0",
+                "computeMsMax": "0",
+                **{key: str(value) for key, value in timings.items()},
+            }
+        )
+        for index, (name, begin, end, timings) in enumerate(stages)
+    ]
+
+
+class FakeQueryJob:
+    def __init__(self, client: "FakeBigQueryClient", query: str, table: SyntheticTable) -> None:
+        self._client = client
+        self.query = query
+        self.job_id = f"fake_{uuid.uuid4().hex[:12]}"
+        self.location = client.location
+        self.destination = bigquery.TableReference.from_string(
+            f"{client.project}._anon.{self.job_id}"
+        )
+        self.state = "RUNNING"
+        self._table = table
+        self.created = datetime.now(timezone.utc)
+        self.started = self.created
+        self.ended: Optional[datetime] = None
+        self.cache_hit = False
+        self.total_bytes_processed = 64 * len(table.rows) * len(table.schema)
+        self.total_bytes_billed = max(10 * 1024 * 1024, self.total_bytes_processed)
+        self.slot_millis = 0
+        self.query_plan: List[QueryPlanEntry] = []
+        self.error_result: Optional[Dict[str, Any]] = None
+        self._error: Optional[Exception] = None
+
+    def result(self, *args: Any, **kwargs: Any) -> FakeRowIterator:
+        if self._client.wait_latency_s:
+            time.sleep(self._client.wait_latency_s)
+        if self._error is not None:
+            raise self._error
+        if self._client.wait_errors:
+            raise self._client.wait_errors.pop(0)
+        if self._client.job_errors:
+            self._error = self._client.job_errors.pop(0)
+            self.state = "DONE"
+            reasons = [error.get("reason") for error in getattr(self._error, "errors", []) or []]
+            self.error_result = {"reason": reasons[0] if reasons else "backendError", "message": str(self._error)}
+            raise self._error
+        if self.state != "DONE":
+            self.state = "DONE"
+            self.ended = datetime.now(timezone.utc)
+            run_ms = int((self.ended - self.started).total_seconds() * 1000)
+            self.slot_millis = run_ms * 2
+            self.query_plan = _synthetic_plan(self.started, run_ms, len(self._table.rows))
+        return FakeRowIterator(self._table.rows, self._table.schema, job=self)
+
+    @property
+    def schema(self) -> List[bigquery.SchemaField]:
+        return list(self._table.schema)
+
+
+@dataclass
+class FakeBigQueryClient:
+    """Drop-in for the subset of ``bigquery.Client`` used by Selecta.
+
+    ``submit_latency_s`` is spent in ``query()``; ``wait_latency_s`` in
+    ``QueryJob.result()``. ``table_for_sql`` can route SQL to different
+    synthetic tables; otherwise ``table`` is returned for every query.
+
+    Failures are injected in order: ``submit_errors`` are raised by
+    ``query()``, ``wait_errors`` by ``result()`` while the job keeps running
+    (a flaky poll), and ``job_errors`` by ``result()`` after marking the job
+    itself as failed.
+
+    ``query_and_wait`` follows the short query path when
+    ``default_job_creation_mode`` is ``JOB_CREATION_OPTIONAL``: results of up
+    to ``jobless_max_rows`` rows come back after ``wait_latency_s`` alone,
+    without a job (``jobless_queries`` counts them). Larger results, or any
+    other mode, go through ``query()`` and ``result()`` like a normal job.
+    """
+
+    table: SyntheticTable = field(default_factory=make_synthetic_table)
+    project: str = "fake-project"
+    location: str = "US"
+    submit_latency_s: float = 0.0
+    wait_latency_s: float = 0.0
+    table_for_sql: Optional[Callable[[str], SyntheticTable]] = None
+    queries: List[str] = field(default_factory=list)
+    jobs: Dict[str, FakeQueryJob] = field(default_factory=dict)
+    list_rows_calls: List[Dict[str, Any]] = field(default_factory=list)
+    submit_errors: List[Exception] = field(default_factory=list)
+    wait_errors: List[Exception] = field(default_factory=list)
+    job_errors: List[Exception] = field(default_factory=list)
+    get_job_calls: List[str] = field(default_factory=list)
+    default_job_creation_mode: Optional[str] = None
+    jobless_max_rows: Optional[int] = None
+    jobless_queries: List[str] = field(default_factory=list)
+
+    def query(self, query: str, job_config: Any = None, **kwargs: Any) -> FakeQueryJob:
+        self.queries.append(query)
+        if self.submit_latency_s:
+            time.sleep(self.submit_latency_s)
+        if self.submit_errors:
+            raise self.submit_errors.pop(0)
+        table = self.table_for_sql(query) if self.table_for_sql else self.table
+        job = FakeQueryJob(self, query, table)
+        self.jobs[job.job_id] = job
+        return job
+
+    def query_and_wait(self, query: str, job_config: Any = None, location: Optional[str] = None, **kwargs: Any) -> FakeRowIterator:
+        table = self.table_for_sql(query) if self.table_for_sql else self.table
+        fits = self.jobless_max_rows is None or len(table.rows) <= self.jobless_max_rows
+        if self.default_job_creation_mode != "JOB_CREATION_OPTIONAL" or not fits:
+            return self.query(query, job_config=job_config).result()
+        self.queries.append(query)
+        if self.submit_errors:
+            raise self.submit_errors.pop(0)
+        started = datetime.now(timezone.utc)
+        if self.wait_latency_s:
+            time.sleep(self.wait_latency_s)
+        self.jobless_queries.append(query)
+        rows = FakeRowIterator(table.rows, table.schema)
+        rows.location = location or self.location
+        rows.total_bytes_processed = 64 * len(table.rows) * len(table.schema)
+        rows.created = rows.started = started
+        rows.ended = datetime.now(timezone.utc)
+        return rows
+
+    def get_job(self, job_id: str, project: Optional[str] = None, location: Optional[str] = None, **kwargs: Any) -> FakeQueryJob:
+        self.get_job_calls.append(job_id)
+        if job_id not in self.jobs:
+            from google.api_core import exceptions
+
+            raise exceptions.NotFound(f"Job {job_id} not found")
+        return self.jobs[job_id]
+
+    def list_rows(
+        self,
+        table: Any,
+        selected_fields: Any = None,
+        max_results: Optional[int] = None,
+        page_token: Optional[str] = None,
+        start_index: Optional[int] = None,
+        page_size: Optional[int] = None,
+        **kwargs: Any,
+    ) -> FakeRowIterator:
+        """Read a job's destination table; page tokens are stringified offsets."""
+        self.list_rows_calls.append(
+            {"table": str(table), "page_token": page_token, "start_index": start_index, "max_results": max_results}
+        )
+        job = next(job for job in self.jobs.values() if str(job.destination) == str(table))
+        rows = job._table.rows
+        offset = int(page_token) if page_token else (start_index or 0)
+        end = len(rows) if max_results is None else min(len(rows), offset + max_results)
+        next_token = str(end) if end < len(rows) else None
+        return FakeRowIterator(rows[offset:end], job._table.schema, total_rows=len(rows), next_page_token=next_token)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> "FakeBigQueryClient":
+        """Allow the instance to stand in for the ``bigquery.Client`` class."""
+        return self
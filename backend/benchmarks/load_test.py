@@ -0,0 +1,356 @@
+"""Drive concurrent ``/run_sse`` sessions against an in-process ADK server.
+
+Usage::
+
+    python -m benchmarks.load_test --sessions 50 --concurrency 10 --turns 2 --output load.json
+
+The Selecta agent is served through ``get_fast_api_app`` exactly as
+``adk api_server`` would serve it, but with two stand-ins so no quota is spent:
+
+* :class:`ScriptedLlm` replaces Gemini. For a new question it answers with an
+  ``execute_bigquery_query`` call, and once the tool response arrives it
+  answers with a short summary, after ``--model-latency-ms`` each time;
+* :class:`~benchmarks.fake_bigquery.FakeBigQueryClient` replaces BigQuery and
+  returns ``--rows`` synthetic rows after ``--bq-latency-ms``.
+
+The prompt is built from a synthetic schema (``--tables`` x ``--columns``).
+The report contains throughput, per-turn latency and time-to-first-event
+percentiles, SSE event counts and sizes, and process RSS growth per session.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import resource
+import statistics
+import sys
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, AsyncGenerator, Dict, List, Optional
+from unittest import mock
+
+from google.adk.cli.utils.base_agent_loader import BaseAgentLoader
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.genai import types
+
+from .fake_bigquery import FakeBigQueryClient, make_synthetic_table
+from .run import _git_revision, _synthetic_schema
+
+APP_NAME = "selecta"
+
+
+class ScriptedLlm(BaseLlm):
+    """Deterministic model: one SQL tool call per question, then a one-line summary."""
+
+    model: str = "scripted"
+    latency_s: float = 0.0
+
+    @classmethod
+    def supported_models(cls) -> List[str]:
+        return [r"scripted.*"]
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        last = llm_request.contents[-1] if llm_request.contents else None
+        parts = (last.parts if last else None) or []
+        responses = [part.function_response for part in parts if part.function_response]
+        if responses:
+            rows = (responses[0].response or {}).get("result")
+            count = len(rows) if isinstance(rows, list) else 0
+            text = f"The query returned {count} rows."
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]))
+            return
+        question = " ".join(part.text for part in parts if part.text)
+        # One distinct statement per question so repeated questions can hit the caches.
+        sql = f"SELECT {zlib.crc32(question.encode('utf-8'))} AS question_id, * FROM `orders`"
+        yield LlmResponse(
+            content=types.Content(
+                role="model",
+                parts=[
+                    types.Part(
+                        function_call=types.FunctionCall(name="execute_bigquery_query", args={"sql_query": sql})
+                    )
+                ],
+            )
+        )
+
+
+class _StaticAgentLoader(BaseAgentLoader):
+    def __init__(self, agent: Any) -> None:
+        self._agent = agent
+
+    def load_agent(self, agent_name: str) -> Any:
+        return self._agent
+
+    def list_agents(self) -> List[str]:
+        return [APP_NAME]
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm", encoding="ascii") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # ru_maxrss is a peak, in KiB on Linux and bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+    return {
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "mean": statistics.fmean(ordered),
+        "max": ordered[-1],
+    }
+
+
+def build_app(model_latency_ms: float, num_tables: int, num_columns: int) -> Any:
+    """Build the ADK FastAPI app around a Selecta agent that uses :class:`ScriptedLlm`."""
+    from google.adk.cli.fast_api import get_fast_api_app
+
+    from selecta import agent as agent_module
+    from selecta import cost_lint, instructions
+
+    schema = _synthetic_schema(num_tables, num_columns)
+    with mock.patch.object(instructions, "get_table_ddl_strings", lambda: schema["ddls"]), mock.patch.object(
+        instructions, "fetch_bigquery_data_profiles", lambda: schema["profiles"]
+    ), mock.patch.object(
+        instructions,
+        "load_table_partitioning",
+        lambda settings=None: cost_lint.set_table_partitioning(schema["partitioning"], settings),
+    ):
+        instructions.return_instructions_bigquery.cache_clear()
+        agent = agent_module.build_agent()
+    agent.model = ScriptedLlm(latency_s=model_latency_ms / 1000)
+    return get_fast_api_app(
+        agents_dir=str(Path(__file__).resolve().parent),
+        agent_loader=_StaticAgentLoader(agent),
+        session_service_uri="memory://",
+        artifact_service_uri="memory://",
+        memory_service_uri="memory://",
+        use_local_storage=False,
+        web=False,
+    )
+
+
+class _Server:
+    """uvicorn on a background thread, bound to a free local port."""
+
+    def __init__(self, app: Any) -> None:
+        import uvicorn
+
+        from selecta.serve import bind_socket
+
+        self._socket = bind_socket("127.0.0.1", 0)
+        self.base_url = f"http://127.0.0.1:{self._socket.getsockname()[1]}"
+        self._server = uvicorn.Server(uvicorn.Config(app, log_level="warning", lifespan="auto"))
+        self._thread = threading.Thread(target=self._server.run, kwargs={"sockets": [self._socket]}, daemon=True)
+
+    def __enter__(self) -> "_Server":
+        self._thread.start()
+        deadline = time.time() + 30
+        while not self._server.started:
+            if time.time() > deadline or not self._thread.is_alive():
+                raise RuntimeError("ADK server did not start")
+            time.sleep(0.02)
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._server.should_exit = True
+        self._thread.join(10)
+        self._socket.close()
+
+
+async def _run_session(
+    client: Any, index: int, turns: int, distinct_questions: int, topic: str
+) -> List[Dict[str, Any]]:
+    user_id = f"load-user-{index}"
+    response = await client.post(f"/apps/{APP_NAME}/users/{user_id}/sessions", json={})
+    response.raise_for_status()
+    session_id = response.json()["id"]
+    results = []
+    for turn in range(turns):
+        question_number = (index * turns + turn) % distinct_questions
+        body = {
+            "app_name": APP_NAME,
+            "user_id": user_id,
+            "session_id": session_id,
+            "new_message": {"role": "user", "parts": [{"text": f"How many orders in {topic} {question_number}?"}]},
+            "streaming": False,
+        }
+        started = time.perf_counter()
+        first_event_ms: Optional[float] = None
+        event_sizes: List[int] = []
+        errors = 0
+        async with client.stream("POST", "/run_sse", json=body) as stream:
+            if stream.status_code != 200:
+                errors += 1
+            async for line in stream.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                if first_event_ms is None:
+                    first_event_ms = (time.perf_counter() - started) * 1000
+                event_sizes.append(len(line.encode("utf-8")) - len("data: "))
+                if '"error' in line[:200]:
+                    errors += 1
+        results.append(
+            {
+                "latency_ms": (time.perf_counter() - started) * 1000,
+                "first_event_ms": first_event_ms,
+                "event_sizes": event_sizes,
+                "errors": errors,
+            }
+        )
+    return results
+
+
+async def _drive(
+    base_url: str, sessions: int, concurrency: int, turns: int, distinct_questions: int, topic: str = "segment"
+) -> List[Dict[str, Any]]:
+    import httpx
+
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+
+        async def one(index: int) -> List[Dict[str, Any]]:
+            async with semaphore:
+                return await _run_session(client, index, turns, distinct_questions, topic)
+
+        per_session = await asyncio.gather(*(one(index) for index in range(sessions)))
+    return [turn for session in per_session for turn in session]
+
+
+def run_load_test(
+    sessions: int = 20,
+    concurrency: int = 5,
+    turns: int = 2,
+    rows: int = 200,
+    bq_latency_ms: float = 50.0,
+    model_latency_ms: float = 20.0,
+    num_tables: int = 4,
+    num_columns: int = 20,
+    distinct_questions: Optional[int] = None,
+) -> Dict[str, Any]:
+    from selecta import custom_tools
+
+    client = FakeBigQueryClient(
+        table=make_synthetic_table(num_rows=rows, width=8), wait_latency_s=bq_latency_ms / 1000
+    )
+    distinct_questions = distinct_questions or sessions * turns
+    with mock.patch.object(custom_tools.bigquery, "Client", client):
+        app = build_app(model_latency_ms, num_tables, num_columns)
+        with _Server(app) as server:
+            # One warm-up session keeps import and first-request costs out of the numbers.
+            asyncio.run(_drive(server.base_url, 1, 1, 1, 1, topic="warm-up"))
+            jobs_before = len(client.queries)
+            rss_before = _rss_bytes()
+            started = time.perf_counter()
+            results = asyncio.run(_drive(server.base_url, sessions, concurrency, turns, distinct_questions))
+            wall_seconds = time.perf_counter() - started
+            rss_after = _rss_bytes()
+
+    sizes = [size for turn in results for size in turn["event_sizes"]]
+    return {
+        "meta": {
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": int(time.time()),
+        },
+        "config": {
+            "sessions": sessions,
+            "concurrency": concurrency,
+            "turns": turns,
+            "rows": rows,
+            "bq_latency_ms": bq_latency_ms,
+            "model_latency_ms": model_latency_ms,
+            "tables": num_tables,
+            "columns": num_columns,
+            "distinct_questions": distinct_questions,
+        },
+        "turns": len(results),
+        "errors": sum(turn["errors"] for turn in results),
+        "bigquery_jobs": len(client.queries) - jobs_before,
+        "wall_seconds": wall_seconds,
+        "throughput_turns_per_second": len(results) / wall_seconds if wall_seconds else None,
+        "latency_ms": _percentiles([turn["latency_ms"] for turn in results]),
+        "first_event_ms": _percentiles([turn["first_event_ms"] for turn in results if turn["first_event_ms"] is not None]),
+        "events_per_turn": statistics.fmean(len(turn["event_sizes"]) for turn in results) if results else 0,
+        "event_bytes": {**_percentiles([float(size) for size in sizes]), "total": sum(sizes)},
+        "memory": {
+            "rss_before_bytes": rss_before,
+            "rss_after_bytes": rss_after,
+            "rss_growth_per_session_bytes": (rss_after - rss_before) / sessions if sessions else 0,
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--turns", type=int, default=2, help="Questions asked per session.")
+    parser.add_argument("--rows", type=int, default=200, help="Rows returned by every fake query.")
+    parser.add_argument("--bq-latency-ms", type=float, default=50.0)
+    parser.add_argument("--model-latency-ms", type=float, default=20.0)
+    parser.add_argument("--tables", type=int, default=4, help="Tables in the synthetic prompt schema.")
+    parser.add_argument("--columns", type=int, default=20, help="Columns per synthetic table.")
+    parser.add_argument(
+        "--distinct-questions",
+        type=int,
+        help="Size of the question pool (default: every turn asks a new question, so caches never hit).",
+    )
+    parser.add_argument("--output", type=Path, default=Path("load.json"))
+    args = parser.parse_args(argv)
+    for name in ("selecta", "httpx", "google_adk"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    report = run_load_test(
+        sessions=args.sessions,
+        concurrency=args.concurrency,
+        turns=args.turns,
+        rows=args.rows,
+        bq_latency_ms=args.bq_latency_ms,
+        model_latency_ms=args.model_latency_ms,
+        num_tables=args.tables,
+        num_columns=args.columns,
+        distinct_questions=args.distinct_questions,
+    )
+    args.output.write_text(json.dumps(report, indent=2, sort_keys=True), encoding="utf-8")
+    latency, first_event = report["latency_ms"], report["first_event_ms"]
+    print(
+        f"{report['turns']} turns in {report['wall_seconds']:.2f}s "
+        f"({report['throughput_turns_per_second']:.1f}/s), {report['errors']} errors, "
+        f"{report['bigquery_jobs']} BigQuery jobs"
+    )
+    print(f"turn latency    p50 {latency['p50']:.1f} ms  p95 {latency['p95']:.1f} ms  p99 {latency['p99']:.1f} ms")
+    print(f"first event     p50 {first_event['p50']:.1f} ms  p95 {first_event['p95']:.1f} ms  p99 {first_event['p99']:.1f} ms")
+    print(
+        f"SSE events      {report['events_per_turn']:.1f}/turn, p50 {report['event_bytes']['p50']:.0f} B, "
+        f"max {report['event_bytes']['max']:.0f} B"
+    )
+    print(f"RSS growth      {report['memory']['rss_growth_per_session_bytes'] / 1024:.1f} KiB/session")
+    print(f"Wrote {args.output}")
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
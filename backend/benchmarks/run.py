@@ -0,0 +1,443 @@
+"""Run Selecta micro-benchmarks and write the results as JSON.
+
+Usage::
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --output new.json --compare bench.json
+
+Each benchmark reports per-call timings in milliseconds so results from
+different commits can be diffed directly.
+"""
+
+import argparse
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from unittest import mock
+
+from .fake_bigquery import FakeBigQueryClient, make_synthetic_table
+
+
+@dataclass
+class Benchmark:
+    name: str
+    func: Callable[[], Any]
+    number: int = 10
+    setup: Optional[Callable[[], None]] = None
+    teardown: Optional[Callable[[], None]] = None
+
+
+class _FakeToolContext:
+    def __init__(self) -> None:
+        self.state: Dict[str, Any] = {}
+
+
+def _measure(benchmark: Benchmark, repeat: int) -> Dict[str, Any]:
+    if benchmark.setup:
+        benchmark.setup()
+    try:
+        benchmark.func()  # warm-up
+        samples: List[float] = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(benchmark.number):
+                benchmark.func()
+            samples.append((time.perf_counter() - start) * 1000 / benchmark.number)
+    finally:
+        if benchmark.teardown:
+            benchmark.teardown()
+
+    ordered = sorted(samples)
+    p95_index = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+    return {
+        "unit": "ms",
+        "number": benchmark.number,
+        "repeat": repeat,
+        "min": ordered[0],
+        "median": statistics.median(ordered),
+        "mean": statistics.fmean(ordered),
+        "p95": ordered[p95_index],
+        "stdev": statistics.pstdev(ordered),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Benchmark definitions
+# ---------------------------------------------------------------------------
+
+
+def _patching(*patchers: Any) -> Dict[str, Callable[[], None]]:
+    def setup() -> None:
+        for patcher in patchers:
+            patcher.start()
+
+    def teardown() -> None:
+        for patcher in patchers:
+            patcher.stop()
+
+    return {"setup": setup, "teardown": teardown}
+
+
+def _execute_benchmarks() -> List[Benchmark]:
+    from selecta import custom_tools
+    from selecta.result_cache import ResultCache
+
+    benchmarks: List[Benchmark] = []
+    for num_rows, width in ((100, 10), (1_000, 10), (10_000, 20)):
+        client = FakeBigQueryClient(table=make_synthetic_table(num_rows=num_rows, width=width))
+        # Every iteration runs the same SQL, so the result cache is disabled here.
+        patching = _patching(
+            mock.patch.object(custom_tools.bigquery, "Client", client),
+            mock.patch.object(custom_tools, "get_result_cache", return_value=ResultCache(max_entries=0)),
+        )
+
+        def run(client: FakeBigQueryClient = client) -> None:
+            custom_tools.execute_bigquery_query("SELECT 1", tool_context=_FakeToolContext())
+
+        benchmarks.append(
+            Benchmark(
+                name=f"execute_bigquery_query[rows={num_rows},width={width}]",
+                func=run,
+                number=max(1, 2_000 // num_rows),
+                **patching,
+            )
+        )
+
+    # Per-query overhead of a job (insert + poll) versus a jobless short query.
+    from selecta import execution
+
+    for submit_ms, wait_ms in ((0, 0), (10, 20)):
+        for path in ("job", "jobless"):
+            client = FakeBigQueryClient(
+                table=make_synthetic_table(num_rows=50, width=10),
+                submit_latency_s=submit_ms / 1000,
+                wait_latency_s=wait_ms / 1000,
+            )
+            patching = _patching(
+                mock.patch.object(custom_tools.bigquery, "Client", client),
+                mock.patch.object(custom_tools, "get_result_cache", return_value=ResultCache(max_entries=0)),
+                mock.patch.object(execution, "SHORT_QUERY_MODE", path == "jobless"),
+            )
+            benchmarks.append(
+                Benchmark(
+                    name=f"execute_bigquery_query[path={path},rows=50,submit_ms={submit_ms},wait_ms={wait_ms}]",
+                    func=lambda: custom_tools.execute_bigquery_query("SELECT 1", tool_context=_FakeToolContext()),
+                    number=20,
+                    **patching,
+                )
+            )
+    return benchmarks
+
+
+def _canonical_benchmarks() -> List[Benchmark]:
+    from selecta import custom_tools
+    from selecta.canonical_sql import canonicalize
+    from selecta.config_loader import get_bigquery_settings
+    from selecta.result_cache import ResultCache
+
+    settings = get_bigquery_settings()
+    benchmarks: List[Benchmark] = []
+    for num_clauses in (10, 200):
+        sql = _long_sql(num_clauses)
+        benchmarks.append(
+            Benchmark(
+                name=f"canonicalize[clauses={num_clauses},chars={len(sql)}]",
+                func=lambda sql=sql: canonicalize(sql, settings),
+                number=50 if num_clauses < 100 else 5,
+            )
+        )
+
+    client = FakeBigQueryClient(table=make_synthetic_table(num_rows=1_000, width=10), wait_latency_s=0.05)
+    patching = _patching(
+        mock.patch.object(custom_tools.bigquery, "Client", client),
+        mock.patch.object(custom_tools, "get_result_cache", return_value=ResultCache()),
+    )
+    benchmarks.append(
+        Benchmark(
+            name="execute_bigquery_query[cache_hit,rows=1000,wait_ms=50]",
+            func=lambda: custom_tools.execute_bigquery_query(
+                "select * from orders o where o.a = 1 and o.b = 2", tool_context=_FakeToolContext()
+            ),
+            number=20,
+            **patching,
+        )
+    )
+    return benchmarks
+
+
+def _normalize_benchmarks() -> List[Benchmark]:
+    from selecta.custom_tools import _normalize_rows
+
+    benchmarks: List[Benchmark] = []
+    for num_rows, width in ((1_000, 10), (10_000, 10), (1_000, 50)):
+        table = make_synthetic_table(num_rows=num_rows, width=width)
+        data = table.as_dicts()
+        benchmarks.append(
+            Benchmark(
+                name=f"_normalize_rows[rows={num_rows},width={width}]",
+                func=lambda data=data: _normalize_rows(data),
+                number=max(1, 20_000 // num_rows),
+            )
+        )
+        benchmarks.append(
+            Benchmark(
+                name=f"_normalize_rows[plan,rows={num_rows},width={width}]",
+                func=lambda data=data, schema=table.schema: _normalize_rows(data, schema),
+                number=max(1, 20_000 // num_rows),
+            )
+        )
+    return benchmarks
+
+
+def _chart_rows(shape: str, num_rows: int) -> List[Dict[str, Any]]:
+    start = date(2024, 1, 1)
+    if shape == "line":
+        return [
+            {"order_date": (start + timedelta(days=i)).isoformat(), "revenue": float(i * 3 % 97)}
+            for i in range(num_rows)
+        ]
+    if shape == "bar":
+        return [{"category": f"cat_{i % 8}", "revenue": float(i % 53)} for i in range(num_rows)]
+    if shape == "scatter":
+        return [{"price": float(i % 89), "quantity": float(i % 13)} for i in range(num_rows)]
+    if shape == "none":
+        return [{"label": f"free text {i}", "note": f"n{i}"} for i in range(num_rows)]
+    raise ValueError(shape)
+
+
+def _chart_benchmarks() -> List[Benchmark]:
+    from selecta.visualization import build_chart_bundle
+
+    benchmarks: List[Benchmark] = []
+    for shape in ("line", "bar", "scatter", "none"):
+        for num_rows in (20, 500):
+            rows = _chart_rows(shape, num_rows)
+            benchmarks.append(
+                Benchmark(
+                    name=f"build_chart_bundle[{shape},rows={num_rows}]",
+                    func=lambda rows=rows: build_chart_bundle(rows),
+                    number=20,
+                )
+            )
+    return benchmarks
+
+
+def _long_sql(num_clauses: int) -> str:
+    clauses = [
+        f"TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL {i % 30 + 1} DAY) AS window_{i}"
+        for i in range(num_clauses)
+    ]
+    filters = " AND ".join(f"col_{i} IS NOT NULL" for i in range(num_clauses))
+    return f"SELECT {', '.join(clauses)} FROM `project.dataset.table` WHERE {filters}"
+
+
+def _temporal_benchmarks() -> List[Benchmark]:
+    from selecta.custom_tools import _ensure_supported_temporal_intervals
+
+    benchmarks: List[Benchmark] = []
+    for num_clauses in (10, 200):
+        sql = _long_sql(num_clauses)
+        benchmarks.append(
+            Benchmark(
+                name=f"_ensure_supported_temporal_intervals[clauses={num_clauses},chars={len(sql)}]",
+                func=lambda sql=sql: _ensure_supported_temporal_intervals(sql),
+                number=50 if num_clauses < 100 else 5,
+            )
+        )
+    return benchmarks
+
+
+def _markdown(num_lines: int) -> str:
+    table_rows = "\n".join(f"| row {i} | {i * 3} |" for i in range(num_lines))
+    insights = "\n".join(f"- Insight number {i}." for i in range(num_lines // 10))
+    return (
+        "### Summary\nKey takeaway line.\n\n"
+        f"### Results\n| Col | Value |\n| --- | ----- |\n{table_rows}\n\n"
+        f"### Business Insights\n{insights}\n"
+    )
+
+
+def _markdown_benchmarks() -> List[Benchmark]:
+    from selecta.markdown_parser import parse_structured_sections
+
+    benchmarks: List[Benchmark] = []
+    for num_lines in (20, 2_000):
+        text = _markdown(num_lines)
+        benchmarks.append(
+            Benchmark(
+                name=f"parse_structured_sections[lines={num_lines}]",
+                func=lambda text=text: parse_structured_sections(text),
+                number=100 if num_lines < 100 else 10,
+            )
+        )
+    return benchmarks
+
+
+def _synthetic_schema(num_tables: int, num_columns: int) -> Dict[str, Any]:
+    ddls = []
+    profiles = []
+    partitioning = {}
+    for t in range(num_tables):
+        partitioning[f"table_{t}"] = {
+            "partition_column": "column_0",
+            "partition_data_type": "DATE",
+            "clustering_columns": ["column_1", "column_2"],
+        }
+        columns = ",\n".join(f"  column_{c} STRING OPTIONS(description='Column {c}')" for c in range(num_columns))
+        ddls.append({"table_name": f"table_{t}", "ddl": f"CREATE TABLE `p.d.table_{t}`\n(\n{columns}\n);"})
+        for c in range(num_columns):
+            profiles.append(
+                {
+                    "source_table_id": f"p.d.table_{t}",
+                    "column_name": f"column_{c}",
+                    "percent_null": 1.5,
+                    "percent_unique": 40.0,
+                    "min_value": "a",
+                    "max_value": "z",
+                    "top_n": [{"value": f"v{i}", "count": 10 - i} for i in range(5)],
+                }
+            )
+    return {"ddls": ddls, "profiles": profiles, "partitioning": partitioning}
+
+
+def _instruction_benchmarks() -> List[Benchmark]:
+    from selecta import cost_lint, instructions
+
+    benchmarks: List[Benchmark] = []
+    for num_tables, num_columns in ((4, 20), (50, 100)):
+        schema = _synthetic_schema(num_tables, num_columns)
+        patchers = [
+            mock.patch.object(instructions, "get_table_ddl_strings", lambda schema=schema: schema["ddls"]),
+            mock.patch.object(
+                instructions, "fetch_bigquery_data_profiles", lambda schema=schema: schema["profiles"]
+            ),
+            mock.patch.object(
+                instructions,
+                "load_table_partitioning",
+                lambda settings=None, schema=schema: cost_lint.set_table_partitioning(schema["partitioning"], settings),
+            ),
+        ]
+
+        def setup(patchers=patchers) -> None:
+            for patcher in patchers:
+                patcher.start()
+
+        def teardown(patchers=patchers) -> None:
+            for patcher in patchers:
+                patcher.stop()
+            instructions.return_instructions_bigquery.cache_clear()
+
+        def run() -> None:
+            instructions.return_instructions_bigquery.cache_clear()
+            instructions.return_instructions_bigquery()
+
+        benchmarks.append(
+            Benchmark(
+                name=f"return_instructions_bigquery[tables={num_tables},columns={num_columns}]",
+                func=run,
+                number=5 if num_tables < 10 else 1,
+                setup=setup,
+                teardown=teardown,
+            )
+        )
+    return benchmarks
+
+
+SUITES: Dict[str, Callable[[], List[Benchmark]]] = {
+    "execute": _execute_benchmarks,
+    "normalize": _normalize_benchmarks,
+    "chart": _chart_benchmarks,
+    "temporal": _temporal_benchmarks,
+    "markdown": _markdown_benchmarks,
+    "instructions": _instruction_benchmarks,
+    "canonical": _canonical_benchmarks,
+}
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return (
+            subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL)
+            .decode()
+            .strip()
+        )
+    except Exception:
+        return None
+
+
+def run_benchmarks(suites: List[str], repeat: int, name_filter: Optional[str] = None) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for suite in suites:
+        for benchmark in SUITES[suite]():
+            if name_filter and name_filter not in benchmark.name:
+                continue
+            stats = _measure(benchmark, repeat)
+            results[benchmark.name] = {"suite": suite, **stats}
+            print(f"{benchmark.name:<80} median {stats['median']:>10.3f} ms  p95 {stats['p95']:>10.3f} ms")
+    return {
+        "meta": {
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": int(time.time()),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print median deltas and return the names that regressed beyond ``threshold``."""
+    regressions: List[str] = []
+    print(f"\nComparison against {baseline.get('meta', {}).get('revision') or 'baseline'}:")
+    for name, stats in current["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous or not previous.get("median"):
+            print(f"{name:<80} (new)")
+            continue
+        delta = (stats["median"] - previous["median"]) / previous["median"]
+        marker = ""
+        if delta > threshold:
+            marker = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<80} {delta:+8.1%}{marker}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", type=Path, default=Path("bench.json"))
+    parser.add_argument("--compare", type=Path, help="Baseline JSON produced by a previous run.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative median slowdown flagged as a regression.")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--suite", action="append", choices=sorted(SUITES), help="Limit to one or more suites.")
+    parser.add_argument("--filter", help="Only run benchmarks whose name contains this substring.")
+    args = parser.parse_args(argv)
+    logging.getLogger("selecta").setLevel(logging.WARNING)
+
+    report = run_benchmarks(args.suite or list(SUITES), args.repeat, args.filter)
+    args.output.write_text(json.dumps(report, indent=2, sort_keys=True), encoding="utf-8")
+    print(f"\nWrote {len(report['results'])} results to {args.output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,9 +3,18 @@
 from dotenv import load_dotenv
 from google.adk.agents import Agent
 
+from .callbacks import (
+    drop_failed_instruction_cache,
+    replay_cached_question,
+    route_model,
+    start_model_turn_timer,
+    stop_model_turn_timer,
+    use_cached_instruction,
+)
 from .config_loader import get_model
-from .custom_tools import execute_bigquery_query
+from .custom_tools import execute_bigquery_queries, execute_bigquery_query, fetch_more_rows, transform_result
 from .instructions import return_instructions_bigquery
+from .telemetry import start_metrics_server
 
 # Load environment variables if an env file is present
 load_dotenv(".env")
@@ -17,7 +26,10 @@ def build_agent() -> Agent:
         name="selecta",
         description="Converts natural language questions about provided BigQuery data into executable BigQuery SQL queries and runs them.",
         instruction=return_instructions_bigquery(),
-        tools=[execute_bigquery_query],
+        tools=[execute_bigquery_query, execute_bigquery_queries, fetch_more_rows, transform_result],
+        before_model_callback=[start_model_turn_timer, replay_cached_question, route_model, use_cached_instruction],
+        after_model_callback=[stop_model_turn_timer],
+        on_model_error_callback=drop_failed_instruction_cache,
     )
 
 
@@ -36,6 +48,8 @@ def refresh_agent() -> Agent:
     return _set_agent(build_agent())
 
 
+start_metrics_server()
+
 selecta_agent = build_agent()
 
 # ADK web expects a symbol named `root_agent`
@@ -0,0 +1,207 @@
+"""Approximate execution for exploratory and "roughly how many" questions.
+
+``execute_bigquery_query(sql, approximate=True)`` trades exactness for bytes
+scanned:
+
+* ``COUNT(DISTINCT x)`` becomes ``APPROX_COUNT_DISTINCT(x)`` (HyperLogLog++,
+  usually within a percent of the exact count);
+* a query that reads a single table listed under ``approximate.large_tables``
+  gets ``TABLESAMPLE SYSTEM (n PERCENT)``, and its ``COUNT``, ``COUNTIF`` and
+  ``SUM`` aggregates are divided by the sampling rate.
+
+.. code-block:: yaml
+
+    approximate:
+      sample_percent: 10
+      large_tables: ["order_items", "events"]
+
+Sampling is skipped for joins, subqueries, ``UNNEST`` and window functions,
+where one factor cannot scale the sample back up. Distinct counts over a
+sample are not scaled and understate the full count. ``TABLESAMPLE SYSTEM``
+reads whole storage blocks, so only list tables that span many of them.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .canonical_sql import _TOKEN_PATTERN
+from .config_loader import ApproximateSettings, BigQuerySettings
+from .execution import referenced_tables
+
+# Keywords that may follow ``FROM table [alias]`` in a single-table query.
+_CLAUSE_KEYWORDS = {"WHERE", "GROUP", "ORDER", "LIMIT", "HAVING", "QUALIFY", "WINDOW", "UNION", "INTERSECT", "EXCEPT"}
+_NOT_ALIAS = _CLAUSE_KEYWORDS | {"FOR"}
+_UNSAMPLEABLE = {"JOIN", "OVER", "UNNEST", "TABLESAMPLE"}
+_SCALED_AGGREGATES = {"COUNT", "COUNTIF", "SUM"}
+
+# (kind, text, start, end) with whitespace and comments dropped.
+_Token = Tuple[str, str, int, int]
+# (start, end, replacement) applied to the original SQL.
+_Edit = Tuple[int, int, str]
+
+
+@dataclass(frozen=True)
+class ApproximateQuery:
+    sql: str
+    sampling_rate: float = 1.0
+    sampled_tables: Tuple[str, ...] = ()
+    rewrites: Tuple[Dict[str, Any], ...] = ()
+
+    @property
+    def approximate(self) -> bool:
+        return bool(self.rewrites)
+
+
+def _tokens(sql_query: str) -> List[_Token]:
+    return [
+        (match.lastgroup or "op", match.group(0), match.start(), match.end())
+        for match in _TOKEN_PATTERN.finditer(sql_query)
+        if match.lastgroup not in {"ws", "comment"}
+    ]
+
+
+def _is_word(token: _Token, words: "set[str]") -> bool:
+    return token[0] == "word" and token[1].upper() in words
+
+
+def _is_op(tokens: List[_Token], index: int, text: str) -> bool:
+    return index < len(tokens) and tokens[index][0] == "op" and tokens[index][1] == text
+
+
+def _closing_paren(tokens: List[_Token], open_index: int) -> Optional[int]:
+    depth = 0
+    for index in range(open_index, len(tokens)):
+        if _is_op(tokens, index, "("):
+            depth += 1
+        elif _is_op(tokens, index, ")"):
+            depth -= 1
+            if depth == 0:
+                return index
+    return None
+
+
+def _sample_target(sql_query: str, tokens: List[_Token]) -> Optional[Tuple[str, int]]:
+    """The single table read by ``sql_query`` and where TABLESAMPLE goes, or None."""
+    if sum(_is_word(token, {"SELECT"}) for token in tokens) != 1:
+        return None
+    if any(_is_word(token, _UNSAMPLEABLE) for token in tokens):
+        return None
+    depth, index = 0, None
+    for position, token in enumerate(tokens):
+        if _is_op(tokens, position, "("):
+            depth += 1
+        elif _is_op(tokens, position, ")"):
+            depth -= 1
+        elif depth == 0 and _is_word(token, {"FROM"}):
+            index = position + 1
+            break
+    if index is None:
+        return None
+
+    # The table path: adjacent words, quoted names, dots and dashes.
+    start = end = None
+    while index < len(tokens) and (tokens[index][0] in {"word", "quoted"} or tokens[index][1] in {".", "-"}):
+        if end is not None and tokens[index][2] != end:
+            break
+        start = tokens[index][2] if start is None else start
+        end = tokens[index][3]
+        index += 1
+    if start is None or end is None:
+        return None
+    path = sql_query[start:end]
+
+    insert_at = end
+    if index < len(tokens) and _is_word(tokens[index], {"AS"}):
+        index += 1
+        if index >= len(tokens) or tokens[index][0] not in {"word", "quoted"}:
+            return None
+        insert_at = tokens[index][3]
+        index += 1
+    elif index < len(tokens) and tokens[index][0] in {"word", "quoted"} and not _is_word(tokens[index], _NOT_ALIAS):
+        insert_at = tokens[index][3]
+        index += 1
+    if index < len(tokens) and not _is_word(tokens[index], _CLAUSE_KEYWORDS) and not _is_op(tokens, index, ";"):
+        return None
+    return path, insert_at
+
+
+def _scaling_edits(tokens: List[_Token], rate: str) -> Optional[List[_Edit]]:
+    """Divide every COUNT, COUNTIF and SUM by ``rate``; None when one cannot be scaled."""
+    edits: List[_Edit] = []
+    for index, token in enumerate(tokens):
+        if not _is_word(token, _SCALED_AGGREGATES) or not _is_op(tokens, index + 1, "("):
+            continue
+        distinct = index + 2 < len(tokens) and _is_word(tokens[index + 2], {"DISTINCT"})
+        if distinct and token[1].upper() == "COUNT":
+            continue
+        close = _closing_paren(tokens, index + 1)
+        if distinct or close is None:
+            return None
+        if token[1].upper() == "SUM":
+            edits += [(token[2], token[2], "("), (tokens[close][3], tokens[close][3], f" / {rate})")]
+        else:
+            edits += [(token[2], token[2], "CAST(ROUND("), (tokens[close][3], tokens[close][3], f" / {rate}) AS INT64)")]
+    return edits
+
+
+def _apply(sql_query: str, edits: List[_Edit]) -> str:
+    for start, end, replacement in sorted(edits, key=lambda edit: edit[0], reverse=True):
+        sql_query = sql_query[:start] + replacement + sql_query[end:]
+    return sql_query
+
+
+def approximate_query(
+    sql_query: str, approximate: ApproximateSettings, settings: BigQuerySettings
+) -> ApproximateQuery:
+    """Rewrite ``sql_query`` for approximate execution; unchanged when nothing applies."""
+    tokens = _tokens(sql_query)
+    edits: List[_Edit] = []
+    rewrites: List[Dict[str, Any]] = []
+
+    distinct_counts = 0
+    for index, token in enumerate(tokens):
+        if (
+            _is_word(token, {"COUNT"})
+            and _is_op(tokens, index + 1, "(")
+            and index + 2 < len(tokens)
+            and _is_word(tokens[index + 2], {"DISTINCT"})
+        ):
+            argument = tokens[index + 3][2] if index + 3 < len(tokens) else tokens[index + 2][3]
+            edits.append((token[2], argument, "APPROX_COUNT_DISTINCT("))
+            distinct_counts += 1
+    if distinct_counts:
+        rewrites.append(
+            {
+                "rule": "approx_count_distinct",
+                "message": f"Replaced {distinct_counts} COUNT(DISTINCT ...) with APPROX_COUNT_DISTINCT.",
+            }
+        )
+
+    sampling_rate = 1.0
+    sampled: Tuple[str, ...] = ()
+    target = _sample_target(sql_query, tokens) if approximate.sample_percent < 100 else None
+    if target is not None:
+        path, insert_at = target
+        table = [part for part in re.split(r"[.`\s]+", path) if part][-1]
+        rate = f"{approximate.sample_percent / 100:g}"
+        scaling = _scaling_edits(tokens, rate)
+        # Qualified names outside the active dataset come back qualified and never match.
+        in_dataset = referenced_tables(f"SELECT * FROM {path}", settings) == {table}
+        if table in approximate.large_tables and in_dataset and scaling is not None:
+            percent = f"{approximate.sample_percent:g}"
+            edits += scaling
+            edits.append((insert_at, insert_at, f" TABLESAMPLE SYSTEM ({percent} PERCENT)"))
+            sampling_rate = approximate.sample_percent / 100
+            sampled = (table,)
+            message = f"Read a {percent}% sample of `{table}`; COUNT, COUNTIF and SUM are divided by {rate}."
+            if distinct_counts:
+                message += " Distinct counts cover the sample only and are not scaled."
+            rewrites.append({"rule": "tablesample", "table": table, "message": message})
+
+    return ApproximateQuery(
+        sql=_apply(sql_query, edits),
+        sampling_rate=sampling_rate,
+        sampled_tables=sampled,
+        rewrites=tuple(rewrites),
+    )
@@ -0,0 +1,160 @@
+"""ADK model callbacks used by the Selecta agent."""
+
+import time
+from typing import Any, Dict, Optional
+
+from google.adk.models import LlmResponse
+from google.genai import types
+
+from .config_loader import get_dataset_config
+from .constants import CONTEXT_CACHE_ENABLED
+from .context_cache import get_instruction_cache
+from .instructions import schema_snapshot
+from .model_router import choose_model, last_query_failed
+from .question_cache import QUESTION_REPLAY_STATE_KEY, get_question_cache, question_text
+from .telemetry import get_registry, observe_stage
+
+_MODEL_TURN_STARTS: Dict[str, float] = {}
+_FIRST_RESPONSE_SEEN: Dict[str, bool] = {}
+_ROUTED_MODELS: Dict[str, str] = {}
+
+
+def _turn_key(callback_context: Any) -> str:
+    return str(getattr(callback_context, "invocation_id", None) or id(callback_context))
+
+
+def _forget_turn(key: str) -> None:
+    _MODEL_TURN_STARTS.pop(key, None)
+    _FIRST_RESPONSE_SEEN.pop(key, None)
+    _ROUTED_MODELS.pop(key, None)
+
+
+def start_model_turn_timer(callback_context: Any, llm_request: Any) -> Optional[Any]:
+    """Before-model callback: remember when the model request was issued."""
+    key = _turn_key(callback_context)
+    _MODEL_TURN_STARTS[key] = time.perf_counter()
+    _FIRST_RESPONSE_SEEN.pop(key, None)
+    return None
+
+
+def stop_model_turn_timer(callback_context: Any, llm_response: Any) -> Optional[Any]:
+    """After-model callback: record time to first response and full turn latency.
+
+    Streaming calls invoke this once per partial chunk; the turn is only
+    closed on the final, non-partial response.
+    """
+    key = _turn_key(callback_context)
+    started = _MODEL_TURN_STARTS.get(key)
+    if started is None:
+        return None
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    model = getattr(llm_response, "model_version", None) or _ROUTED_MODELS.get(key)
+    if not _FIRST_RESPONSE_SEEN.get(key):
+        _FIRST_RESPONSE_SEEN[key] = True
+        observe_stage("model_first_response", elapsed_ms, model=model)
+
+    if getattr(llm_response, "partial", False):
+        return None
+
+    _forget_turn(key)
+    observe_stage("model_turn", elapsed_ms, model=model)
+    get_registry().increment("selecta_model_turns_total", model=model)
+    return None
+
+
+def replay_cached_question(callback_context: Any, llm_request: Any) -> Optional[LlmResponse]:
+    """Before-model callback: answer a repeated question with its cached SQL.
+
+    Only the first model call of a turn (the one that would write SQL) is
+    replaced. The returned response calls ``execute_bigquery_query`` directly;
+    the state key tells the tool to flag the result as a cache hit.
+    """
+    contents = getattr(llm_request, "contents", None) or []
+    if not contents:
+        return None
+    last = contents[-1]
+    if getattr(last, "role", None) != "user":
+        return None
+    if any(getattr(part, "function_response", None) for part in getattr(last, "parts", None) or []):
+        return None
+    question = question_text(last)
+    if not question:
+        return None
+
+    match = get_question_cache().lookup(get_dataset_config().id, schema_snapshot(), question)
+    if match is None:
+        return None
+    entry, similarity = match
+    callback_context.state[QUESTION_REPLAY_STATE_KEY] = {
+        "question": entry.question,
+        "sql": entry.sql,
+        "similarity": similarity,
+    }
+    return LlmResponse(
+        content=types.Content(
+            role="model",
+            parts=[
+                types.Part(
+                    function_call=types.FunctionCall(
+                        name="execute_bigquery_query", args={"sql_query": entry.sql}
+                    )
+                )
+            ],
+        ),
+        custom_metadata={"questionCacheHit": True, "questionSimilarity": round(similarity, 3)},
+    )
+
+
+def route_model(callback_context: Any, llm_request: Any) -> Optional[Any]:
+    """Before-model callback: send the request to the dataset's fast or strong model.
+
+    See ``selecta.model_router`` for the signals. Runs before
+    ``use_cached_instruction`` so the instruction is cached for the routed model.
+    """
+    config = get_dataset_config()
+    if len(config.models) < 2:
+        return None
+    contents = getattr(llm_request, "contents", None) or []
+    question = next(
+        (
+            question_text(content)
+            for content in reversed(contents)
+            if getattr(content, "role", None) == "user" and question_text(content)
+        ),
+        "",
+    )
+    route = choose_model(
+        config.models,
+        config.model_routing,
+        question,
+        config.bigquery.tables,
+        query_failed=last_query_failed(getattr(callback_context, "state", None)),
+    )
+    llm_request.model = route.model
+    _ROUTED_MODELS[_turn_key(callback_context)] = route.model
+    get_registry().increment("selecta_model_routes_total", model=route.model, tier=route.tier, reason=route.reason)
+    return None
+
+
+def use_cached_instruction(callback_context: Any, llm_request: Any) -> Optional[Any]:
+    """Before-model callback: send the static instruction as provider-cached content.
+
+    Runs last so replayed turns never create a cache. When caching is disabled
+    or the provider refuses it, the request goes out unchanged.
+    """
+    if CONTEXT_CACHE_ENABLED:
+        get_instruction_cache().apply(llm_request, schema_snapshot())
+    return None
+
+
+def drop_failed_instruction_cache(callback_context: Any, llm_request: Any, error: Exception) -> Optional[Any]:
+    """Model-error callback: forget the turn and any cached instruction the provider no longer accepts.
+
+    The failing turn still surfaces its error; the next request recreates the cache.
+    """
+    _forget_turn(_turn_key(callback_context))
+    cache_name = getattr(getattr(llm_request, "config", None), "cached_content", None)
+    if cache_name:
+        get_instruction_cache().invalidate(cache_name)
+    return None
@@ -0,0 +1,347 @@
+"""Canonical form of generated SQL, used to recognise equivalent queries.
+
+The model rarely emits the same query twice byte for byte: whitespace,
+keyword casing, alias names, predicate order and how tables are qualified all
+vary between turns. :func:`canonicalize` tokenizes the SQL and rewrites it so
+those variants collapse to one string:
+
+* comments and whitespace are dropped, reserved keywords and function names
+  are upper-cased (as are non-reserved ones such as ``YEAR`` where they act as
+  keywords), ``<>`` becomes ``!=`` and simple string literals use single
+  quotes;
+* table references after ``FROM`` / ``JOIN`` are resolved against the active
+  dataset to `` `project.dataset.table` ``;
+* table aliases (explicit or implied by the table name) are renamed to
+  ``__t1``, ``__t2`` ... in order of appearance, including ``alias.column``
+  references; an alias that is also used bare (the whole row) keeps its name;
+* top-level ``AND`` conjuncts of each ``WHERE`` / ``HAVING`` clause are sorted
+  when the clause contains no top-level ``OR``.
+
+Identifiers and column aliases keep their case because they name the output
+columns. The canonical string is only used as a key; it is never executed.
+"""
+
+import re
+from typing import List, Optional, Sequence, Tuple
+
+from .config_loader import BigQuerySettings
+
+Token = Tuple[str, str]
+
+_TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<ws>\s+)
+    |(?P<comment>--[^\n]*|\#[^\n]*|/\*.*?(?:\*/|\Z))
+    |(?P<string>(?:[rRbB]{1,2})?(?:'''.*?'''|\"\"\".*?\"\"\"|'(?:\\.|[^'\\])*'|"(?:\\.|[^"\\])*"))
+    |(?P<quoted>`(?:\\.|[^`\\])*`)
+    |(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    |(?P<param>@@?\w+|\?)
+    |(?P<word>[A-Za-z_][A-Za-z0-9_]*)
+    |(?P<op><>|!=|<=|>=|\|\||<<|>>|=>|\S)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+KEYWORDS = frozenset(
+    """
+    ALL AND ANY ARRAY AS ASC BETWEEN BY CASE CAST CROSS CUBE CURRENT DATE DATETIME DESC DISTINCT
+    ELSE END ESCAPE EXCEPT EXISTS EXTRACT FALSE FIRST FOLLOWING FOR FROM FULL GROUP GROUPING HAVING
+    IF IGNORE IN INNER INTERSECT INTERVAL INTO IS JOIN LAST LEFT LIKE LIMIT NOT NULL NULLS OFFSET ON
+    OR ORDER OUTER OVER PARTITION PRECEDING QUALIFY RANGE RECURSIVE REPLACE RESPECT RIGHT ROLLUP ROWS
+    SELECT SET STRUCT SYSTEM_TIME TABLESAMPLE THEN TIME TIMESTAMP TRUE UNBOUNDED UNION UNNEST USING
+    VALUE WHEN WHERE WINDOW WITH
+    DAY DAYOFWEEK DAYOFYEAR HOUR ISOWEEK ISOYEAR MICROSECOND MILLISECOND MINUTE MONTH QUARTER SECOND
+    WEEK YEAR
+    """.split()
+)
+
+# Keywords BigQuery also accepts as unquoted column names and aliases; they are
+# only upper-cased where they act as keywords (see ``_is_keyword_position``).
+_NON_RESERVED = frozenset(
+    """
+    DATE DATETIME FIRST LAST OFFSET REPLACE SYSTEM_TIME TIME TIMESTAMP VALUE
+    DAY DAYOFWEEK DAYOFYEAR HOUR ISOWEEK ISOYEAR MICROSECOND MILLISECOND MINUTE MONTH QUARTER SECOND
+    WEEK YEAR
+    """.split()
+)
+_RESERVED = KEYWORDS - _NON_RESERVED
+# Reserved words whose parentheses hold arguments rather than a query or named fields.
+_RESERVED_CALLS = frozenset({"CAST", "EXTRACT"})
+
+_CLAUSE_END = frozenset(
+    {"GROUP", "ORDER", "HAVING", "QUALIFY", "WINDOW", "LIMIT", "UNION", "INTERSECT", "EXCEPT"}
+)
+_SORTABLE_CLAUSES = frozenset({"WHERE", "HAVING"})
+
+
+def tokenize(sql_query: str) -> List[Token]:
+    """Split SQL into ``(kind, text)`` tokens, dropping whitespace and comments."""
+    tokens: List[Token] = []
+    for match in _TOKEN_PATTERN.finditer(sql_query):
+        kind = match.lastgroup or "op"
+        if kind in {"ws", "comment"}:
+            continue
+        tokens.append((kind, match.group(0)))
+    while tokens and tokens[-1] == ("op", ";"):
+        tokens.pop()
+    return tokens
+
+
+def _in_call_arguments(tokens: Sequence[Token]) -> List[bool]:
+    """Whether each token sits directly inside a function call's parentheses.
+
+    Call arguments never name output columns, unlike subqueries and ``STRUCT`` fields.
+    """
+    flags: List[bool] = []
+    owners: List[bool] = []
+    for index, (kind, text) in enumerate(tokens):
+        if (kind, text) == ("op", ")") and owners:
+            owners.pop()
+        flags.append(bool(owners) and owners[-1])
+        if (kind, text) == ("op", "("):
+            previous_kind, previous = tokens[index - 1] if index else ("op", "")
+            upper = previous.upper()
+            owners.append(previous_kind == "word" and (upper not in _RESERVED or upper in _RESERVED_CALLS))
+    return flags
+
+
+def _is_keyword_position(tokens: Sequence[Token], index: int, in_call: bool) -> bool:
+    """True when a non-reserved keyword such as ``YEAR`` or ``VALUE`` is used as a keyword."""
+    next_kind, next_text = tokens[index + 1] if index + 1 < len(tokens) else ("", "")
+    previous = tokens[index - 1][1].upper() if index >= 1 else ""
+    before_previous = tokens[index - 2][1].upper() if index >= 2 else ""
+    return (
+        in_call
+        or next_text == "("
+        or next_kind == "string"
+        or previous in {"NULLS", "FOR", "TO", "INTERVAL"}
+        or before_previous in {"INTERVAL", "LIMIT"}
+    )
+
+
+def _normalize_token(tokens: Sequence[Token], index: int, in_call: bool = False) -> Token:
+    kind, text = tokens[index]
+    if kind == "word":
+        upper = text.upper()
+        if upper in _NON_RESERVED:
+            return kind, upper if _is_keyword_position(tokens, index, in_call) else text
+        next_token = tokens[index + 1] if index + 1 < len(tokens) else None
+        if upper in KEYWORDS or next_token == ("op", "("):
+            return kind, upper
+        return kind, text
+    if kind == "op" and text == "<>":
+        return kind, "!="
+    if kind == "string" and text[0] == '"' and not text.startswith('"""') and "'" not in text and "\\" not in text:
+        return kind, "'" + text[1:-1] + "'"
+    return kind, text
+
+
+def _is_path_part(token: Token) -> bool:
+    return token[0] in {"word", "quoted"}
+
+
+def _read_table_path(tokens: Sequence[Token], index: int) -> Tuple[List[str], int]:
+    """Read ``a.b.c`` / `` `a.b`.c `` / ``my-project.ds.t``; returns parts and next index."""
+    raw: List[str] = []
+    current = ""
+    expect_part = True
+    while index < len(tokens):
+        kind, text = tokens[index]
+        if expect_part and kind == "number" and current.endswith("-"):
+            # ``my-project-1.dataset`` tokenizes the trailing "1." as one number.
+            current += text.rstrip(".")
+            expect_part = text.endswith(".")
+            if expect_part:
+                raw.append(current)
+                current = ""
+        elif expect_part and _is_path_part(tokens[index]):
+            current += text.strip("`")
+            expect_part = False
+        elif not expect_part and (kind, text) == ("op", "-"):
+            current += "-"
+            expect_part = True
+        elif not expect_part and (kind, text) == ("op", "."):
+            raw.append(current)
+            current = ""
+            expect_part = True
+        else:
+            break
+        index += 1
+    if current:
+        raw.append(current)
+    parts = [part for segment in raw for part in segment.split(".") if part]
+    return parts, index
+
+
+def _qualify(parts: List[str], settings: Optional[BigQuerySettings]) -> str:
+    if settings is not None:
+        if len(parts) == 1:
+            parts = [settings.data_project_id, settings.dataset] + parts
+        elif len(parts) == 2:
+            parts = [settings.data_project_id] + parts
+    return "`" + ".".join(parts) + "`"
+
+
+def _cte_names(tokens: Sequence[Token]) -> set:
+    names = set()
+    for index in range(len(tokens) - 2):
+        if tokens[index][0] == "word" and tokens[index + 1][1].upper() == "AS" and tokens[index + 2][1] == "(":
+            previous = tokens[index - 1][1].upper() if index else ""
+            if previous in {"WITH", ",", "RECURSIVE"}:
+                names.add(tokens[index][1].lower())
+    return names
+
+
+def _resolve_tables(tokens: List[Token], settings: Optional[BigQuerySettings]) -> List[Token]:
+    """Qualify table references and rename table aliases to ``__tN``."""
+    ctes = _cte_names(tokens)
+    output: List[Token] = []
+    aliases: dict = {}
+    # Output positions of alias declarations (to the original alias) and of table references.
+    declarations: dict = {}
+    references: set = set()
+    index = 0
+    in_from = False
+    depth_at_from = -1
+    # Name of the function (or "") owning each open parenthesis; FROM inside EXTRACT(...) is not a table.
+    parens: List[str] = []
+    while index < len(tokens):
+        kind, text = tokens[index]
+        upper = text.upper() if kind == "word" else text
+        if text == "(":
+            parens.append(output[-1][1].upper() if output else "")
+        elif text == ")" and parens:
+            parens.pop()
+            if len(parens) < depth_at_from:
+                in_from = False
+        depth = len(parens)
+        if upper == "FROM" and parens and parens[-1] == "EXTRACT":
+            output.append((kind, text))
+            index += 1
+            continue
+        starts_reference = upper in {"FROM", "JOIN"} or (in_from and text == "," and depth == depth_at_from)
+        if upper == "FROM":
+            in_from, depth_at_from = True, depth
+        elif kind == "word" and upper in _CLAUSE_END | {"WHERE", "ON", "USING", "SELECT"} and depth <= depth_at_from:
+            in_from = False
+        output.append((kind, text))
+        index += 1
+        if not starts_reference or index >= len(tokens) or not _is_path_part(tokens[index]):
+            continue
+        if tokens[index][1].upper() in KEYWORDS - {"DATE", "TIME", "TIMESTAMP", "DATETIME"}:
+            continue
+        parts, after = _read_table_path(tokens, index)
+        if not parts or (after < len(tokens) and tokens[after] == ("op", "(")):
+            continue
+        is_cte = len(parts) == 1 and parts[0].lower() in ctes
+        output.append(("quoted", parts[0] if is_cte else _qualify(parts, settings)))
+        index = after
+        alias = parts[-1]
+        if index < len(tokens) and tokens[index][1].upper() == "AS":
+            index += 1
+        if index < len(tokens) and tokens[index][0] in {"word", "quoted"} and tokens[index][1].upper() not in _RESERVED:
+            alias = tokens[index][1].strip("`")
+            index += 1
+        aliases.setdefault(alias, f"__t{len(aliases) + 1}")
+        declarations[len(output) + 1] = alias
+        output.extend([("word", "AS"), ("word", alias)])
+        references.add(len(output) - 3)
+
+    # A bare ``alias`` (the whole row as a STRUCT) could also be a column of that
+    # name, so such aliases keep their original name.
+    kept = {
+        text.strip("`")
+        for position, (kind, text) in enumerate(output)
+        if kind in {"word", "quoted"}
+        and position not in declarations
+        and position not in references
+        and text.strip("`") in aliases
+        and output[position + 1 : position + 2] != [("op", ".")]
+        and output[position + 1 : position + 3] != [("word", "AS"), ("op", "(")]
+    }
+    renamed: List[Token] = []
+    for position, (kind, text) in enumerate(output):
+        name = declarations.get(position)
+        next_token = output[position + 1] if position + 1 < len(output) else None
+        if name is not None:
+            renamed.append(("word", name if name in kept else aliases[name]))
+        elif kind in {"word", "quoted"} and next_token == ("op", ".") and text.strip("`") in aliases.keys() - kept:
+            renamed.append(("word", aliases[text.strip("`")]))
+        else:
+            renamed.append((kind, text))
+    return renamed
+
+
+def _render(tokens: Sequence[Token]) -> str:
+    return " ".join(text for _, text in tokens)
+
+
+def _sort_conjuncts_once(tokens: List[Token]) -> List[Token]:
+    depths: List[int] = []
+    depth = 0
+    for kind, text in tokens:
+        upper = text.upper() if kind == "word" else text
+        if upper in {")", "END"}:
+            depth -= 1
+        depths.append(depth)
+        if upper in {"(", "CASE"}:
+            depth += 1
+
+    for start, (kind, text) in enumerate(tokens):
+        if kind != "word" or text not in _SORTABLE_CLAUSES:
+            continue
+        level = depths[start]
+        end = start + 1
+        while end < len(tokens):
+            if depths[end] < level or (depths[end] == level and tokens[end][1] in _CLAUSE_END):
+                break
+            end += 1
+        conjuncts: List[List[Token]] = [[]]
+        pending_between = False
+        has_or = False
+        for position in range(start + 1, end):
+            token_text = tokens[position][1]
+            if depths[position] == level:
+                if token_text == "OR":
+                    has_or = True
+                    break
+                if token_text == "BETWEEN":
+                    pending_between = True
+                elif token_text == "AND":
+                    if pending_between:
+                        pending_between = False
+                    else:
+                        conjuncts.append([])
+                        continue
+            conjuncts[-1].append(tokens[position])
+        if has_or or len(conjuncts) < 2:
+            continue
+        ordered = sorted(conjuncts, key=_render)
+        if ordered == conjuncts:
+            continue
+        joined: List[Token] = []
+        for position, conjunct in enumerate(ordered):
+            if position:
+                joined.append(("word", "AND"))
+            joined.extend(conjunct)
+        return tokens[: start + 1] + joined + tokens[end:]
+    return tokens
+
+
+def _sort_conjuncts(tokens: List[Token]) -> List[Token]:
+    # Each pass sorts one clause; nested clauses can change how outer conjuncts sort.
+    for _ in range(64):
+        updated = _sort_conjuncts_once(tokens)
+        if updated == tokens:
+            break
+        tokens = updated
+    return tokens
+
+
+def canonicalize(sql_query: str, settings: Optional[BigQuerySettings] = None) -> str:
+    """Return the canonical form of ``sql_query`` (see the module docstring)."""
+    tokens = tokenize(sql_query)
+    in_call = _in_call_arguments(tokens)
+    tokens = [_normalize_token(tokens, index, in_call[index]) for index in range(len(tokens))]
+    tokens = _resolve_tables(tokens, settings)
+    return _render(_sort_conjuncts(tokens))
@@ -1,17 +1,27 @@
+import logging
 import os
-from dataclasses import dataclass
+import threading
+from dataclasses import dataclass, field
 from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 import yaml
 
-from .constants import DEFAULT_DATASET_CONFIG_PATH, MODEL
+from .constants import (
+    DATASET_WATCH_ENABLED,
+    DATASET_WATCH_INTERVAL_SECONDS,
+    DEFAULT_DATASET_CONFIG_PATH,
+    MODEL,
+)
 
+logger = logging.getLogger(__name__)
 
 _PACKAGE_ROOT = Path(__file__).resolve().parent
 _DATASET_DIR = (_PACKAGE_ROOT / "datasets").resolve()
 
+EXECUTION_BACKENDS = {"bigquery", "duckdb", "auto"}
+
 
 @dataclass(frozen=True)
 class BigQuerySettings:
@@ -28,6 +38,38 @@ class PromptSettings:
     instruction_file: Path
 
 
+@dataclass(frozen=True)
+class ExecutionSettings:
+    backend: str = "bigquery"
+    extract_directory: Optional[Path] = None
+    local_tables: List[str] = field(default_factory=list)
+    extract_row_limit: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class ModelRoutingSettings:
+    """Thresholds above which a question goes to the strong model; see ``selecta.model_router``."""
+
+    fast_max_words: int = 20
+    fast_max_tables: int = 1
+
+
+@dataclass(frozen=True)
+class SummaryTable:
+    """A table or materialized view that answers ``sql``; see ``selecta.workload``."""
+
+    table: str
+    sql: str
+
+
+@dataclass(frozen=True)
+class ApproximateSettings:
+    """Sampling for approximate queries; see ``selecta.approximate``."""
+
+    sample_percent: float = 10.0
+    large_tables: List[str] = field(default_factory=list)
+
+
 @dataclass(frozen=True)
 class DatasetConfig:
     id: str
@@ -37,6 +79,11 @@ class DatasetConfig:
     bigquery: BigQuerySettings
     prompt: PromptSettings
     path: Path
+    execution: ExecutionSettings = field(default_factory=ExecutionSettings)
+    summary_tables: List[SummaryTable] = field(default_factory=list)
+    models: List[str] = field(default_factory=list)
+    model_routing: ModelRoutingSettings = field(default_factory=ModelRoutingSettings)
+    approximate: ApproximateSettings = field(default_factory=ApproximateSettings)
 
 
 @dataclass(frozen=True)
@@ -48,7 +95,121 @@ class DatasetDescriptor:
     path: Path
 
 
+@dataclass(frozen=True)
+class _CatalogEntry:
+    mtime_ns: int
+    size: int
+    raw: Dict[str, Any]
+
+
+class DatasetCatalog:
+    """Cache of parsed dataset YAML files keyed by path, mtime and size.
+
+    Files are only re-parsed when their stat signature changes. When watching
+    is enabled a daemon thread rescans the directory periodically so newly
+    added descriptors appear without a restart and listing becomes a pure
+    in-memory read.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self._directory = directory
+        self._entries: Dict[Path, _CatalogEntry] = {}
+        self._descriptors: List[DatasetDescriptor] = []
+        self._lock = threading.RLock()
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watch_stop = threading.Event()
+
+    @property
+    def directory(self) -> Path:
+        return self._directory
+
+    def load(self, path: Path) -> Dict[str, Any]:
+        """Return the parsed YAML for ``path``, re-reading it only if it changed."""
+        resolved = path.resolve()
+        stat = resolved.stat()
+        with self._lock:
+            entry = self._entries.get(resolved)
+            if entry and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                return entry.raw
+        raw = _load_yaml(resolved) or {}
+        with self._lock:
+            self._entries[resolved] = _CatalogEntry(
+                mtime_ns=stat.st_mtime_ns, size=stat.st_size, raw=raw
+            )
+        return raw
+
+    def refresh(self) -> bool:
+        """Rescan the directory. Returns True when the descriptor list changed."""
+        paths: List[Path] = []
+        if self._directory.exists():
+            paths = sorted(
+                path.resolve()
+                for path in self._directory.iterdir()
+                if path.suffix in {".yaml", ".yml"} and path.is_file()
+            )
+
+        descriptors: List[DatasetDescriptor] = []
+        for path in paths:
+            try:
+                raw = self.load(path)
+            except Exception:
+                continue
+            descriptors.append(_descriptor_from_raw(raw, path))
+
+        with self._lock:
+            live = set(paths)
+            for stale in [p for p in self._entries if p.parent == self._directory and p not in live]:
+                del self._entries[stale]
+            changed = descriptors != self._descriptors
+            self._descriptors = descriptors
+        return changed
+
+    def descriptors(self) -> List[DatasetDescriptor]:
+        if not self.is_watching():
+            self.refresh()
+        with self._lock:
+            return list(self._descriptors)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._descriptors = []
+
+    def is_watching(self) -> bool:
+        return self._watch_thread is not None and self._watch_thread.is_alive()
+
+    def start_watching(self, interval_seconds: float = DATASET_WATCH_INTERVAL_SECONDS) -> None:
+        if self.is_watching():
+            return
+        self.refresh()
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(
+            target=self._watch_loop,
+            args=(interval_seconds,),
+            name="selecta-dataset-watch",
+            daemon=True,
+        )
+        self._watch_thread.start()
+
+    def stop_watching(self) -> None:
+        self._watch_stop.set()
+        thread = self._watch_thread
+        if thread is not None:
+            thread.join(timeout=5)
+        self._watch_thread = None
+
+    def _watch_loop(self, interval_seconds: float) -> None:
+        while not self._watch_stop.wait(interval_seconds):
+            try:
+                if self.refresh():
+                    logger.info("Dataset catalog changed in %s", self._directory)
+                _invalidate_active_config_if_changed()
+            except Exception:  # pragma: no cover - defensive logging
+                logger.error("Dataset catalog refresh failed", exc_info=True)
+
+
 _DATASET_CONFIG_OVERRIDE: Optional[Path] = None
+_ACTIVE_CONFIG_SIGNATURE: Optional[tuple] = None
 
 
 def _dataset_directory() -> Path:
@@ -67,6 +228,38 @@ def _load_yaml(path: Path) -> Dict[str, Any]:
         return yaml.safe_load(handle)
 
 
+def _descriptor_from_raw(raw: Dict[str, Any], path: Path) -> DatasetDescriptor:
+    return DatasetDescriptor(
+        id=(raw.get("id") or path.stem),
+        display_name=raw.get("display_name"),
+        description=raw.get("description"),
+        model=raw.get("model") or MODEL,
+        path=path.resolve(),
+    )
+
+
+_CATALOG = DatasetCatalog(_DATASET_DIR)
+
+
+def get_dataset_catalog() -> DatasetCatalog:
+    return _CATALOG
+
+
+def _stat_signature(path: Path) -> Optional[tuple]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _invalidate_active_config_if_changed() -> None:
+    signature = _stat_signature(get_active_dataset_path())
+    if _ACTIVE_CONFIG_SIGNATURE is not None and signature != _ACTIVE_CONFIG_SIGNATURE:
+        logger.info("Active dataset configuration changed on disk; clearing cache.")
+        get_dataset_config.cache_clear()
+
+
 def set_dataset_config_path(path: Path) -> None:
     resolved = Path(path).expanduser().resolve()
     if not resolved.exists():
@@ -92,7 +285,9 @@ def get_dataset_config() -> DatasetConfig:
     if not config_path.exists():
         raise FileNotFoundError(f"Dataset configuration file not found: {config_path}")
 
-    raw = _load_yaml(config_path)
+    global _ACTIVE_CONFIG_SIGNATURE
+    _ACTIVE_CONFIG_SIGNATURE = _stat_signature(config_path)
+    raw = _CATALOG.load(config_path)
 
     bigquery_raw = raw.get("bigquery") or {}
     bigquery = BigQuerySettings(
@@ -113,7 +308,46 @@ def get_dataset_config() -> DatasetConfig:
         instruction_file=_resolve_path(config_path.parent, instruction_file),
     )
 
-    model = raw.get("model") or MODEL
+    models = [str(name).strip() for name in raw.get("models") or [] if str(name).strip()]
+    model = raw.get("model") or (models[-1] if models else MODEL)
+    routing_raw = raw.get("model_routing") or {}
+    model_routing = ModelRoutingSettings(
+        fast_max_words=int(routing_raw.get("fast_max_words", ModelRoutingSettings.fast_max_words)),
+        fast_max_tables=int(routing_raw.get("fast_max_tables", ModelRoutingSettings.fast_max_tables)),
+    )
+
+    execution_raw = raw.get("execution") or {}
+    extracts_raw = execution_raw.get("local_extracts") or {}
+    backend = (execution_raw.get("backend") or "bigquery").strip().lower()
+    if backend not in EXECUTION_BACKENDS:
+        raise ValueError(
+            f"execution.backend must be one of {sorted(EXECUTION_BACKENDS)}; got '{backend}'."
+        )
+    extract_directory = extracts_raw.get("directory")
+    row_limit = extracts_raw.get("row_limit")
+    execution = ExecutionSettings(
+        backend=backend,
+        extract_directory=(
+            _resolve_path(config_path.parent, extract_directory) if extract_directory else None
+        ),
+        local_tables=list(extracts_raw.get("tables") or []),
+        extract_row_limit=int(row_limit) if row_limit else None,
+    )
+
+    summary_tables = []
+    for entry in raw.get("summary_tables") or []:
+        if not entry.get("table") or not entry.get("sql"):
+            raise ValueError("Each summary_tables entry needs a 'table' and the 'sql' it materializes.")
+        summary_tables.append(SummaryTable(table=str(entry["table"]).strip().strip("`"), sql=str(entry["sql"])))
+
+    approximate_raw = raw.get("approximate") or {}
+    sample_percent = float(approximate_raw.get("sample_percent", ApproximateSettings.sample_percent))
+    if not 0 < sample_percent <= 100:
+        raise ValueError(f"approximate.sample_percent must be in (0, 100]; got {sample_percent}.")
+    approximate = ApproximateSettings(
+        sample_percent=sample_percent,
+        large_tables=[str(name).strip().strip("`") for name in approximate_raw.get("large_tables") or []],
+    )
 
     return DatasetConfig(
         id=raw.get("id", ""),
@@ -123,6 +357,11 @@ def get_dataset_config() -> DatasetConfig:
         bigquery=bigquery,
         prompt=prompt,
         path=config_path,
+        execution=execution,
+        summary_tables=summary_tables,
+        models=models or [model],
+        model_routing=model_routing,
+        approximate=approximate,
     )
 
 
@@ -130,6 +369,10 @@ def get_bigquery_settings() -> BigQuerySettings:
     return get_dataset_config().bigquery
 
 
+def get_execution_settings() -> ExecutionSettings:
+    return get_dataset_config().execution
+
+
 def get_prompt_settings() -> PromptSettings:
     return get_dataset_config().prompt
 
@@ -139,26 +382,7 @@ def get_model() -> str:
 
 
 def list_dataset_descriptors() -> List[DatasetDescriptor]:
-    descriptors: List[DatasetDescriptor] = []
-    dataset_dir = _dataset_directory()
-    if not dataset_dir.exists():
-        return descriptors
-
-    for path in sorted(dataset_dir.glob("*.ya?ml")):
-        try:
-            raw = _load_yaml(path)
-        except Exception:
-            continue
-        descriptors.append(
-            DatasetDescriptor(
-                id=(raw.get("id") or path.stem),
-                display_name=raw.get("display_name"),
-                description=raw.get("description"),
-                model=raw.get("model") or MODEL,
-                path=path.resolve(),
-            )
-        )
-    return descriptors
+    return _CATALOG.descriptors()
 
 
 def get_active_dataset_descriptor() -> DatasetDescriptor:
@@ -170,3 +394,7 @@ def get_active_dataset_descriptor() -> DatasetDescriptor:
         model=config.model,
         path=config.path,
     )
+
+
+if DATASET_WATCH_ENABLED:
+    _CATALOG.start_watching()
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import os
+import tempfile
 from pathlib import Path
 
 _DEFAULT_MODEL = "gemini-2.5-pro-preview-03-25"
@@ -41,3 +42,41 @@ def _env_bool(name: str, default: bool) -> bool:
 AUTO_VIZ_ENABLED = _env_bool("SELECTA_AUTOVISUALIZE", True)
 VIZ_MAX_ROWS = int(os.getenv("SELECTA_VIZ_MAX_ROWS", "500"))
 VIZ_MAX_DISTINCT = int(os.getenv("SELECTA_VIZ_MAX_DISTINCT", "20"))
+DATASET_WATCH_ENABLED = _env_bool("SELECTA_DATASET_WATCH", False)
+DATASET_WATCH_INTERVAL_SECONDS = float(os.getenv("SELECTA_DATASET_WATCH_INTERVAL", "2.0"))
+METRICS_PORT = int(os.getenv("SELECTA_METRICS_PORT", "0"))
+OTEL_ENABLED = _env_bool("SELECTA_OTEL_ENABLED", False)
+JOB_PLAN_MAX_STAGES = int(os.getenv("SELECTA_JOB_PLAN_MAX_STAGES", "5"))
+QUERY_MAX_CONCURRENT = int(os.getenv("SELECTA_MAX_CONCURRENT_QUERIES", "8"))
+QUERY_MAX_CONCURRENT_PER_USER = int(os.getenv("SELECTA_MAX_CONCURRENT_QUERIES_PER_USER", "2"))
+QUERY_QUEUE_SIZE = int(os.getenv("SELECTA_QUERY_QUEUE_SIZE", "32"))
+QUERY_QUEUE_TIMEOUT_SECONDS = float(os.getenv("SELECTA_QUERY_QUEUE_TIMEOUT", "60"))
+RESULT_SPILL_THRESHOLD_ROWS = int(os.getenv("SELECTA_SPILL_THRESHOLD_ROWS", "5000"))
+RESULT_SPILL_PREVIEW_ROWS = int(os.getenv("SELECTA_SPILL_PREVIEW_ROWS", "200"))
+RESULT_SPILL_TTL_SECONDS = float(os.getenv("SELECTA_SPILL_TTL_SECONDS", "86400"))
+RESULT_SPILL_DIR = Path(
+    os.getenv("SELECTA_RESULT_SPILL_DIR") or Path(tempfile.gettempdir()) / "selecta-results"
+).expanduser()
+PAGE_MAX_ROWS = int(os.getenv("SELECTA_PAGE_MAX_ROWS", "1000"))
+QUERY_RETRY_MAX_ATTEMPTS = int(os.getenv("SELECTA_QUERY_RETRY_MAX_ATTEMPTS", "3"))
+QUERY_RETRY_INITIAL_BACKOFF_SECONDS = float(os.getenv("SELECTA_QUERY_RETRY_INITIAL_BACKOFF", "1.0"))
+QUERY_RETRY_MAX_BACKOFF_SECONDS = float(os.getenv("SELECTA_QUERY_RETRY_MAX_BACKOFF", "16.0"))
+QUERY_RETRY_MULTIPLIER = float(os.getenv("SELECTA_QUERY_RETRY_MULTIPLIER", "2.0"))
+PARTITION_FILTER_MODE = os.getenv("SELECTA_PARTITION_FILTER_MODE", "warn").strip().lower()
+AUTO_LIMIT_ROWS = int(os.getenv("SELECTA_AUTO_LIMIT_ROWS", "0"))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("SELECTA_RESULT_CACHE_TTL_SECONDS", "300"))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("SELECTA_RESULT_CACHE_MAX_ENTRIES", "128"))
+RESULT_CACHE_MAX_ROWS = int(os.getenv("SELECTA_RESULT_CACHE_MAX_ROWS", "5000"))
+QUESTION_CACHE_MAX_ENTRIES = int(os.getenv("SELECTA_QUESTION_CACHE_MAX_ENTRIES", "256"))
+QUESTION_CACHE_TTL_SECONDS = float(os.getenv("SELECTA_QUESTION_CACHE_TTL_SECONDS", "86400"))
+QUESTION_CACHE_SIMILARITY = float(os.getenv("SELECTA_QUESTION_CACHE_SIMILARITY", "1.0"))
+CONTEXT_CACHE_ENABLED = _env_bool("SELECTA_CONTEXT_CACHE", False)
+CONTEXT_CACHE_TTL_SECONDS = float(os.getenv("SELECTA_CONTEXT_CACHE_TTL_SECONDS", "3600"))
+CONTEXT_CACHE_RETRY_SECONDS = float(os.getenv("SELECTA_CONTEXT_CACHE_RETRY_SECONDS", "600"))
+BATCH_MAX_QUERIES = int(os.getenv("SELECTA_BATCH_MAX_QUERIES", "5"))
+SHARED_CACHE_PATH = os.getenv("SELECTA_SHARED_CACHE_PATH", "")
+QUERY_LOG_PATH = os.getenv("SELECTA_QUERY_LOG_PATH", "")
+INCREMENTAL_REFRESH_ENABLED = _env_bool("SELECTA_INCREMENTAL_REFRESH", False)
+INCREMENTAL_MAX_ENTRIES = int(os.getenv("SELECTA_INCREMENTAL_MAX_ENTRIES", "64"))
+INCREMENTAL_TTL_SECONDS = float(os.getenv("SELECTA_INCREMENTAL_TTL_SECONDS", "604800"))
+SHORT_QUERY_MODE = _env_bool("SELECTA_SHORT_QUERY_MODE", False)
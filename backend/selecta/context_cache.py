@@ -0,0 +1,194 @@
+"""Provider-side caching of the static system instruction.
+
+The instruction built by :func:`selecta.instructions.return_instructions_bigquery`
+(plus the tool declarations ADK attaches to every request) is identical for
+every turn of every session on a dataset. With ``SELECTA_CONTEXT_CACHE=true``
+the :func:`selecta.callbacks.use_cached_instruction` before-model callback
+registers that prefix once through the Gemini ``caches.create`` API and
+rewrites each request to reference it via ``config.cached_content``, so the
+model no longer re-processes the prompt on every call.
+
+A cache entry is keyed by the model, the schema snapshot and a hash of the
+instruction and tools; a new snapshot creates a fresh cache and deletes the
+old one. Entries are renewed shortly before their TTL runs out. When the
+provider rejects the request (unsupported model, prompt below the minimum
+cacheable size, missing credentials ...) the request is sent unchanged and
+creation is not retried for ``SELECTA_CONTEXT_CACHE_RETRY_SECONDS``.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from .constants import CONTEXT_CACHE_RETRY_SECONDS, CONTEXT_CACHE_TTL_SECONDS
+from .telemetry import get_registry, stage
+
+logger = logging.getLogger(__name__)
+
+
+def _default_client() -> Any:
+    from google import genai
+
+    return genai.Client()
+
+
+@dataclass
+class CachedInstruction:
+    name: str
+    key: str
+    model: str
+    snapshot: str
+    expires_at: float
+
+
+def _fingerprint(model: str, snapshot: str, config: Any) -> str:
+    tools = [tool.model_dump(mode="json", exclude_none=True) for tool in config.tools or []]
+    tool_config = config.tool_config.model_dump(mode="json", exclude_none=True) if config.tool_config else None
+    instruction = config.system_instruction
+    if hasattr(instruction, "model_dump"):
+        instruction = instruction.model_dump(mode="json", exclude_none=True)
+    payload = json.dumps(
+        [model, snapshot, instruction, tools, tool_config], sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class InstructionCache:
+    def __init__(
+        self,
+        client_factory: Callable[[], Any] = _default_client,
+        ttl_seconds: float = CONTEXT_CACHE_TTL_SECONDS,
+        retry_seconds: float = CONTEXT_CACHE_RETRY_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.retry_seconds = retry_seconds
+        self._client_factory = client_factory
+        self._client: Any = None
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: Dict[str, CachedInstruction] = {}
+        self._failed_until: Dict[str, float] = {}
+        self._creating: Dict[str, threading.Event] = {}
+
+    def _get_client(self) -> Any:
+        if self._client is None:
+            self._client = self._client_factory()
+        return self._client
+
+    def _refresh_margin(self) -> float:
+        return min(60.0, self.ttl_seconds / 10)
+
+    def apply(self, llm_request: Any, snapshot: str) -> Optional[str]:
+        """Point ``llm_request`` at the cached instruction; returns the cache name or ``None``."""
+        config = getattr(llm_request, "config", None)
+        model = getattr(llm_request, "model", None)
+        if config is None or not model or not config.system_instruction or config.cached_content:
+            return None
+        registry = get_registry()
+        key = _fingerprint(model, snapshot, config)
+        # Provider calls run outside the lock; callers that find a creation in
+        # flight for the same key wait for it instead of creating their own.
+        while True:
+            now = self._clock()
+            with self._lock:
+                if self._failed_until.get(key, 0) > now:
+                    registry.increment("selecta_context_cache_requests_total", outcome="disabled")
+                    return None
+                entry = self._entries.get(model)
+                current = entry is not None and entry.key == key
+                if current and entry.expires_at - self._refresh_margin() > now:
+                    pending = None
+                    break
+                pending = self._creating.get(key)
+                if pending is None:
+                    pending = self._creating[key] = threading.Event()
+                    break
+            pending.wait()
+
+        if pending is None:
+            outcome = "hit"
+        else:
+            outcome = "refresh" if current else "create"
+            created = None
+            try:
+                created = self._create(model, snapshot, key, config)
+            finally:
+                with self._lock:
+                    del self._creating[key]
+                    stale = self._entries.get(model)
+                    if created is None:
+                        self._failed_until[key] = now + self.retry_seconds
+                    else:
+                        self._entries[model] = created
+                pending.set()
+            if created is None:
+                registry.increment("selecta_context_cache_requests_total", outcome="error")
+                return None
+            if stale is not None and stale.name != created.name:
+                self._delete(stale.name)
+            entry = created
+        registry.increment("selecta_context_cache_requests_total", outcome=outcome)
+        config.system_instruction = None
+        config.tools = None
+        config.tool_config = None
+        config.cached_content = entry.name
+        return entry.name
+
+    def _create(self, model: str, snapshot: str, key: str, config: Any) -> Optional[CachedInstruction]:
+        from google.genai import types
+
+        try:
+            with stage("context_cache_create", model=model):
+                cached = self._get_client().caches.create(
+                    model=model,
+                    config=types.CreateCachedContentConfig(
+                        display_name=f"selecta-{snapshot}",
+                        system_instruction=config.system_instruction,
+                        tools=config.tools,
+                        tool_config=config.tool_config,
+                        ttl=f"{int(self.ttl_seconds)}s",
+                    ),
+                )
+        except Exception as exc:
+            logger.warning("Context caching unavailable for %s: %s", model, exc)
+            return None
+        expire_time = getattr(cached, "expire_time", None)
+        expires_at = expire_time.timestamp() if hasattr(expire_time, "timestamp") else self._clock() + self.ttl_seconds
+        logger.info("Cached instruction for %s as %s (snapshot %s)", model, cached.name, snapshot)
+        return CachedInstruction(name=cached.name, key=key, model=model, snapshot=snapshot, expires_at=expires_at)
+
+    def _delete(self, name: str) -> None:
+        try:
+            self._get_client().caches.delete(name=name)
+        except Exception as exc:
+            logger.debug("Failed to delete cached instruction %s: %s", name, exc)
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Forget the entry called ``name`` (or all entries) so the next request recreates it."""
+        with self._lock:
+            for model, entry in list(self._entries.items()):
+                if name is None or entry.name == name:
+                    del self._entries[model]
+                    get_registry().increment("selecta_context_cache_invalidations_total", model=model)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._failed_until.clear()
+
+
+_INSTRUCTION_CACHE = InstructionCache()
+
+
+def get_instruction_cache() -> InstructionCache:
+    return _INSTRUCTION_CACHE
+
+
+def set_instruction_cache(cache: Optional[InstructionCache]) -> None:
+    global _INSTRUCTION_CACHE
+    _INSTRUCTION_CACHE = cache or InstructionCache()
@@ -0,0 +1,234 @@
+"""Partition- and cluster-aware checks applied to SQL before it is submitted.
+
+Partitioning and clustering columns are loaded from
+``INFORMATION_SCHEMA.COLUMNS`` when the prompt is built (next to the DDL) and
+kept per dataset. :func:`lint_query` then inspects every query:
+
+* a query over a partitioned table with no predicate on its partition column
+  in any ``WHERE`` clause is reported, or rejected with
+  :class:`CostLintError` when ``SELECTA_PARTITION_FILTER_MODE=reject``;
+* with ``SELECTA_AUTO_LIMIT_ROWS`` set, an exploratory ``SELECT`` without
+  aggregation or a trailing ``LIMIT`` gets one appended;
+* a query answered by one of the dataset's ``summary_tables`` is rewritten to
+  read that table (see :mod:`selecta.workload`); the checks above then apply
+  to the rewritten SQL.
+
+Both checks are textual heuristics: they err towards letting a query through
+rather than blocking valid SQL. Every warning and rewrite is returned so the
+tool can report it in the result payload.
+"""
+
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .config_loader import BigQuerySettings, SummaryTable, get_bigquery_settings, get_dataset_config
+from .constants import AUTO_LIMIT_ROWS, PARTITION_FILTER_MODE
+from .execution import referenced_tables
+from .telemetry import get_registry
+from .workload import route_to_summary
+
+PARTITION_FILTER_MODES = {"off", "warn", "reject"}
+
+_INGESTION_TIME_COLUMNS = ("_PARTITIONTIME", "_PARTITIONDATE")
+
+_COMMENTS_AND_LITERALS = re.compile(
+    r"--[^\n]*|#[^\n]*|/\*.*?\*/|'(?:\\.|[^'\\])*'|\"(?:\\.|[^\"\\])*\"",
+    re.DOTALL,
+)
+_WHERE_CLAUSE = re.compile(
+    r"\bWHERE\b(?P<body>.*?)(?=\bGROUP\s+BY\b|\bORDER\s+BY\b|\bHAVING\b|\bQUALIFY\b|\bWINDOW\b"
+    r"|\bLIMIT\b|\bUNION\b|\bINTERSECT\b|\bEXCEPT\b|$)",
+    re.IGNORECASE | re.DOTALL,
+)
+_AGGREGATION = re.compile(
+    r"\bGROUP\s+BY\b|\b(?:COUNT|COUNTIF|SUM|AVG|MIN|MAX|ANY_VALUE|ARRAY_AGG|STRING_AGG|"
+    r"LOGICAL_AND|LOGICAL_OR|STDDEV\w*|VAR\w*|CORR|COVAR\w*|APPROX_\w+|HLL_COUNT\.\w+)\s*\(",
+    re.IGNORECASE,
+)
+_TRAILING_LIMIT = re.compile(r"\bLIMIT\s+\d+(?:\s+OFFSET\s+\d+)?\s*$", re.IGNORECASE)
+_SELECT_START = re.compile(r"^\s*\(?\s*(?:SELECT|WITH)\b", re.IGNORECASE)
+
+
+class CostLintError(ValueError):
+    """Raised when a query is rejected for scanning a partitioned table unfiltered."""
+
+
+@dataclass(frozen=True)
+class TablePartitioning:
+    table: str
+    partition_column: Optional[str] = None
+    partition_data_type: Optional[str] = None
+    clustering_columns: Tuple[str, ...] = ()
+
+
+@dataclass
+class LintResult:
+    sql: str
+    warnings: List[Dict[str, Any]] = field(default_factory=list)
+    rewrites: List[Dict[str, Any]] = field(default_factory=list)
+
+
+# ---------------------------------------------------------------------------
+# Partitioning metadata
+# ---------------------------------------------------------------------------
+
+_PARTITIONING: Dict[Tuple[str, str], Dict[str, TablePartitioning]] = {}
+_PARTITIONING_LOCK = threading.Lock()
+
+
+def _dataset_key(settings: BigQuerySettings) -> Tuple[str, str]:
+    return settings.data_project_id, settings.dataset
+
+
+def set_table_partitioning(
+    partitioning: Dict[str, Any], settings: Optional[BigQuerySettings] = None
+) -> Dict[str, TablePartitioning]:
+    """Store partitioning for the active dataset; accepts raw dicts or dataclasses."""
+    settings = settings or get_bigquery_settings()
+    tables = {
+        name: value
+        if isinstance(value, TablePartitioning)
+        else TablePartitioning(
+            table=name,
+            partition_column=value.get("partition_column"),
+            partition_data_type=value.get("partition_data_type"),
+            clustering_columns=tuple(value.get("clustering_columns") or ()),
+        )
+        for name, value in partitioning.items()
+    }
+    with _PARTITIONING_LOCK:
+        _PARTITIONING[_dataset_key(settings)] = tables
+    return tables
+
+
+def load_table_partitioning(settings: Optional[BigQuerySettings] = None) -> Dict[str, TablePartitioning]:
+    """Fetch partitioning metadata from BigQuery and remember it for the dataset."""
+    from .utils import fetch_table_partitioning
+
+    return set_table_partitioning(fetch_table_partitioning(), settings)
+
+
+def get_table_partitioning(settings: Optional[BigQuerySettings] = None) -> Dict[str, TablePartitioning]:
+    """Return the metadata loaded for the dataset (empty until the prompt is built)."""
+    settings = settings or get_bigquery_settings()
+    with _PARTITIONING_LOCK:
+        return _PARTITIONING.get(_dataset_key(settings), {})
+
+
+def describe_partitioning(partitioning: Dict[str, TablePartitioning]) -> str:
+    """One line per partitioned or clustered table, for the prompt."""
+    lines = []
+    for name in sorted(partitioning):
+        table = partitioning[name]
+        parts = []
+        if table.partition_column:
+            parts.append(f"partitioned by `{table.partition_column}` ({table.partition_data_type or 'unknown'})")
+        if table.clustering_columns:
+            parts.append("clustered by " + ", ".join(f"`{column}`" for column in table.clustering_columns))
+        if parts:
+            lines.append(f"- `{name}`: " + "; ".join(parts))
+    return "\n".join(lines)
+
+
+# ---------------------------------------------------------------------------
+# Checks
+# ---------------------------------------------------------------------------
+
+
+def _mask(sql_query: str) -> str:
+    """Blank out comments and string literals so keywords inside them are ignored."""
+
+    def _replace(match: "re.Match[str]") -> str:
+        token = match.group(0)
+        return "''" if token[0] in "'\"" else " "
+
+    return _COMMENTS_AND_LITERALS.sub(_replace, sql_query)
+
+
+def has_partition_predicate(sql_query: str, column: str) -> bool:
+    masked = _mask(sql_query)
+    names = _INGESTION_TIME_COLUMNS if column.upper() in _INGESTION_TIME_COLUMNS else (column,)
+    pattern = re.compile(r"\b(?:" + "|".join(re.escape(name) for name in names) + r")\b", re.IGNORECASE)
+    return any(pattern.search(match.group("body")) for match in _WHERE_CLAUSE.finditer(masked))
+
+
+def is_exploratory_select(sql_query: str) -> bool:
+    """True for a SELECT with no aggregation and no trailing LIMIT."""
+    masked = _mask(sql_query).strip().rstrip(";").strip()
+    if not _SELECT_START.match(masked):
+        return False
+    return not _AGGREGATION.search(masked) and not _TRAILING_LIMIT.search(masked)
+
+
+def lint_query(
+    sql_query: str,
+    partitioning: Optional[Dict[str, TablePartitioning]] = None,
+    mode: str = PARTITION_FILTER_MODE,
+    auto_limit_rows: int = AUTO_LIMIT_ROWS,
+    settings: Optional[BigQuerySettings] = None,
+    summary_tables: Optional[Sequence[SummaryTable]] = None,
+) -> LintResult:
+    """Check ``sql_query`` and return the SQL to run plus warnings and rewrites."""
+    if mode not in PARTITION_FILTER_MODES:
+        raise ValueError(f"Unsupported partition filter mode: {mode!r}")
+    result = LintResult(sql=sql_query)
+    registry = get_registry()
+
+    summary_tables = get_dataset_config().summary_tables if summary_tables is None else summary_tables
+    if summary_tables:
+        settings = settings or get_bigquery_settings()
+        routed = route_to_summary(sql_query, summary_tables, settings)
+        if routed is not None:
+            summary, sql_query = routed
+            result.sql = sql_query
+            result.rewrites.append(
+                {
+                    "rule": "summary_table",
+                    "table": summary.table,
+                    "message": f"Answered from the summary table `{summary.table}`.",
+                }
+            )
+            registry.increment("selecta_cost_lint_total", rule="summary_table", action="rewrite")
+
+    if mode != "off":
+        settings = settings or get_bigquery_settings()
+        partitioning = get_table_partitioning(settings) if partitioning is None else partitioning
+        missing = []
+        for table in sorted(referenced_tables(sql_query, settings)):
+            info = partitioning.get(table)
+            if info is None or not info.partition_column:
+                continue
+            if not has_partition_predicate(sql_query, info.partition_column):
+                missing.append(info)
+        for info in missing:
+            message = (
+                f"Table `{info.table}` is partitioned by `{info.partition_column}` but the query does not "
+                "filter on it, so every partition is scanned."
+            )
+            if info.clustering_columns:
+                message += " Filters on the clustering columns (" + ", ".join(info.clustering_columns) + ") also reduce bytes scanned."
+            result.warnings.append(
+                {
+                    "rule": "missing_partition_filter",
+                    "table": info.table,
+                    "column": info.partition_column,
+                    "message": message,
+                }
+            )
+            registry.increment("selecta_cost_lint_total", rule="missing_partition_filter", action=mode)
+        if missing and mode == "reject":
+            details = " ".join(warning["message"] for warning in result.warnings)
+            raise CostLintError(f"{details} Add a filter on the partition column and try again.")
+
+    if auto_limit_rows > 0 and is_exploratory_select(sql_query):
+        result.sql = sql_query.rstrip().rstrip(";").rstrip() + f"\nLIMIT {auto_limit_rows}"
+        result.rewrites.append(
+            {
+                "rule": "auto_limit",
+                "message": f"Added LIMIT {auto_limit_rows} to a SELECT without aggregation.",
+            }
+        )
+        registry.increment("selecta_cost_lint_total", rule="auto_limit", action="rewrite")
+    return result
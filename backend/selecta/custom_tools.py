@@ -16,16 +16,45 @@ import logging
 import re
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
 from datetime import date, datetime
 from decimal import Decimal
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 from google.api_core import exceptions as google_exceptions
 from google.cloud import bigquery
-from google.auth import exceptions as auth_exceptions
 
-from .config_loader import get_bigquery_settings
+from .approximate import ApproximateQuery, approximate_query
+from .config_loader import get_bigquery_settings, get_dataset_config, get_execution_settings
+from .cost_lint import LintResult, get_table_partitioning, lint_query
+from .constants import BATCH_MAX_QUERIES, INCREMENTAL_REFRESH_ENABLED, PAGE_MAX_ROWS, RESULT_SPILL_PREVIEW_ROWS
+from .execution import BigQueryBackend, backend_name_for, execution_path_for, reattach_job, submit_query
+from .incremental import (
+    IncrementalEntry,
+    IncrementalPlan,
+    IncrementalUnavailable,
+    get_incremental_cache,
+    incremental_sql,
+    merge_buckets,
+    plan_incremental,
+    probe_sql,
+    refresh_start,
+    resolve_window,
+)
+from .instructions import schema_snapshot
+from .job_stats import record_job_metrics, summarize_job
+from .question_cache import QUESTION_REPLAY_STATE_KEY, get_question_cache, question_text
+from .result_cache import get_result_cache
+from .result_store import get_result_store
+from .retry import get_retry_policy
+from .scheduler import caller_identity, get_scheduler
+from .shared_store import register_type
+from .singleflight import get_single_flight, query_key
+from .telemetry import get_registry, stage
+from .transform import load_result_table, transform_table
 from .visualization import build_chart_bundle, build_chart_spec
+from .workload import get_query_log
 
 logging.basicConfig(
     level=logging.INFO,
@@ -133,6 +162,17 @@ def _record_query_error(tool_context: Optional[Any], sql_query: str, error: Exce
     state["errors_history"] = history
 
 
+def _record_query_result(tool_context: Any, result_payload: Dict[str, Any]) -> None:
+    try:
+        tool_context.state.pop("latest_error", None)
+    except AttributeError:
+        pass
+    tool_context.state["latest_result"] = result_payload
+    history: List[Dict[str, Any]] = list(tool_context.state.get("results_history", []))
+    history.append(result_payload.copy())
+    tool_context.state["results_history"] = history
+
+
 def _normalize_value(value: Any) -> Any:
     if isinstance(value, Decimal):
         return float(value)
@@ -147,74 +187,775 @@ def _normalize_value(value: Any) -> Any:
     return value
 
 
-def _normalize_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    return [{key: _normalize_value(value) for key, value in row.items()} for row in rows]
+_TEMPORAL_CLASSES = (date, datetime)
+# Types the BigQuery client already returns as JSON-ready Python values (TIME is left as is, as above).
+_PASSTHROUGH_TYPES = {"INT64", "INTEGER", "FLOAT64", "FLOAT", "BOOL", "BOOLEAN", "STRING", "TIME", "GEOGRAPHY"}
+_NUMERIC_TYPES = {"NUMERIC", "BIGNUMERIC", "DECIMAL", "BIGDECIMAL"}
+_TEMPORAL_TYPES = {"DATE", "DATETIME", "TIMESTAMP"}
+
+RowConverter = Callable[[Any], Any]
+
+
+def _convert_numeric(value: Any) -> Any:
+    return float(value) if value.__class__ is Decimal else _normalize_value(value)
+
+
+def _convert_temporal(value: Any) -> Any:
+    return value.isoformat() if value.__class__ in _TEMPORAL_CLASSES else _normalize_value(value)
+
+
+def _convert_bytes(value: Any) -> Any:
+    return value.decode("utf-8", errors="ignore") if value.__class__ is bytes else _normalize_value(value)
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _field_converter(schema_field: Any) -> Optional[RowConverter]:
+    """Converter for one schema field, or ``None`` when values pass through unchanged.
+
+    Each converter handles the type the client returns for the field and hands
+    anything else to ``_normalize_value``, so the output is the same as the
+    generic path.
+    """
+    field_type = (schema_field.field_type or "").upper()
+    if field_type in {"RECORD", "STRUCT"}:
+        fields = {sub_field.name: _field_converter(sub_field) or _identity for sub_field in schema_field.fields}
+
+        def convert(value: Any) -> Any:
+            if value.__class__ is not dict:
+                return _normalize_value(value)
+            return {key: fields.get(key, _normalize_value)(item) for key, item in value.items()}
+
+    elif field_type in _PASSTHROUGH_TYPES:
+        convert = None
+    elif field_type in _NUMERIC_TYPES:
+        convert = _convert_numeric
+    elif field_type in _TEMPORAL_TYPES:
+        convert = _convert_temporal
+    elif field_type == "BYTES":
+        convert = _convert_bytes
+    else:
+        convert = _normalize_value
+
+    if (schema_field.mode or "").upper() != "REPEATED":
+        return convert
+    element = convert or _identity
+
+    def convert_repeated(value: Any) -> Any:
+        if value.__class__ is not list:
+            return _normalize_value(value)
+        return [element(item) for item in value]
+
+    return convert_repeated
+
+
+def _compile_row_plan(schema: Sequence[Any], first_row: Dict[str, Any]) -> Optional[List[Tuple[str, RowConverter]]]:
+    """Per-column converters for rows shaped like ``schema``; ``None`` if the rows do not match it."""
+    if [schema_field.name for schema_field in schema] != list(first_row):
+        return None
+    plan = []
+    for schema_field in schema:
+        converter = _field_converter(schema_field)
+        if converter is not None:
+            plan.append((schema_field.name, converter))
+    return plan
+
+
+def _normalize_rows(rows: List[Dict[str, Any]], schema: Optional[Sequence[Any]] = None) -> List[Dict[str, Any]]:
+    """Make rows JSON-ready; with the result ``schema`` only columns that need it are converted."""
+    plan = _compile_row_plan(schema, rows[0]) if schema and rows else None
+    if plan is None:
+        return [{key: _normalize_value(value) for key, value in row.items()} for row in rows]
+    normalized = []
+    append = normalized.append
+    for row in rows:
+        converted = row.copy()
+        for name, convert in plan:
+            converted[name] = convert(converted[name])
+        append(converted)
+    return normalized
+
+
+@register_type
+@dataclass(frozen=True)
+class _QueryOutcome:
+    rows: List[Dict[str, Any]]
+    job_id: Optional[str]
+    backend: str
+    job_stats: Optional[Dict[str, Any]]
+    admission_wait_ms: float
+    retries: int = 0
+    cache_hit: bool = False
+    incremental: Optional[Dict[str, Any]] = None
+    execution_path: Optional[str] = None
+
+
+class _QueryFailure(Exception):
+    """Carries the job id of a failed execution alongside the original error."""
 
+    def __init__(self, error: Exception, job_id: Optional[str]) -> None:
+        super().__init__(str(error))
+        self.error = error
+        self.job_id = job_id
 
-def execute_bigquery_query(sql_query: str, tool_context: Optional[Any] = None) -> List[Dict[str, Any]]:
-    """Execute SQL against BigQuery using the configured billing project."""
+
+def _wait_with_retries(sql_query: str) -> "tuple[Any, List[Dict[str, Any]], Optional[Sequence[Any]], int]":
+    """Submit and wait for ``sql_query``, retrying transient BigQuery failures.
+
+    When the failed job is still alive (e.g. a flaky poll), the wait reattaches
+    to it through ``jobs.get`` instead of submitting a duplicate job.
+    """
+    policy = get_retry_policy()
+    query_job: Any = None
+    retries = 0
+    while True:
+        try:
+            if query_job is None:
+                with stage("job_submit"):
+                    query_job = submit_query(sql_query)
+            with stage("job_wait", backend=backend_name_for(query_job)):
+                rows = query_job.result()
+            with stage("row_fetch", backend=backend_name_for(query_job)):
+                return query_job, [dict(row.items()) for row in rows], getattr(rows, "schema", None), retries
+        except Exception as exc:
+            reason = policy.should_retry(exc, retries)
+            if reason is None:
+                raise _QueryFailure(exc, getattr(query_job, "job_id", None)) from exc
+            try:
+                query_job = reattach_job(query_job) if query_job is not None else None
+            except Exception as reattach_error:
+                logger.warning("Could not reattach to job: %s", reattach_error)
+                query_job = None
+            action = "reattach" if query_job is not None else "resubmit"
+            delay = policy.backoff(retries)
+            retries += 1
+            get_registry().increment("selecta_query_retries_total", reason=reason, action=action)
+            logger.warning(
+                "Transient BigQuery error (%s); retry %d (%s) in %.2fs", reason, retries, action, delay
+            )
+            with stage("retry_backoff"):
+                time.sleep(delay)
+
+
+def _run_query(sql_query: str, user_id: str, session_id: str) -> _QueryOutcome:
+    """Admit, submit, wait for and normalise one query; shared by coalesced callers."""
+    try:
+        with get_scheduler().admit(user_id, session_id) as admission:
+            query_job, data, schema, retries = _wait_with_retries(sql_query)
+        with stage("normalization"):
+            normalized = _normalize_rows(data, schema)
+    except Exception as exc:
+        get_registry().increment("selecta_queries_total", outcome="error")
+        if isinstance(exc, _QueryFailure):
+            raise
+        raise _QueryFailure(exc, None) from exc
+
+    backend_name = backend_name_for(query_job)
+    execution_path = execution_path_for(query_job)
+    get_registry().increment("selecta_queries_total", backend=backend_name, outcome="ok")
+    get_registry().increment("selecta_query_execution_path_total", path=execution_path)
+    get_registry().increment("selecta_query_rows_total", len(normalized), backend=backend_name)
+    job_stats = summarize_job(query_job)
+    record_job_metrics(job_stats, backend_name)
+    return _QueryOutcome(
+        rows=normalized,
+        job_id=getattr(query_job, "job_id", None),
+        backend=backend_name,
+        job_stats=job_stats,
+        admission_wait_ms=admission.wait_ms,
+        retries=retries,
+        execution_path=execution_path,
+    )
+
+
+def _take_question_replay(tool_context: Optional[Any], sql_query: str) -> bool:
+    """Consume the replay marker left by ``replay_cached_question``; True if it is for this SQL."""
+    state = getattr(tool_context, "state", None)
+    if state is None:
+        return False
+    replay = state.get(QUESTION_REPLAY_STATE_KEY)
+    if not replay:
+        return False
+    state[QUESTION_REPLAY_STATE_KEY] = None
+    return replay.get("sql") == sql_query
+
+
+def _is_standalone_question(tool_context: Any) -> bool:
+    """True when the current question is the first one in its session.
+
+    Follow-ups ("and for last year?") depend on earlier turns, so only opening
+    questions are remembered for replay.
+    """
+    session = getattr(tool_context, "session", None)
+    if session is None:
+        return True
+    user_turns = [
+        event
+        for event in getattr(session, "events", None) or []
+        if getattr(event, "author", None) == "user" and question_text(getattr(event, "content", None))
+    ]
+    return len(user_turns) <= 1
+
+
+def _remember_question(tool_context: Optional[Any], sql_query: str, replayed: bool) -> None:
+    if tool_context is None or replayed:
+        return
+    question = question_text(getattr(tool_context, "user_content", None))
+    if not question or not _is_standalone_question(tool_context):
+        return
+    get_question_cache().record(
+        get_dataset_config().id,
+        schema_snapshot(),
+        question,
+        sql_query,
+        invocation_id=getattr(tool_context, "invocation_id", None),
+    )
+
+
+def _forget_replayed_question(tool_context: Optional[Any]) -> None:
+    question = question_text(getattr(tool_context, "user_content", None))
+    if question:
+        get_question_cache().invalidate(get_dataset_config().id, question)
+
+
+def _cached_outcome(key: str, sql_query: str) -> Optional[_QueryOutcome]:
+    with stage("result_cache_lookup"):
+        outcome = get_result_cache().get(key, sql_query)
+    if outcome is None:
+        return None
+    return replace(outcome, admission_wait_ms=0.0, retries=0, cache_hit=True)
+
+
+def _incremental_plan(sql_query: str) -> Optional[IncrementalPlan]:
+    if not INCREMENTAL_REFRESH_ENABLED or get_execution_settings().backend == "duckdb":
+        return None
     settings = get_bigquery_settings()
-    start_time = time.time()
-    query_job: Optional[bigquery.job.QueryJob] = None
+    return plan_incremental(sql_query, get_table_partitioning(settings), settings)
 
+
+def _refresh_incrementally(
+    key: str, plan: IncrementalPlan, entry: IncrementalEntry, user_id: str, session_id: str
+) -> _QueryOutcome:
     try:
-        _ensure_supported_temporal_intervals(sql_query)
+        probe = _run_query(probe_sql(plan, entry.checked_at), user_id, session_id)
+    except _QueryFailure as exc:
+        raise IncrementalUnavailable(f"the probe query failed: {exc}") from exc
+    checks = probe.rows[0]
+    window = resolve_window(plan, checks)
+    refresh_from = refresh_start(entry, window, checks.get("changed_partitions") or [], plan.bucket_column)
+    fresh = _run_query(incremental_sql(plan, refresh_from), user_id, session_id) if refresh_from else None
+    rows, reused = merge_buckets(entry, fresh.rows if fresh else [], plan, window, refresh_from)
+
+    executed = [outcome for outcome in (probe, fresh) if outcome is not None]
+    bytes_processed = sum((outcome.job_stats or {}).get("totalBytesProcessed") or 0 for outcome in executed)
+    bytes_saved = max(0, entry.full_bytes - bytes_processed) if entry.full_bytes is not None else None
+    get_incremental_cache().put(
+        key, rows, window, datetime.fromisoformat(checks["checked_at"]), entry.full_bytes, entry.expires_at
+    )
+    registry = get_registry()
+    registry.increment("selecta_incremental_refresh_total", outcome="incremental" if fresh else "reuse")
+    if bytes_saved:
+        registry.increment("selecta_incremental_bytes_saved_total", bytes_saved)
+    # The rows merge cached and refreshed buckets, so no single job holds them:
+    # paging falls back to the spill file or state, and job stats stay per job.
+    return _QueryOutcome(
+        rows=rows,
+        job_id=None,
+        backend=probe.backend,
+        job_stats=None,
+        admission_wait_ms=sum(outcome.admission_wait_ms for outcome in executed),
+        retries=sum(outcome.retries for outcome in executed),
+        incremental={
+            "bucketColumn": plan.bucket_column,
+            "refreshedFrom": refresh_from.isoformat() if refresh_from else None,
+            "bucketsReused": reused,
+            "bucketsRefreshed": len(fresh.rows) if fresh else 0,
+            "bytesProcessed": bytes_processed,
+            "fullRunBytes": entry.full_bytes,
+            "bytesSaved": bytes_saved,
+            "jobs": [
+                {"role": role, "jobId": outcome.job_id, "jobStats": outcome.job_stats}
+                for role, outcome in (("probe", probe), ("refresh", fresh))
+                if outcome is not None
+            ],
+        },
+    )
+
+
+def _run_incremental(key: str, plan: IncrementalPlan, user_id: str, session_id: str) -> _QueryOutcome:
+    """Run a date-bucketed query, re-querying only buckets whose partitions changed (``selecta.incremental``)."""
+    entry = get_incremental_cache().get(key)
+    if entry is not None:
         try:
-            client = bigquery.Client(project=settings.billing_project_id)
-        except auth_exceptions.DefaultCredentialsError as exc:
-            logger.error("BigQuery credentials were not found: %s", exc)
-            raise RuntimeError(
-                "BigQuery credentials are missing. Provide GOOGLE_APPLICATION_CREDENTIALS or configure workload identity."
-            ) from exc
-        logger.info("Submitting query to BigQuery (billing project: %s)", settings.billing_project_id)
-        query_job = client.query(sql_query)
-        rows = query_job.result()
-        data = [dict(row.items()) for row in rows]
-        normalized = _normalize_rows(data)
-        elapsed_seconds = time.time() - start_time
-        logger.info("Query returned %d rows in %.2f seconds", len(data), elapsed_seconds)
+            return _refresh_incrementally(key, plan, entry, user_id, session_id)
+        except IncrementalUnavailable as exc:
+            logger.info("Running the full query instead of an incremental refresh: %s", exc)
+            get_registry().increment("selecta_incremental_refresh_total", outcome="fallback")
+    try:
+        probe: Optional[_QueryOutcome] = _run_query(probe_sql(plan), user_id, session_id)
+    except _QueryFailure as exc:
+        logger.warning("Incremental refresh probe failed: %s", exc)
+        probe = None
+    outcome = _run_query(plan.sql, user_id, session_id)
+    if probe is None or outcome.backend != BigQueryBackend.name:
+        return outcome
+    try:
+        window = resolve_window(plan, probe.rows[0])
+    except IncrementalUnavailable as exc:
+        logger.info("Not caching buckets for an incremental refresh: %s", exc)
+        return outcome
+    get_incremental_cache().put(
+        key,
+        outcome.rows,
+        window,
+        datetime.fromisoformat(probe.rows[0]["checked_at"]),
+        (outcome.job_stats or {}).get("totalBytesProcessed"),
+    )
+    get_registry().increment("selecta_incremental_refresh_total", outcome="full")
+    return outcome
+
+
+def _run_and_cache(key: str, sql_query: str, user_id: str, session_id: str) -> _QueryOutcome:
+    plan = _incremental_plan(sql_query)
+    if plan is not None:
+        outcome = _run_incremental(key, plan, user_id, session_id)
+    else:
+        outcome = _run_query(sql_query, user_id, session_id)
+    get_result_cache().put(key, sql_query, outcome, len(outcome.rows))
+    return outcome
+
+
+def _publish_result(
+    tool_context: Optional[Any],
+    sql_query: str,
+    outcome: _QueryOutcome,
+    coalesced: bool,
+    start_time: float,
+    lint: LintResult,
+    question_cache_hit: bool = False,
+    batch: Optional[Dict[str, Any]] = None,
+    derived_from: Optional[Dict[str, Any]] = None,
+    approximation: Optional[ApproximateQuery] = None,
+) -> List[Dict[str, Any]]:
+    settings = get_bigquery_settings()
+    normalized = outcome.rows
+    elapsed_seconds = time.time() - start_time
+    logger.info("Query returned %d rows in %.2f seconds", len(normalized), elapsed_seconds)
+    with stage("chart_build"):
         chart_bundle = build_chart_bundle(normalized)
-        chart_spec = chart_bundle["charts"][0]["spec"] if chart_bundle else None
-        chart_options = chart_bundle["charts"] if chart_bundle else None
-        default_chart_id = chart_bundle["defaultChartId"] if chart_bundle else None
+    chart_spec = chart_bundle["charts"][0]["spec"] if chart_bundle else None
+    chart_options = chart_bundle["charts"] if chart_bundle else None
+    default_chart_id = chart_bundle["defaultChartId"] if chart_bundle else None
 
-        if tool_context is not None:
-            try:
-                tool_context.state.pop("latest_error", None)
-            except AttributeError:
-                pass
-            columns = list(normalized[0].keys()) if normalized else []
-            result_id = str(uuid.uuid4())
-            created_at_ms = int(time.time() * 1000)
-            job_id = getattr(query_job, "job_id", None)
-            result_payload = {
-                "id": result_id,
-                "sql": sql_query,
-                "rows": normalized,
-                "columns": columns,
+    result_id = str(uuid.uuid4())
+    returned_rows = normalized
+    store = get_result_store()
+    spilled = False
+    if store.should_spill(len(normalized)):
+        try:
+            store.spill(result_id, normalized)
+            spilled = True
+        except Exception as exc:  # pragma: no cover - defensive logging
+            logger.warning("Could not spill result %s; keeping rows in state: %s", result_id, exc)
+    if spilled:
+        returned_rows = normalized[:RESULT_SPILL_PREVIEW_ROWS]
+        logger.info(
+            "Spilled %d rows for result %s; returning a %d-row preview",
+            len(normalized),
+            result_id,
+            len(returned_rows),
+        )
+
+    approximate = approximation is not None and approximation.approximate
+    if tool_context is not None:
+        columns = list(normalized[0].keys()) if normalized else []
+        created_at_ms = int(time.time() * 1000)
+        result_payload = {
+            "id": result_id,
+            # A derived result's rows did not come from any SQL; ``sourceResultId`` links the source query.
+            "sql": lint.sql if derived_from is None else None,
+            "originalSql": sql_query if lint.rewrites else None,
+            "rewrites": lint.rewrites,
+            "lintWarnings": lint.warnings,
+            "rows": returned_rows,
+            "columns": columns,
+            "rowCount": len(normalized),
+            "spilled": spilled,
+            "chart": chart_spec,
+            "chartOptions": chart_options,
+            "defaultChartId": default_chart_id,
+            "createdAt": created_at_ms,
+            "executionMs": int(elapsed_seconds * 1000),
+            "admissionWaitMs": int(outcome.admission_wait_ms),
+            "retries": outcome.retries,
+            "jobId": outcome.job_id,
+            "executionBackend": outcome.backend,
+            "executionPath": outcome.execution_path,
+            "jobStats": outcome.job_stats,
+            "coalesced": coalesced,
+            "cacheHit": outcome.cache_hit,
+            "questionCacheHit": question_cache_hit,
+            "batch": batch,
+            "incremental": outcome.incremental,
+            "approximate": approximate,
+            "samplingRate": approximation.sampling_rate if approximate else None,
+            "exactSql": sql_query if approximate else None,
+            "sourceResultId": (derived_from or {}).get("resultId"),
+            "transform": (derived_from or {}).get("transform"),
+            "dataset": {
+                "id": settings.dataset,
+                "projectId": settings.data_project_id,
+                "billingProjectId": settings.billing_project_id,
+                "location": settings.location,
+                "tables": settings.tables,
+            },
+        }
+        with stage("state_write"):
+            _record_query_result(tool_context, result_payload)
+
+    query_log = get_query_log()
+    if query_log is not None and derived_from is None:
+        job_stats = outcome.job_stats or {}
+        query_log.append(
+            {
+                "ts": time.time(),
+                "datasetId": get_dataset_config().id,
+                "billingProjectId": settings.billing_project_id,
+                "projectId": settings.data_project_id,
+                "dataset": settings.dataset,
+                "sql": lint.sql,
+                "resultId": result_id,
                 "rowCount": len(normalized),
-                "chart": chart_spec,
-                "chartOptions": chart_options,
-                "defaultChartId": default_chart_id,
-                "createdAt": created_at_ms,
                 "executionMs": int(elapsed_seconds * 1000),
-                "jobId": job_id,
-                "dataset": {
-                    "id": settings.dataset,
-                    "projectId": settings.data_project_id,
-                    "billingProjectId": settings.billing_project_id,
-                    "location": settings.location,
-                    "tables": settings.tables,
-                },
+                "backend": outcome.backend,
+                "executionPath": outcome.execution_path,
+                "approximate": approximate,
+                "cacheHit": outcome.cache_hit,
+                "coalesced": coalesced,
+                "bytesProcessed": job_stats.get("totalBytesProcessed"),
+                "bytesBilled": job_stats.get("totalBytesBilled"),
+                "slotMillis": job_stats.get("slotMillis"),
             }
-            tool_context.state["latest_result"] = result_payload
-            history: List[Dict[str, Any]] = list(tool_context.state.get("results_history", []))
-            history.append(result_payload.copy())
-            tool_context.state["results_history"] = history
+        )
+
+    return returned_rows
+
+
+def _handle_query_failure(tool_context: Optional[Any], sql_query: str, exc: Exception) -> Exception:
+    """Log and record a failure; returns the underlying error to chain from."""
+    job_id: Optional[str] = None
+    if isinstance(exc, _QueryFailure):
+        job_id, exc = exc.job_id, exc.error
+    logger.error("BigQuery query failed: %s", exc, exc_info=exc)
+    _record_query_error(tool_context, sql_query, exc, job_id)
+    return exc
+
+
+def _approximate(lint: LintResult, approximate: bool) -> "tuple[LintResult, Optional[ApproximateQuery]]":
+    """Apply the approximate rewrites (``selecta.approximate``) on top of the lint result."""
+    if not approximate:
+        return lint, None
+    approximation = approximate_query(lint.sql, get_dataset_config().approximate, get_bigquery_settings())
+    get_registry().increment(
+        "selecta_approximate_queries_total",
+        outcome="sampled" if approximation.sampled_tables else "rewritten" if approximation.approximate else "exact",
+    )
+    return replace(lint, sql=approximation.sql, rewrites=lint.rewrites + list(approximation.rewrites)), approximation
+
+
+def execute_bigquery_query(
+    sql_query: str, tool_context: Optional[Any] = None, approximate: bool = False
+) -> List[Dict[str, Any]]:
+    """Execute SQL against BigQuery using the configured billing project.
+
+    Datasets may route queries over locally extracted tables to DuckDB; see
+    ``selecta.execution``. Equivalent queries (same canonical SQL) are served
+    from the result cache or coalesced with one already in flight, but every
+    caller still gets its own result id and history entry.
+
+    Pass ``approximate=True`` only for "roughly how many" or exploratory
+    questions: COUNT(DISTINCT) becomes APPROX_COUNT_DISTINCT and large tables
+    may be sampled with their counts and sums scaled up. Say that the figures
+    are estimates and offer to re-run the same SQL exactly.
+    """
+    start_time = time.time()
+    replayed = _take_question_replay(tool_context, sql_query)
+    try:
+        with stage("sql_validation"):
+            _ensure_supported_temporal_intervals(sql_query)
+            lint, approximation = _approximate(lint_query(sql_query), approximate)
+        executed_sql = lint.sql
+        key = query_key(executed_sql, get_bigquery_settings())
+        user_id, session_id = caller_identity(tool_context)
+        outcome, coalesced = _cached_outcome(key, executed_sql), False
+        if outcome is None:
+            outcome, coalesced = get_single_flight().do(
+                key, lambda: _run_and_cache(key, executed_sql, user_id, session_id)
+            )
+        rows = _publish_result(
+            tool_context,
+            sql_query,
+            outcome,
+            coalesced,
+            start_time,
+            lint,
+            question_cache_hit=replayed,
+            approximation=approximation,
+        )
+    except Exception as exc:  # pragma: no cover - defensive logging
+        if replayed:
+            _forget_replayed_question(tool_context)
+        error = _handle_query_failure(tool_context, sql_query, exc)
+        raise RuntimeError(f"BigQuery query failed: {error}") from error
+    _remember_question(tool_context, sql_query, replayed)
+    return rows
+
+
+def _execute_for_batch(lint: LintResult, user_id: str, session_id: str) -> "tuple[_QueryOutcome, bool]":
+    key = query_key(lint.sql, get_bigquery_settings())
+    outcome = _cached_outcome(key, lint.sql)
+    if outcome is not None:
+        return outcome, False
+    return get_single_flight().do(key, lambda: _run_and_cache(key, lint.sql, user_id, session_id))
+
+
+def execute_bigquery_queries(sql_queries: List[str], tool_context: Optional[Any] = None) -> List[Dict[str, Any]]:
+    """Execute several independent SQL statements concurrently.
+
+    Each statement is validated, admitted and executed exactly like
+    :func:`execute_bigquery_query` and gets its own result payload and history
+    entry; the jobs just run side by side instead of one after another. A
+    failing statement does not stop the others: its entry carries ``error``
+    instead of ``rows``.
+    """
+    if not sql_queries:
+        raise ValueError("execute_bigquery_queries needs at least one SQL statement.")
+    if len(sql_queries) > BATCH_MAX_QUERIES:
+        raise ValueError(
+            f"execute_bigquery_queries accepts at most {BATCH_MAX_QUERIES} statements; got {len(sql_queries)}."
+        )
 
-        return normalized
+    start_time = time.time()
+    batch_id = str(uuid.uuid4())
+    user_id, session_id = caller_identity(tool_context)
+    lints: Dict[int, LintResult] = {}
+    failures: Dict[int, Exception] = {}
+    for index, sql_query in enumerate(sql_queries):
+        try:
+            with stage("sql_validation"):
+                _ensure_supported_temporal_intervals(sql_query)
+                lints[index] = lint_query(sql_query)
+        except Exception as exc:
+            failures[index] = exc
+
+    get_registry().increment("selecta_query_batches_total")
+    outcomes: Dict[int, "tuple[_QueryOutcome, bool]"] = {}
+    with ThreadPoolExecutor(max_workers=len(lints) or 1, thread_name_prefix="selecta-batch") as pool:
+        futures = {
+            index: pool.submit(_execute_for_batch, lint, user_id, session_id)
+            for index, lint in lints.items()
+        }
+        for index, future in futures.items():
+            try:
+                outcomes[index] = future.result()
+            except Exception as exc:
+                failures[index] = exc
+
+    # State is written from this thread only, in statement order.
+    results: List[Dict[str, Any]] = []
+    for index, sql_query in enumerate(sql_queries):
+        batch = {"id": batch_id, "index": index, "size": len(sql_queries)}
+        entry: Dict[str, Any] = {"index": index, "sql": sql_query}
+        if index in outcomes:
+            outcome, coalesced = outcomes[index]
+            try:
+                entry["rows"] = _publish_result(
+                    tool_context, sql_query, outcome, coalesced, start_time, lints[index], batch=batch
+                )
+            except Exception as exc:
+                failures[index] = exc
+        if index in failures:
+            error = _handle_query_failure(tool_context, sql_query, failures[index])
+            entry["error"] = f"BigQuery query failed: {error}"
+        results.append(entry)
+    return results
+
+
+def _find_previous_result(
+    tool_context: Optional[Any], result_id: str, job_id: str
+) -> Optional[Dict[str, Any]]:
+    state = getattr(tool_context, "state", None)
+    if state is None:
+        return None
+    if not result_id and not job_id:
+        return state.get("latest_result")
+    for entry in reversed(list(state.get("results_history", []))):
+        if result_id and entry.get("id") == result_id:
+            return entry
+        if job_id and entry.get("jobId") == job_id:
+            return entry
+    return None
+
+
+def _page_from_rows(rows: List[Dict[str, Any]], offset: int, max_rows: int) -> Dict[str, Any]:
+    page = rows[offset : offset + max_rows]
+    end = offset + len(page)
+    return {
+        "rows": page,
+        "totalRows": len(rows),
+        "nextPageToken": str(end) if end < len(rows) else None,
+    }
+
+
+def fetch_more_rows(
+    result_id: str = "",
+    job_id: str = "",
+    page_token: str = "",
+    start_index: int = 0,
+    max_rows: int = 100,
+    tool_context: Optional[Any] = None,
+) -> Dict[str, Any]:
+    """Read more rows of an earlier query result without running a new query.
+
+    Defaults to the latest result; pass the ``id`` of an earlier result in this
+    session (or its ``jobId``) to page through that instead. Continue with the
+    ``nextPageToken`` returned by the previous call, or jump to ``start_index``.
+    Rows come from the spilled result file or from the finished job's
+    destination table, so no data is re-scanned and no new job is billed.
+    """
+    max_rows = max(1, min(int(max_rows), PAGE_MAX_ROWS))
+    # Only results in this session's history are paged, so one session cannot
+    # read another's spill file or job destination table by guessing an id.
+    previous = _find_previous_result(tool_context, result_id, job_id)
+    resolved_id = (previous or {}).get("id")
+    resolved_job_id = (previous or {}).get("jobId")
+    offset = int(page_token) if page_token and page_token.isdigit() else max(0, int(start_index))
+
+    try:
+        with stage("page_fetch"):
+            if previous is None:
+                raise ValueError("Provide the id or jobId of a previous result in this session.")
+            store = get_result_store()
+            if resolved_id and store.has(resolved_id):
+                source = "spill"
+                page = store.read_range(resolved_id, offset=offset, limit=max_rows)
+                end = offset + len(page["rows"])
+                page["nextPageToken"] = str(end) if end < page["totalRows"] else None
+            elif len(previous.get("rows") or []) == previous.get("rowCount"):
+                source = "state"
+                page = _page_from_rows(previous["rows"], offset, max_rows)
+            elif resolved_job_id:
+                if previous.get("executionBackend") not in (None, BigQueryBackend.name):
+                    raise ValueError("Only BigQuery jobs can be paged; re-run the query to see more rows.")
+                source = "destination_table"
+                settings = get_bigquery_settings()
+                client = BigQueryBackend(settings).client()
+                job = client.get_job(resolved_job_id, location=settings.location)
+                iterator = client.list_rows(
+                    job.destination,
+                    page_token=page_token or None,
+                    start_index=None if page_token else offset,
+                    max_results=max_rows,
+                    page_size=max_rows,
+                )
+                page = {
+                    "rows": _normalize_rows([dict(row.items()) for row in iterator], iterator.schema),
+                    "totalRows": iterator.total_rows,
+                    "nextPageToken": iterator.next_page_token,
+                }
+            elif previous.get("incremental"):
+                raise ValueError("This result merged cached and refreshed buckets; re-run the query to see more rows.")
+            else:
+                raise ValueError("This result has no stored rows or job to page; re-run the query to see more rows.")
     except Exception as exc:  # pragma: no cover - defensive logging
-        logger.error("BigQuery query failed: %s", exc, exc_info=True)
-        job_id = getattr(query_job, "job_id", None) if query_job is not None else None
-        _record_query_error(tool_context, sql_query, exc, job_id)
-        raise RuntimeError(f"BigQuery query failed: {exc}") from exc
+        logger.error("Fetching more rows failed: %s", exc, exc_info=True)
+        _record_query_error(tool_context, (previous or {}).get("sql", ""), exc, resolved_job_id)
+        raise RuntimeError(f"Fetching more rows failed: {exc}") from exc
+
+    rows = page["rows"]
+    get_registry().increment("selecta_page_fetch_total", source=source)
+    return {
+        "resultId": resolved_id,
+        "jobId": resolved_job_id,
+        "rows": rows,
+        "columns": list(rows[0].keys()) if rows else list((previous or {}).get("columns") or []),
+        "startIndex": offset if not page_token or page_token.isdigit() else None,
+        "rowCount": len(rows),
+        "totalRows": page["totalRows"],
+        "nextPageToken": page["nextPageToken"],
+        "source": source,
+    }
+
+
+def transform_result(
+    result_id: str = "",
+    filters: Optional[List[Dict[str, Any]]] = None,
+    group_by: Optional[List[str]] = None,
+    aggregations: Optional[List[Dict[str, Any]]] = None,
+    pivot: Optional[Dict[str, Any]] = None,
+    sort_by: str = "",
+    descending: bool = False,
+    limit: int = 0,
+    tool_context: Optional[Any] = None,
+) -> List[Dict[str, Any]]:
+    """Filter, regroup, pivot, sort or cut an earlier result without a new query.
+
+    Defaults to the latest result. ``filters`` are ``{"column", "op", "value"}``
+    conditions (``op``: ``==, !=, >, >=, <, <=, in, contains``); ``aggregations``
+    are ``{"column", "function", "alias"}`` with ``function`` one of ``sum, avg,
+    min, max, count, count_distinct`` and apply per ``group_by`` key; ``pivot`` is
+    ``{"index", "columns", "values", "function"}``. Steps run in that order,
+    then ``sort_by`` and ``limit``. The output becomes a new result (with its
+    own chart) that links back to the source through ``sourceResultId``.
+    """
+    start_time = time.time()
+    previous = _find_previous_result(tool_context, result_id, "")
+    spec = {
+        key: value
+        for key, value in {
+            "filters": filters,
+            "groupBy": group_by,
+            "aggregations": aggregations,
+            "pivot": pivot,
+            "sortBy": sort_by,
+            "descending": descending if sort_by else None,
+            "limit": limit,
+        }.items()
+        if value
+    }
+    source_sql = (previous or {}).get("sql") or ""
+    try:
+        if previous is None:
+            raise ValueError("Provide the id of a previous result in this session.")
+        with stage("result_transform"):
+            table = transform_table(
+                load_result_table(previous),
+                filters=filters,
+                group_by=group_by,
+                aggregations=aggregations,
+                pivot=pivot,
+                sort_by=sort_by or None,
+                descending=descending,
+                limit=limit,
+            )
+            rows = _normalize_rows(table.to_pylist())
+        outcome = _QueryOutcome(rows=rows, job_id=None, backend="arrow", job_stats=None, admission_wait_ms=0.0)
+        published = _publish_result(
+            tool_context,
+            "",
+            outcome,
+            False,
+            start_time,
+            LintResult(sql=""),
+            derived_from={"resultId": previous.get("id"), "transform": spec},
+        )
+    except Exception as exc:  # pragma: no cover - defensive logging
+        logger.error("Transforming result failed: %s", exc, exc_info=True)
+        _record_query_error(tool_context, source_sql, exc, None)
+        raise RuntimeError(f"Transforming result failed: {exc}") from exc
+
+    for operation in spec:
+        get_registry().increment("selecta_result_transforms_total", operation=operation)
+    return published
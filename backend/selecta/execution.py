@@ -0,0 +1,354 @@
+"""Pluggable query execution backends.
+
+``execute_bigquery_query`` submits SQL through :func:`submit_query`, which picks
+BigQuery or a local DuckDB engine over Parquet extracts according to the
+dataset's ``execution`` block:
+
+``bigquery``
+    Always run on BigQuery (default).
+``duckdb``
+    Always run locally; every referenced table must have an extract.
+``auto``
+    Run locally when every referenced table has an extract, otherwise on
+    BigQuery. Local failures (e.g. dialect gaps) fall back to BigQuery.
+
+Backends return job-like objects exposing ``job_id`` and ``result()`` so the
+tool can treat both engines the same way.
+
+With ``SELECTA_SHORT_QUERY_MODE`` set, BigQuery queries go through
+``Client.query_and_wait`` with optional job creation (:class:`ShortQueryJob`):
+BigQuery answers short queries directly from ``jobs.query`` and only creates
+a job when the query needs one, which ``query_and_wait`` then waits on.
+"""
+
+import logging
+import re
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from google.auth import exceptions as auth_exceptions
+from google.cloud import bigquery
+
+from .canonical_sql import _TOKEN_PATTERN
+from .config_loader import (
+    BigQuerySettings,
+    ExecutionSettings,
+    get_bigquery_settings,
+    get_execution_settings,
+)
+from .constants import SHORT_QUERY_MODE
+
+logger = logging.getLogger(__name__)
+
+JOB_CREATION_OPTIONAL = "JOB_CREATION_OPTIONAL"
+
+_IDENTIFIER = r"[A-Za-z_][\w\-]*"
+_TABLE_REFERENCE_PATTERN = re.compile(
+    r"\b(?P<keyword>FROM|JOIN)\s+"
+    r"(?P<ref>`[^`]+`(?:\s*\.\s*`[^`]+`)*|" + _IDENTIFIER + r"(?:\." + _IDENTIFIER + r")*)"
+    r"(?!\s*\()",
+    re.IGNORECASE,
+)
+_CTE_PATTERN = re.compile(r"(?:\bWITH|,)\s*(?:RECURSIVE\s+)?(?P<name>" + _IDENTIFIER + r")\s+AS\s*\(", re.IGNORECASE)
+
+
+def _table_keyword_offsets(sql_query: str) -> Set[int]:
+    """Offsets of the FROM/JOIN keywords that introduce a table.
+
+    Words inside strings and comments are skipped, and so is the FROM of
+    ``EXTRACT(part FROM value)``.
+    """
+    offsets: Set[int] = set()
+    # Name of the function (or "") owning each open parenthesis.
+    parens: List[str] = []
+    previous = ""
+    for match in _TOKEN_PATTERN.finditer(sql_query):
+        kind, text = match.lastgroup or "op", match.group(0)
+        if kind in {"ws", "comment"}:
+            continue
+        upper = text.upper()
+        if text == "(":
+            parens.append(previous)
+        elif text == ")" and parens:
+            parens.pop()
+        elif kind == "word" and upper in {"FROM", "JOIN"}:
+            if not (upper == "FROM" and parens and parens[-1] == "EXTRACT"):
+                offsets.add(match.start())
+        previous = upper if kind == "word" else ""
+    return offsets
+
+
+def _table_references(sql_query: str) -> Iterable["re.Match[str]"]:
+    offsets = _table_keyword_offsets(sql_query)
+    return (match for match in _TABLE_REFERENCE_PATTERN.finditer(sql_query) if match.start() in offsets)
+
+
+def _split_reference(reference: str) -> List[str]:
+    return [part for part in re.split(r"[.`\s]+", reference) if part]
+
+
+def _cte_names(sql_query: str) -> Set[str]:
+    return {match.group("name").lower() for match in _CTE_PATTERN.finditer(sql_query)}
+
+
+def referenced_tables(sql_query: str, settings: Optional[BigQuerySettings] = None) -> Set[str]:
+    """Return bare table names referenced after FROM/JOIN, ignoring CTEs.
+
+    Qualified references to a different project or dataset than ``settings``
+    are returned fully qualified so they never match a local extract.
+    """
+    ctes = _cte_names(sql_query)
+    tables: Set[str] = set()
+    for match in _table_references(sql_query):
+        parts = _split_reference(match.group("ref"))
+        if not parts:
+            continue
+        if len(parts) == 1 and parts[0].lower() in ctes:
+            continue
+        if settings is not None and not _belongs_to_dataset(parts, settings):
+            tables.add(".".join(parts))
+            continue
+        tables.add(parts[-1])
+    return tables
+
+
+def _belongs_to_dataset(parts: List[str], settings: BigQuerySettings) -> bool:
+    if len(parts) >= 3 and parts[-3] != settings.data_project_id:
+        return False
+    if len(parts) >= 2 and parts[-2] != settings.dataset:
+        return False
+    return True
+
+
+def rewrite_for_local(sql_query: str, local_tables: Iterable[str]) -> str:
+    """Replace BigQuery table references with the bare view names DuckDB exposes."""
+    local = set(local_tables)
+
+    def _replace(match: "re.Match[str]") -> str:
+        parts = _split_reference(match.group("ref"))
+        if parts and parts[-1] in local:
+            return f'{match.group("keyword")} "{parts[-1]}"'
+        return match.group(0)
+
+    offsets = _table_keyword_offsets(sql_query)
+    return _TABLE_REFERENCE_PATTERN.sub(
+        lambda match: _replace(match) if match.start() in offsets else match.group(0), sql_query
+    )
+
+
+def extract_path(execution: ExecutionSettings, table: str) -> Optional[Path]:
+    if execution.extract_directory is None:
+        return None
+    return execution.extract_directory / f"{table}.parquet"
+
+
+def available_extracts(execution: ExecutionSettings) -> Dict[str, Path]:
+    extracts: Dict[str, Path] = {}
+    for table in execution.local_tables:
+        path = extract_path(execution, table)
+        if path is not None and path.exists():
+            extracts[table] = path
+    return extracts
+
+
+class BigQueryBackend:
+    name = "bigquery"
+
+    def __init__(self, settings: BigQuerySettings) -> None:
+        self._settings = settings
+
+    def client(self) -> bigquery.Client:
+        try:
+            return bigquery.Client(project=self._settings.billing_project_id)
+        except auth_exceptions.DefaultCredentialsError as exc:
+            logger.error("BigQuery credentials were not found: %s", exc)
+            raise RuntimeError(
+                "BigQuery credentials are missing. Provide GOOGLE_APPLICATION_CREDENTIALS or configure workload identity."
+            ) from exc
+
+    def submit(self, sql_query: str) -> Any:
+        client = self.client()
+        if SHORT_QUERY_MODE and hasattr(client, "query_and_wait"):
+            logger.info("Running short query on BigQuery (billing project: %s)", self._settings.billing_project_id)
+            client.default_job_creation_mode = JOB_CREATION_OPTIONAL
+            return ShortQueryJob(client, sql_query, self._settings.location)
+        logger.info("Submitting query to BigQuery (billing project: %s)", self._settings.billing_project_id)
+        return client.query(sql_query)
+
+
+class ShortQueryJob:
+    """Job-like wrapper around ``Client.query_and_wait``; executes on ``result()``.
+
+    ``job_id`` stays ``None`` when BigQuery answered without creating a job.
+    The statistics ``summarize_job`` reads are copied from the returned rows.
+    """
+
+    backend_name = BigQueryBackend.name
+
+    def __init__(self, client: bigquery.Client, sql_query: str, location: Optional[str]) -> None:
+        self._client = client
+        self._sql_query = sql_query
+        self.location = location
+        self.job_id: Optional[str] = None
+        self.query_id: Optional[str] = None
+        self.execution_path: Optional[str] = None
+        self.total_bytes_processed: Optional[int] = None
+        self.slot_millis: Optional[int] = None
+        self.created: Any = None
+        self.started: Any = None
+        self.ended: Any = None
+
+    def result(self, *args: Any, **kwargs: Any) -> Any:
+        rows = self._client.query_and_wait(self._sql_query, location=self.location)
+        self.job_id = getattr(rows, "job_id", None)
+        self.query_id = getattr(rows, "query_id", None)
+        self.execution_path = "job" if self.job_id else "jobless"
+        for name in ("total_bytes_processed", "slot_millis", "created", "started", "ended"):
+            setattr(self, name, getattr(rows, name, None))
+        return rows
+
+
+class LocalQueryJob:
+    """Job-like wrapper around a DuckDB query; executes on ``result()``."""
+
+    def __init__(
+        self,
+        backend: "DuckDBBackend",
+        sql_query: str,
+        fallback: Optional[Callable[[str], Any]] = None,
+    ) -> None:
+        self._backend = backend
+        self._sql_query = sql_query
+        self._fallback = fallback
+        self.job_id = f"local_{uuid.uuid4().hex[:12]}"
+        self.backend_name = backend.name
+        self.execution_path = "local"
+
+    def result(self, *args: Any, **kwargs: Any) -> List[Dict[str, Any]]:
+        try:
+            return self._backend.run(self._sql_query)
+        except Exception as exc:
+            if self._fallback is None:
+                raise
+            logger.warning("Local execution failed (%s); falling back to BigQuery.", exc)
+            job = self._fallback(self._sql_query)
+            rows = job.result(*args, **kwargs)
+            self.job_id = getattr(job, "job_id", None)
+            self.backend_name = BigQueryBackend.name
+            self.execution_path = execution_path_for(job)
+            return rows
+
+
+class DuckDBBackend:
+    """Runs GoogleSQL against local Parquet extracts through DuckDB.
+
+    Only the table references are rewritten; queries using BigQuery-only
+    functions will fail locally (and fall back to BigQuery in ``auto`` mode).
+    """
+
+    name = "duckdb"
+
+    def __init__(self, extracts: Dict[str, Path]) -> None:
+        self._extracts = dict(extracts)
+        self._connection: Any = None
+        self._lock = threading.Lock()
+
+    @property
+    def tables(self) -> Set[str]:
+        return set(self._extracts)
+
+    def _connect(self) -> Any:
+        with self._lock:
+            if self._connection is None:
+                try:
+                    import duckdb
+                except ImportError as exc:
+                    raise RuntimeError(
+                        "The duckdb execution backend requires the optional 'local' extras (pip install selecta[local])."
+                    ) from exc
+                connection = duckdb.connect(database=":memory:")
+                for table, path in self._extracts.items():
+                    escaped = str(path).replace("'", "''")
+                    connection.execute(f"CREATE VIEW \"{table}\" AS SELECT * FROM read_parquet('{escaped}')")
+                self._connection = connection
+            return self._connection
+
+    def submit(self, sql_query: str, fallback: Optional[Callable[[str], Any]] = None) -> LocalQueryJob:
+        logger.info("Running query locally on DuckDB (%d extracts)", len(self._extracts))
+        return LocalQueryJob(self, sql_query, fallback=fallback)
+
+    def run(self, sql_query: str) -> List[Dict[str, Any]]:
+        cursor = self._connect().cursor()
+        try:
+            cursor.execute(rewrite_for_local(sql_query, self._extracts))
+            columns = [description[0] for description in cursor.description or []]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+
+_LOCAL_BACKENDS: Dict[tuple, DuckDBBackend] = {}
+_LOCAL_BACKENDS_LOCK = threading.Lock()
+
+
+def _local_backend(extracts: Dict[str, Path]) -> DuckDBBackend:
+    key = tuple(sorted((table, str(path), path.stat().st_mtime_ns) for table, path in extracts.items()))
+    with _LOCAL_BACKENDS_LOCK:
+        backend = _LOCAL_BACKENDS.get(key)
+        if backend is None:
+            _LOCAL_BACKENDS.clear()
+            backend = _LOCAL_BACKENDS[key] = DuckDBBackend(extracts)
+        return backend
+
+
+def submit_query(sql_query: str) -> Any:
+    """Submit ``sql_query`` to the backend selected for the active dataset."""
+    settings = get_bigquery_settings()
+    execution = get_execution_settings()
+    bigquery_backend = BigQueryBackend(settings)
+    if execution.backend == "bigquery":
+        return bigquery_backend.submit(sql_query)
+
+    extracts = available_extracts(execution)
+    tables = referenced_tables(sql_query, settings)
+    missing = sorted(table for table in tables if table not in extracts)
+
+    if execution.backend == "duckdb":
+        if missing:
+            raise ValueError(
+                f"No local extract for table(s) {', '.join(missing)}. "
+                "Run `python -m selecta.extract` or switch execution.backend to 'auto'."
+            )
+        return _local_backend(extracts).submit(sql_query)
+
+    if tables and not missing:
+        return _local_backend(extracts).submit(sql_query, fallback=bigquery_backend.submit)
+    return bigquery_backend.submit(sql_query)
+
+
+def backend_name_for(job: Any) -> str:
+    return getattr(job, "backend_name", BigQueryBackend.name)
+
+
+def execution_path_for(job: Any) -> str:
+    """``jobless`` for short queries BigQuery answered without a job, ``local`` for DuckDB, else ``job``."""
+    return getattr(job, "execution_path", None) or "job"
+
+
+def reattach_job(job: Any) -> Optional[Any]:
+    """Re-fetch a submitted BigQuery job so the caller can keep waiting on it.
+
+    Returns ``None`` when the job itself failed, or is not a BigQuery job, in
+    which case the query has to be submitted again.
+    """
+    job_id = getattr(job, "job_id", None)
+    if job_id is None or backend_name_for(job) != BigQueryBackend.name:
+        return None
+    settings = get_bigquery_settings()
+    location = getattr(job, "location", None) or settings.location
+    refreshed = BigQueryBackend(settings).client().get_job(job_id, location=location)
+    if getattr(refreshed, "error_result", None):
+        return None
+    return refreshed
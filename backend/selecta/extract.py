@@ -0,0 +1,87 @@
+"""Snapshot configured BigQuery tables to local Parquet extracts.
+
+Usage::
+
+    python -m selecta.extract                      # tables from execution.local_extracts
+    python -m selecta.extract --tables products users --limit 100000
+
+Rows are read with ``tabledata.list`` (``Client.list_rows``), which does not
+run a query job, and written to ``<directory>/<table>.parquet`` as configured
+in the dataset YAML.
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from google.cloud.bigquery.table import TableReference
+
+from .config_loader import get_bigquery_settings, get_execution_settings, set_dataset_config_path
+from .execution import BigQueryBackend, extract_path
+
+logger = logging.getLogger(__name__)
+
+
+def extract_tables(tables: Optional[List[str]] = None, row_limit: Optional[int] = None) -> List[Path]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise RuntimeError(
+            "Writing extracts requires the optional 'local' extras (pip install selecta[local])."
+        ) from exc
+
+    settings = get_bigquery_settings()
+    execution = get_execution_settings()
+    if execution.extract_directory is None:
+        raise ValueError("execution.local_extracts.directory must be set in the dataset configuration.")
+
+    targets = tables or execution.local_tables
+    if not targets:
+        raise ValueError("No tables to extract; list them under execution.local_extracts.tables.")
+    limit = row_limit if row_limit is not None else execution.extract_row_limit
+
+    client = BigQueryBackend(settings).client()
+    execution.extract_directory.mkdir(parents=True, exist_ok=True)
+    written: List[Path] = []
+    for table in targets:
+        start_time = time.time()
+        reference = TableReference.from_string(
+            f"{settings.data_project_id}.{settings.dataset}.{table}",
+            default_project=settings.data_project_id,
+        )
+        arrow_table = client.list_rows(reference, max_results=limit).to_arrow()
+        destination = extract_path(execution, table)
+        temporary = destination.with_suffix(".parquet.tmp")
+        pq.write_table(arrow_table, temporary)
+        temporary.replace(destination)
+        written.append(destination)
+        logger.info(
+            "Extracted %d rows from %s to %s in %.2f seconds",
+            arrow_table.num_rows,
+            reference,
+            destination,
+            time.time() - start_time,
+        )
+    return written
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset-config", type=Path, help="Dataset YAML (defaults to SELECTA_DATASET_CONFIG).")
+    parser.add_argument("--tables", nargs="+", help="Tables to extract (defaults to execution.local_extracts.tables).")
+    parser.add_argument("--limit", type=int, help="Maximum rows per table.")
+    args = parser.parse_args(argv)
+
+    if args.dataset_config:
+        set_dataset_config_path(args.dataset_config)
+    for path in extract_tables(args.tables, args.limit):
+        print(path)
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(name)s - %(message)s")
+    sys.exit(main())
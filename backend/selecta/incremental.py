@@ -0,0 +1,531 @@
+"""Incremental refresh of date-bucketed queries over partitioned tables.
+
+Dashboard questions such as "daily orders for the last 90 days" are asked
+again every day. Each time, the whole window is rescanned although only the
+newest partitions changed. With ``SELECTA_INCREMENTAL_REFRESH=true``, a query
+qualifies when it:
+
+* reads one table that is partitioned by a DATE, DATETIME or TIMESTAMP column
+  (see :mod:`selecta.cost_lint`), with no joins, subqueries, window functions
+  or ``LIMIT``;
+* groups by a day bucket of that column: ``DATE(col) AS day`` or, for DATE
+  columns, ``col`` itself;
+* restricts the column only through bounds that do not depend on the row,
+  e.g. ``DATE(col) >= DATE_SUB(CURRENT_DATE(), INTERVAL 90 DAY)`` or
+  ``col >= TIMESTAMP(...)``.
+
+Such a query runs in full once and its rows are kept per bucket. A later run
+first sends a small probe query. The probe returns ``CURRENT_TIMESTAMP()``,
+the current window bounds and the partitions whose
+``INFORMATION_SCHEMA.PARTITIONS.last_modified_time`` is newer than the
+previous run. Only buckets from the earliest changed partition (or the part
+of the window that is new) onwards are then queried again, by adding
+``col >= <start>`` to the ``WHERE`` clause. Those buckets replace the cached
+ones, buckets that left the window are dropped, and a trailing ``ORDER BY``
+on output columns is re-applied.
+
+Each bucket depends only on the rows of its own day, so the merged rows equal
+a full run. The exception is data still in the streaming buffer
+(``__UNPARTITIONED__``), which is assumed to belong to the newest cached
+bucket. Entries are rebuilt in full after ``SELECTA_INCREMENTAL_TTL_SECONDS``.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .canonical_sql import _TOKEN_PATTERN, _read_table_path
+from .config_loader import BigQuerySettings
+from .constants import INCREMENTAL_MAX_ENTRIES, INCREMENTAL_TTL_SECONDS, RESULT_CACHE_MAX_ROWS
+from .cost_lint import TablePartitioning
+from .execution import referenced_tables
+
+BUCKET_COLUMN_TYPES = {"DATE", "DATETIME", "TIMESTAMP"}
+_UNSUPPORTED_WORDS = {"JOIN", "UNION", "INTERSECT", "EXCEPT", "QUALIFY", "WINDOW", "OVER", "LIMIT", "NULLS"}
+_CLAUSES = ("FROM", "WHERE", "GROUP", "HAVING", "ORDER")
+_COMPARISONS = {">=", ">", "<", "<=", "="}
+
+
+class IncrementalUnavailable(Exception):
+    """Raised when a planned query cannot be refreshed incrementally this time."""
+
+
+@dataclass(frozen=True)
+class _Token:
+    kind: str
+    text: str
+    start: int
+    end: int
+
+    @property
+    def upper(self) -> str:
+        return self.text.upper() if self.kind == "word" else self.text
+
+
+@dataclass(frozen=True)
+class Bound:
+    """A window bound: ``<column or bucket> <op> <expression>``."""
+
+    expression: str
+    op: str
+    on_bucket: bool
+
+
+@dataclass(frozen=True)
+class IncrementalPlan:
+    sql: str
+    table: Tuple[str, str, str]
+    column_ref: str
+    column_type: str
+    bucket_column: str
+    bounds: Tuple[Bound, ...]
+    where_body: Optional[Tuple[int, int]]
+    group_start: int
+    order_by: Tuple[Tuple[str, bool], ...]
+
+
+def _tokens(sql_query: str) -> List[_Token]:
+    tokens = [
+        _Token(match.lastgroup or "op", match.group(0), match.start(), match.end())
+        for match in _TOKEN_PATTERN.finditer(sql_query)
+        if match.lastgroup not in {"ws", "comment"}
+    ]
+    while tokens and tokens[-1].text == ";":
+        tokens.pop()
+    return tokens
+
+
+def _depths(tokens: Sequence[_Token]) -> List[int]:
+    depths, depth = [], 0
+    for token in tokens:
+        if token.text == ")":
+            depth -= 1
+        depths.append(depth)
+        if token.text == "(":
+            depth += 1
+    return depths
+
+
+def _split_top_level(tokens: Sequence[_Token], depths: Sequence[int], level: int, separator: str) -> List[List[_Token]]:
+    """Split on ``separator`` at ``level``; ``BETWEEN x AND y`` is kept together for ``AND``."""
+    parts: List[List[_Token]] = [[]]
+    pending_between = False
+    for token, depth in zip(tokens, depths):
+        if depth == level and token.upper == "BETWEEN":
+            pending_between = True
+        elif depth == level and token.upper == separator:
+            if separator == "AND" and pending_between:
+                pending_between = False
+            else:
+                parts.append([])
+                continue
+        parts[-1].append(token)
+    return parts
+
+
+def _column_length(tokens: Sequence[_Token], index: int, column: str, qualifiers: set) -> int:
+    """Number of tokens forming a reference to ``column`` at ``index`` (0 when there is none)."""
+
+    def name(token: _Token) -> str:
+        return token.text.strip("`").lower() if token.kind in {"word", "quoted"} else ""
+
+    if index + 2 < len(tokens) and tokens[index + 1].text == "." and name(tokens[index]) in qualifiers:
+        return 3 if name(tokens[index + 2]) == column else 0
+    if name(tokens[index]) == column and not (index and tokens[index - 1].text == "."):
+        return 1
+    return 0
+
+
+def _references(tokens: Sequence[_Token], column: str, qualifiers: set) -> bool:
+    return any(_column_length(tokens, index, column, qualifiers) for index in range(len(tokens)))
+
+
+def _bucket_length(tokens: Sequence[_Token], index: int, column: str, qualifiers: set, column_type: str) -> int:
+    """Tokens forming the day bucket at ``index``: ``DATE(col)``, or ``col`` for DATE columns."""
+    if index + 1 < len(tokens) and tokens[index].upper == "DATE" and tokens[index + 1].text == "(":
+        length = _column_length(tokens, index + 2, column, qualifiers)
+        if length and index + 2 + length < len(tokens) and tokens[index + 2 + length].text == ")":
+            return length + 3
+        return 0
+    return _column_length(tokens, index, column, qualifiers) if column_type == "DATE" else 0
+
+
+def _bound(conjunct: Sequence[_Token], sql_query: str, column: str, qualifiers: set, column_type: str) -> List[Bound]:
+    bucket = _bucket_length(conjunct, 0, column, qualifiers, column_type)
+    length = bucket or _column_length(conjunct, 0, column, qualifiers)
+    if not length or length >= len(conjunct):
+        raise IncrementalUnavailable("the partition column is filtered in an unsupported way")
+    operator, rest = conjunct[length], list(conjunct[length + 1 :])
+    if not rest or _references(rest, column, qualifiers):
+        raise IncrementalUnavailable("a window bound depends on the partition column")
+
+    def text(tokens: Sequence[_Token]) -> str:
+        return sql_query[tokens[0].start : tokens[-1].end]
+
+    if operator.upper == "BETWEEN":
+        split = next((index for index, token in enumerate(rest) if token.upper == "AND"), None)
+        if not split or split == len(rest) - 1:
+            raise IncrementalUnavailable("malformed BETWEEN")
+        return [
+            Bound(text(rest[:split]), ">=", bool(bucket)),
+            Bound(text(rest[split + 1 :]), "<=", bool(bucket)),
+        ]
+    if operator.text not in _COMPARISONS:
+        raise IncrementalUnavailable("the partition column is filtered in an unsupported way")
+    if operator.text == "=":
+        return [Bound(text(rest), ">=", bool(bucket)), Bound(text(rest), "<=", bool(bucket))]
+    return [Bound(text(rest), operator.text, bool(bucket))]
+
+
+def plan_incremental(
+    sql_query: str, partitioning: Dict[str, TablePartitioning], settings: BigQuerySettings
+) -> Optional[IncrementalPlan]:
+    """Return how to refresh ``sql_query`` incrementally, or ``None`` if it does not qualify."""
+    try:
+        return _plan(sql_query.strip().rstrip(";").rstrip(), partitioning, settings)
+    except IncrementalUnavailable:
+        return None
+
+
+def _plan(sql_query: str, partitioning: Dict[str, TablePartitioning], settings: BigQuerySettings) -> Optional[IncrementalPlan]:
+    tokens = _tokens(sql_query)
+    if not tokens or tokens[0].upper != "SELECT":
+        return None
+    if any(token.upper in _UNSUPPORTED_WORDS for token in tokens) or any(
+        token.upper == "SELECT" for token in tokens[1:]
+    ):
+        return None
+    tables = referenced_tables(sql_query, settings)
+    if len(tables) != 1:
+        return None
+    info = partitioning.get(next(iter(tables)))
+    if info is None or not info.partition_column or info.partition_column.startswith("_"):
+        return None
+    column_type = (info.partition_data_type or "").upper()
+    if column_type not in BUCKET_COLUMN_TYPES:
+        return None
+    column = info.partition_column.lower()
+
+    depths = _depths(tokens)
+    positions: Dict[str, int] = {}
+    for index, (token, depth) in enumerate(zip(tokens, depths)):
+        if depth == 0 and token.upper in _CLAUSES and token.upper not in positions:
+            if token.upper in {"GROUP", "ORDER"} and (index + 1 >= len(tokens) or tokens[index + 1].upper != "BY"):
+                continue
+            positions[token.upper] = index
+    if "FROM" not in positions or "GROUP" not in positions:
+        return None
+    order = [positions[clause] for clause in _CLAUSES if clause in positions]
+    if order != sorted(order):
+        return None
+
+    from_index = positions["FROM"]
+    parts, after = _read_table_path([(token.kind, token.text) for token in tokens], from_index + 1)
+    qualifiers = {parts[-1].lower()} if parts else set()
+    if after < len(tokens) and tokens[after].upper == "AS":
+        after += 1
+    if after < len(tokens) and tokens[after].kind in {"word", "quoted"} and tokens[after].upper not in _CLAUSES:
+        qualifiers.add(tokens[after].text.strip("`").lower())
+        after += 1
+    clause_after_from = next((index for index in order if index > from_index), len(tokens))
+    if after != clause_after_from:
+        return None
+    if len(parts) == 1:
+        parts = [settings.data_project_id, settings.dataset] + parts
+    elif len(parts) == 2:
+        parts = [settings.data_project_id] + parts
+
+    # The day bucket must be an output column and a grouping key.
+    items = _split_top_level(tokens[1:from_index], depths[1:from_index], 0, ",")
+    bucket_column, bucket_text, bucket_position, column_ref = None, "", 0, ""
+    for position, item in enumerate(items, start=1):
+        length = _bucket_length(item, 0, column, qualifiers, column_type) if item else 0
+        if not length:
+            continue
+        alias = item[length:]
+        if alias and alias[0].upper == "AS":
+            alias = alias[1:]
+        if len(alias) > 1:
+            continue
+        if alias:
+            bucket_column = alias[0].text.strip("`")
+        elif length == 1 or length == 3 and item[1].text == ".":
+            bucket_column = item[length - 1].text.strip("`")
+        else:
+            continue
+        bucket_text = "".join(token.text for token in item[:length]).lower()
+        bucket_position = position
+        reference = item[2 : length - 1] if item[0].upper == "DATE" and item[1].text == "(" else item[:length]
+        column_ref = "".join(token.text for token in reference)
+        break
+    if bucket_column is None:
+        return None
+
+    group_index = positions["GROUP"]
+    group_end = next((index for index in order if index > group_index), len(tokens))
+    keys = _split_top_level(tokens[group_index + 2 : group_end], depths[group_index + 2 : group_end], 0, ",")
+    key_texts = {"".join(token.text for token in key).strip("`").lower() for key in keys}
+    if not key_texts & {bucket_text, bucket_column.lower(), str(bucket_position)}:
+        return None
+
+    bounds: List[Bound] = []
+    where_body = None
+    if "WHERE" in positions:
+        where_index = positions["WHERE"]
+        body = tokens[where_index + 1 : group_index]
+        if not body:
+            return None
+        where_body = (body[0].start, body[-1].end)
+        body_depths = depths[where_index + 1 : group_index]
+        if any(token.upper == "OR" and depth == 0 for token, depth in zip(body, body_depths)):
+            if _references(body, column, qualifiers):
+                return None
+        else:
+            for conjunct in _split_top_level(body, body_depths, 0, "AND"):
+                if _references(conjunct, column, qualifiers):
+                    bounds.extend(_bound(conjunct, sql_query, column, qualifiers, column_type))
+
+    order_by: List[Tuple[str, bool]] = []
+    if "ORDER" in positions:
+        order_index = positions["ORDER"]
+        for item in _split_top_level(tokens[order_index + 2 :], depths[order_index + 2 :], 0, ","):
+            if not item or item[0].kind not in {"word", "quoted", "number"}:
+                return None
+            if len(item) > 2 or (len(item) == 2 and item[1].upper not in {"ASC", "DESC"}):
+                return None
+            order_by.append((item[0].text.strip("`"), len(item) == 2 and item[1].upper == "DESC"))
+
+    return IncrementalPlan(
+        sql=sql_query,
+        table=(parts[0], parts[1], parts[2]),
+        column_ref=column_ref,
+        column_type=column_type,
+        bucket_column=bucket_column,
+        bounds=tuple(bounds),
+        where_body=where_body,
+        group_start=tokens[group_index].start,
+        order_by=tuple(order_by),
+    )
+
+
+# ---------------------------------------------------------------------------
+# SQL generation
+# ---------------------------------------------------------------------------
+
+
+def probe_sql(plan: IncrementalPlan, changed_since: Optional[datetime] = None) -> str:
+    """Query returning the server time, the window bounds and (optionally) changed partitions."""
+    columns = ["CURRENT_TIMESTAMP() AS checked_at"]
+    if changed_since is not None:
+        project, dataset, table = plan.table
+        millis = int(changed_since.timestamp() * 1000)
+        columns.append(
+            "ARRAY(SELECT partition_id "
+            f"FROM `{project}.{dataset}.INFORMATION_SCHEMA.PARTITIONS` "
+            f"WHERE table_name = '{table}' AND last_modified_time >= TIMESTAMP_MILLIS({millis})) "
+            "AS changed_partitions"
+        )
+    columns.extend(f"({bound.expression}) AS bound_{index}" for index, bound in enumerate(plan.bounds))
+    return "SELECT " + ", ".join(columns)
+
+
+def incremental_sql(plan: IncrementalPlan, refresh_from: date) -> str:
+    """``plan.sql`` restricted to buckets on or after ``refresh_from``."""
+    predicate = f"{plan.column_ref} >= {plan.column_type} '{refresh_from.isoformat()}'"
+    sql_query = plan.sql
+    if plan.where_body is not None:
+        start, end = plan.where_body
+        return f"{sql_query[:start]}({sql_query[start:end]}) AND {predicate}{sql_query[end:]}"
+    return f"{sql_query[:plan.group_start]}WHERE {predicate}\n{sql_query[plan.group_start:]}"
+
+
+# ---------------------------------------------------------------------------
+# Windows and merging
+# ---------------------------------------------------------------------------
+
+Window = Tuple[Optional[date], Optional[date]]
+
+
+def _as_day(value: Any, aligned: bool) -> date:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value) if "T" in value or " " in value else date.fromisoformat(value)
+    if isinstance(value, datetime):
+        if aligned and value.time() != datetime.min.time():
+            raise IncrementalUnavailable("a window bound does not fall on a day boundary")
+        return value.date()
+    if isinstance(value, date):
+        return value
+    raise IncrementalUnavailable(f"unsupported window bound {value!r}")
+
+
+def resolve_window(plan: IncrementalPlan, probe: Dict[str, Any]) -> Window:
+    """Evaluate the probed bounds into ``[lower, upper)`` days (``None`` = unbounded)."""
+    lower: Optional[date] = None
+    upper: Optional[date] = None
+    for index, bound in enumerate(plan.bounds):
+        value = probe.get(f"bound_{index}")
+        if value is None:
+            raise IncrementalUnavailable("a window bound is NULL")
+        is_date = isinstance(value, date) and not isinstance(value, datetime) or (
+            isinstance(value, str) and len(value) == 10
+        )
+        # Bounds on the raw column must fall on midnight; '>' / '<=' on a timestamp splits a day.
+        if not bound.on_bucket and not is_date and bound.op in {">", "<="}:
+            raise IncrementalUnavailable("a timestamp bound splits a day")
+        day = _as_day(value, aligned=not bound.on_bucket)
+        if bound.op == ">":
+            day += timedelta(days=1)
+        if bound.op == "<=":
+            day += timedelta(days=1)
+        if bound.op in {">=", ">"}:
+            lower = day if lower is None else max(lower, day)
+        else:
+            upper = day if upper is None else min(upper, day)
+    return lower, upper
+
+
+def partition_start(partition_id: str) -> date:
+    """First day covered by a time-unit partition id (``YYYY``, ``YYYYMM``, ``YYYYMMDD`` or ``YYYYMMDDHH``)."""
+    if not partition_id.isdigit() or len(partition_id) not in {4, 6, 8, 10}:
+        raise IncrementalUnavailable(f"partition {partition_id} changed")
+    year = int(partition_id[:4])
+    month = int(partition_id[4:6]) if len(partition_id) >= 6 else 1
+    day = int(partition_id[6:8]) if len(partition_id) >= 8 else 1
+    return date(year, month, day)
+
+
+def _in_window(bucket: Optional[str], window: Window) -> bool:
+    lower, upper = window
+    if bucket is None:
+        return lower is None and upper is None
+    return (lower is None or bucket >= lower.isoformat()) and (upper is None or bucket < upper.isoformat())
+
+
+def sort_rows(rows: List[Dict[str, Any]], order_by: Sequence[Tuple[str, bool]]) -> List[Dict[str, Any]]:
+    """Apply ``ORDER BY`` on output columns (names or ordinals) with BigQuery's NULL placement."""
+    if not rows or not order_by:
+        return rows
+    columns = list(rows[0])
+    by_name = {name.lower(): name for name in columns}
+    for name, descending in reversed(order_by):
+        column = columns[int(name) - 1] if name.isdigit() and 0 < int(name) <= len(columns) else by_name.get(name.lower())
+        if column is None:
+            raise IncrementalUnavailable(f"ORDER BY {name} is not an output column")
+        rows.sort(key=lambda row: (row[column] is not None, row[column] if row[column] is not None else 0), reverse=descending)
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class IncrementalEntry:
+    rows: List[Dict[str, Any]]
+    window: Window
+    checked_at: datetime
+    full_bytes: Optional[int]
+    expires_at: float
+
+
+def refresh_start(entry: IncrementalEntry, window: Window, changed_partitions: Sequence[str], bucket_column: str) -> Optional[date]:
+    """Earliest bucket that has to be queried again; ``None`` when every cached bucket is current."""
+    starts: List[date] = []
+    for partition_id in changed_partitions:
+        if partition_id == "__UNPARTITIONED__":
+            buckets = [row[bucket_column] for row in entry.rows if row.get(bucket_column)]
+            if not buckets:
+                raise IncrementalUnavailable("streaming data arrived and no bucket is cached")
+            starts.append(date.fromisoformat(max(buckets)))
+        else:
+            starts.append(partition_start(partition_id))
+    old_lower, old_upper = entry.window
+    lower, upper = window
+    if lower is not None and (old_lower is None or lower < old_lower):
+        starts.append(lower)
+    if old_upper is not None and (upper is None or upper > old_upper):
+        starts.append(old_upper)
+    return min(starts) if starts else None
+
+
+def merge_buckets(
+    entry: IncrementalEntry,
+    fresh_rows: List[Dict[str, Any]],
+    plan: IncrementalPlan,
+    window: Window,
+    refresh_from: Optional[date],
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Cached buckets still in ``window`` and before ``refresh_from``, plus ``fresh_rows``; returns rows and reuse count."""
+    cutoff = refresh_from.isoformat() if refresh_from is not None else None
+    kept = [
+        row
+        for row in entry.rows
+        if _in_window(row.get(plan.bucket_column), window)
+        and (cutoff is None or row.get(plan.bucket_column) is None or row[plan.bucket_column] < cutoff)
+    ]
+    return sort_rows(kept + list(fresh_rows), plan.order_by), len(kept)
+
+
+class IncrementalCache:
+    def __init__(
+        self,
+        max_entries: int = INCREMENTAL_MAX_ENTRIES,
+        ttl_seconds: float = INCREMENTAL_TTL_SECONDS,
+        max_rows: int = RESULT_CACHE_MAX_ROWS,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_rows = max_rows
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, IncrementalEntry]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[IncrementalEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= self._clock():
+                del self._entries[key]
+                return None
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(
+        self,
+        key: str,
+        rows: List[Dict[str, Any]],
+        window: Window,
+        checked_at: datetime,
+        full_bytes: Optional[int],
+        expires_at: Optional[float] = None,
+    ) -> None:
+        if len(rows) > self.max_rows or self.max_entries <= 0:
+            return
+        entry = IncrementalEntry(
+            rows=rows,
+            window=window,
+            checked_at=checked_at,
+            full_bytes=full_bytes,
+            expires_at=expires_at if expires_at is not None else self._clock() + self.ttl_seconds,
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_INCREMENTAL_CACHE = IncrementalCache()
+
+
+def get_incremental_cache() -> IncrementalCache:
+    return _INCREMENTAL_CACHE
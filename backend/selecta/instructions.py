@@ -13,16 +13,21 @@
 # limitations under the License.
 
 import datetime
+import hashlib
 import json
 import logging
 import yaml
 from functools import lru_cache
+from typing import Optional
 
 from .config_loader import (
     get_bigquery_settings,
     get_dataset_config,
     get_prompt_settings,
 )
+from .cost_lint import describe_partitioning, load_table_partitioning
+from .prompt_profile import PromptProfile, ddl_columns, placeholder_counts, record_prompt_profile
+from .telemetry import stage
 from .utils import (
     fetch_bigquery_data_profiles,
     fetch_sample_data_for_tables,
@@ -44,7 +49,19 @@ def json_serial_default(obj):
     raise TypeError(f"Type {type(obj)} not serializable")
 
 
-def _load_instruction_template() -> str:
+_TEMPLATE_SECTIONS = (
+    "overall_workflow",
+    "bigquery_data_schema_and_context",
+    "table_schema_and_join_information",
+    "critical_joining_logic_and_context",
+    "data_profile_information",
+    "sample_data",
+    "usecase_specific_table_information",
+    "few_shot_examples",
+)
+
+
+def _load_instruction_template(profile: Optional[PromptProfile] = None) -> str:
     prompt_settings = get_prompt_settings()
     template_path = prompt_settings.instruction_file
     if not template_path.exists():
@@ -53,20 +70,16 @@ def _load_instruction_template() -> str:
     with template_path.open("r", encoding="utf-8") as handle:
         instructions_yaml = yaml.safe_load(handle)
 
-    sections = [
-        instructions_yaml.get("overall_workflow", ""),
-        instructions_yaml.get("bigquery_data_schema_and_context", ""),
-        instructions_yaml.get("table_schema_and_join_information", ""),
-        instructions_yaml.get("critical_joining_logic_and_context", ""),
-        instructions_yaml.get("data_profile_information", ""),
-        instructions_yaml.get("sample_data", ""),
-        instructions_yaml.get("usecase_specific_table_information", ""),
-        instructions_yaml.get("few_shot_examples", ""),
-    ]
-
-    template = "\n".join(section for section in sections if section)
+    sections = [(key, instructions_yaml.get(key, "")) for key in _TEMPLATE_SECTIONS]
+
+    template = "\n".join(section for _, section in sections if section)
     if not template.strip():
         raise ValueError("Instruction template is empty after concatenation.")
+    if profile is not None:
+        # Static text only; the injected values are charged to their own sections.
+        for key, section in sections:
+            if section:
+                profile.add_section(key, section.format(**{name: "" for name in placeholder_counts(section)}))
     return template
 
 
@@ -74,10 +87,29 @@ def _load_instruction_template() -> str:
 def return_instructions_bigquery() -> str:
     """
     Fetches table metadata, data profiles (conditionally sample data), formats them,
-    and injects them into the main instruction template.
+    and injects them into the main instruction template. Each render records a
+    per section, table and column size breakdown (see :mod:`selecta.prompt_profile`).
     """
+    with stage("prompt_build"):
+        return _build_instructions()
+
+
+@lru_cache(maxsize=4)
+def _hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def schema_snapshot() -> str:
+    """Short hash of the rendered prompt; changes whenever DDL, profiles or samples do."""
+    return _hash_text(return_instructions_bigquery())
+
+
+def _build_instructions() -> str:
     bigquery_settings = get_bigquery_settings()
     dataset_config = get_dataset_config()
+    prompt_profile = PromptProfile()
+    template = _load_instruction_template(prompt_profile)
+    repeats = placeholder_counts(template)
 
     table_ddls = get_table_ddl_strings()
     if not table_ddls:
@@ -87,7 +119,22 @@ def return_instructions_bigquery() -> str:
         for table_info in table_ddls:
             ddl = table_info.get("ddl", "")
             formatted_ddls.append(f"```sql\n{ddl}\n```")
+            table_name = table_info.get("table_name")
+            prompt_profile.attribute("ddl", formatted_ddls[-1], table_name, repeat=repeats["table_metadata"])
+            for column, line in ddl_columns(ddl):
+                prompt_profile.attribute("ddl", line, table_name, column, repeat=repeats["table_metadata"])
         table_metadata_string_for_prompt = "\n\n---\n\n".join(formatted_ddls)
+    prompt_profile.add_section("ddl", table_metadata_string_for_prompt, repeats["table_metadata"])
+
+    partitioning_summary = describe_partitioning(load_table_partitioning(bigquery_settings))
+    if partitioning_summary:
+        partitioning_string_for_prompt = (
+            "\n\n**Partitioning and clustering** (always filter partitioned tables on their "
+            "partition column; filters on clustering columns further reduce bytes scanned):\n"
+            + partitioning_summary
+        )
+        table_metadata_string_for_prompt += partitioning_string_for_prompt
+        prompt_profile.add_section("partitioning", partitioning_string_for_prompt, repeats["table_metadata"])
 
     data_profiles_raw = fetch_bigquery_data_profiles()
     data_profiles_string_for_prompt = ""
@@ -111,6 +158,10 @@ def return_instructions_bigquery() -> str:
             formatted_profiles.append(
                 f"Data profile for column '{column_key}' in table '{table_key}':\n{profile_str}"
             )
+            prompt_profile.attribute("profiles", formatted_profiles[-1], table_key, repeat=repeats["data_profiles"])
+            prompt_profile.attribute(
+                "profiles", formatted_profiles[-1], table_key, column_key, repeat=repeats["data_profiles"]
+            )
 
         data_profiles_string_for_prompt = (
             "\n\n---\n\n".join(formatted_profiles)
@@ -153,6 +204,16 @@ def return_instructions_bigquery() -> str:
                     f"**Sample Data for table `{item['table_name']}` (first {len(item.get('sample_rows', []))} rows):**\n"
                     f"```json\n{sample_rows_str}\n```"
                 )
+                prompt_profile.attribute("samples", formatted_samples[-1], item["table_name"], repeat=repeats["samples"])
+                for row in item.get("sample_rows", []):
+                    for column, value in row.items():
+                        prompt_profile.attribute(
+                            "samples",
+                            json.dumps({column: value}, ensure_ascii=False, default=str),
+                            item["table_name"],
+                            column,
+                            repeat=repeats["samples"],
+                        )
             samples_string_for_prompt = "\n\n---\n\n".join(formatted_samples)
         else:
             logger.warning(
@@ -167,12 +228,17 @@ def return_instructions_bigquery() -> str:
                 f"(Tables: {bigquery_settings.tables if bigquery_settings.tables else 'All'})."
             )
 
-    template = _load_instruction_template()
+    prompt_profile.add_section("profiles", data_profiles_string_for_prompt, repeats["data_profiles"])
+    prompt_profile.add_section("samples", samples_string_for_prompt, repeats["samples"])
+    prompt_profile.add_section("dataset_description", dataset_config.description or "", repeats["dataset_description"])
+
     final_instruction = template.format(
         table_metadata=table_metadata_string_for_prompt,
         data_profiles=data_profiles_string_for_prompt,
         samples=samples_string_for_prompt,
         dataset_description=dataset_config.description or "",
     )
+    prompt_profile.total.add(final_instruction)
+    record_prompt_profile(prompt_profile)
 
     return final_instruction
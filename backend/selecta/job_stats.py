@@ -0,0 +1,101 @@
+"""Summaries of BigQuery job statistics and query plans for result metadata."""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .constants import JOB_PLAN_MAX_STAGES
+from .telemetry import get_registry, observe_stage
+
+_STAGE_TIMING_FIELDS = (
+    ("waitMsAvg", "wait_ms_avg"),
+    ("waitMsMax", "wait_ms_max"),
+    ("readMsAvg", "read_ms_avg"),
+    ("readMsMax", "read_ms_max"),
+    ("computeMsAvg", "compute_ms_avg"),
+    ("computeMsMax", "compute_ms_max"),
+    ("writeMsAvg", "write_ms_avg"),
+    ("writeMsMax", "write_ms_max"),
+)
+
+
+def _millis_between(start: Optional[datetime], end: Optional[datetime]) -> Optional[int]:
+    if start is None or end is None:
+        return None
+    return int((end - start).total_seconds() * 1000)
+
+
+def _stage_duration_ms(entry: Any) -> int:
+    duration = _millis_between(getattr(entry, "start", None), getattr(entry, "end", None))
+    if duration is not None:
+        return duration
+    return sum(
+        getattr(entry, attribute, None) or 0
+        for attribute in ("wait_ms_max", "read_ms_max", "compute_ms_max", "write_ms_max")
+    )
+
+
+def _summarize_stage(entry: Any) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {
+        "id": getattr(entry, "entry_id", None),
+        "name": getattr(entry, "name", None),
+        "status": getattr(entry, "status", None),
+        "durationMs": _stage_duration_ms(entry),
+        "slotMs": getattr(entry, "slot_ms", None),
+        "recordsRead": getattr(entry, "records_read", None),
+        "recordsWritten": getattr(entry, "records_written", None),
+        "shuffleOutputBytes": getattr(entry, "shuffle_output_bytes", None),
+    }
+    for key, attribute in _STAGE_TIMING_FIELDS:
+        summary[key] = getattr(entry, attribute, None)
+    return summary
+
+
+def slowest_stages(query_plan: Optional[List[Any]], limit: int = JOB_PLAN_MAX_STAGES) -> List[Dict[str, Any]]:
+    """Return the ``limit`` slowest plan stages with their wait/read/compute/write breakdown."""
+    if not query_plan or limit <= 0:
+        return []
+    ranked = sorted(query_plan, key=_stage_duration_ms, reverse=True)
+    return [_summarize_stage(entry) for entry in ranked[:limit]]
+
+
+def summarize_job(query_job: Any) -> Optional[Dict[str, Any]]:
+    """Extract bytes, slot usage, cache and timing statistics from a finished job.
+
+    Returns ``None`` for jobs that carry no statistics (e.g. local execution).
+    """
+    created = getattr(query_job, "created", None)
+    started = getattr(query_job, "started", None)
+    ended = getattr(query_job, "ended", None)
+    query_plan = getattr(query_job, "query_plan", None) or []
+    stats: Dict[str, Any] = {
+        "totalBytesProcessed": getattr(query_job, "total_bytes_processed", None),
+        "totalBytesBilled": getattr(query_job, "total_bytes_billed", None),
+        "slotMillis": getattr(query_job, "slot_millis", None),
+        "cacheHit": getattr(query_job, "cache_hit", None),
+        "queueMs": _millis_between(created, started),
+        "runMs": _millis_between(started, ended),
+    }
+    if all(value is None for value in stats.values()) and not query_plan:
+        return None
+    stats["planStageCount"] = len(query_plan)
+    stats["slowestStages"] = slowest_stages(query_plan)
+    return stats
+
+
+def record_job_metrics(stats: Optional[Dict[str, Any]], backend: str) -> None:
+    if not stats:
+        return
+    registry = get_registry()
+    for metric, key in (
+        ("selecta_bytes_processed_total", "totalBytesProcessed"),
+        ("selecta_bytes_billed_total", "totalBytesBilled"),
+        ("selecta_slot_millis_total", "slotMillis"),
+    ):
+        if stats.get(key):
+            registry.increment(metric, stats[key], backend=backend)
+    if stats.get("cacheHit") is not None:
+        registry.increment("selecta_job_cache_total", backend=backend, hit=str(bool(stats["cacheHit"])).lower())
+    if stats.get("queueMs") is not None:
+        observe_stage("bigquery_queue", stats["queueMs"], backend=backend)
+    if stats.get("runMs") is not None:
+        observe_stage("bigquery_run", stats["runMs"], backend=backend)
@@ -0,0 +1,85 @@
+"""Per-request choice between a fast and a strong model.
+
+A dataset may list several models, fastest first:
+
+.. code-block:: yaml
+
+    models:
+      - "gemini-2.5-flash"
+      - "gemini-2.5-pro"
+    model_routing:
+      fast_max_words: 20
+      fast_max_tables: 1
+
+The :func:`selecta.callbacks.route_model` before-model callback then sends each
+model call to the first (fast) or the last (strong) entry, based on cheap local
+signals:
+
+* the previous query in the session failed (``latest_error`` is newer than
+  ``latest_result``), so a fast model that wrote broken SQL is escalated for
+  the rest of the attempt;
+* the question has more than ``fast_max_words`` words;
+* the question names more than ``fast_max_tables`` of the dataset's tables.
+
+Anything else is a simple lookup and goes to the fast model. With a single
+model configured nothing is rerouted.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, List, Mapping, Optional, Sequence
+
+from .config_loader import ModelRoutingSettings
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    model: str
+    tier: str
+    reason: str
+
+
+def mentioned_tables(question: str, tables: Sequence[str]) -> List[str]:
+    """Tables named in ``question``, matching ``order_items`` as "order items" and plurals loosely."""
+    text = " ".join(_WORD.findall(question.lower()))
+    found = []
+    # Longest names first, so "order items" is not also counted as "orders".
+    for table in sorted(tables, key=len, reverse=True):
+        name = table.split(".")[-1].lower().replace("_", " ")
+        stem = name[:-1] if name.endswith("s") and len(name) > 3 else name
+        text, matches = re.subn(rf"\b{re.escape(stem)}(?:s|es)?\b", " ", text)
+        if matches:
+            found.append(table)
+    return found
+
+
+def last_query_failed(state: Optional[Mapping[str, Any]]) -> bool:
+    """True when the session's most recent query attempt ended in an error."""
+    if not state:
+        return False
+    error = state.get("latest_error") or {}
+    if not error:
+        return False
+    result = state.get("latest_result") or {}
+    return (error.get("timestamp") or 0) >= (result.get("createdAt") or 0)
+
+
+def choose_model(
+    models: Sequence[str],
+    settings: ModelRoutingSettings,
+    question: str,
+    tables: Sequence[str],
+    query_failed: bool = False,
+) -> ModelRoute:
+    if len(models) < 2:
+        return ModelRoute(model=models[0], tier="default", reason="single_model")
+    fast, strong = models[0], models[-1]
+    if query_failed:
+        return ModelRoute(model=strong, tier="strong", reason="sql_error")
+    if len(_WORD.findall(question)) > settings.fast_max_words:
+        return ModelRoute(model=strong, tier="strong", reason="long_question")
+    if len(mentioned_tables(question, tables)) > settings.fast_max_tables:
+        return ModelRoute(model=strong, tier="strong", reason="many_tables")
+    return ModelRoute(model=fast, tier="fast", reason="simple")
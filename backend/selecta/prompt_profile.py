@@ -0,0 +1,178 @@
+"""Byte and estimated token accounting for the rendered system prompt.
+
+:func:`selecta.instructions.return_instructions_bigquery` records a
+:class:`PromptProfile` while it renders the prompt:
+
+* one entry per static template section (``overall_workflow``,
+  ``few_shot_examples``, ...), measured without its placeholders;
+* one entry per injected value (``ddl``, ``partitioning``, ``profiles``,
+  ``samples``, ``dataset_description``), multiplied by the number of times the
+  template references it;
+* the DDL, profile and sample bytes of every table and of every column.
+
+Token counts are estimated at :data:`BYTES_PER_TOKEN` bytes per token, which is
+close enough to rank sections without a tokenizer round trip. Section and table
+sizes are published as gauges on the metrics surface; the per column
+breakdown would multiply label cardinality, so it is only in the report::
+
+    python -m selecta.prompt_profile [--top 15] [--json]
+"""
+
+import argparse
+import json
+import math
+import re
+import string
+import sys
+import threading
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from .telemetry import get_registry
+
+BYTES_PER_TOKEN = 4
+
+# Top-level column lines of a BigQuery DDL statement: "  name TYPE ...".
+_DDL_COLUMN = re.compile(r"^ {2}`?([A-Za-z_][A-Za-z0-9_]*)`?\s+[A-Z]")
+
+get_registry().describe("selecta_prompt_bytes", "Bytes of each section of the rendered system prompt.")
+get_registry().describe("selecta_prompt_tokens_estimate", "Estimated tokens of each section of the rendered system prompt.")
+get_registry().describe("selecta_prompt_table_tokens_estimate", "Estimated prompt tokens spent on each table, by section.")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text.encode("utf-8")) / BYTES_PER_TOKEN)
+
+
+def table_key(table: Optional[str]) -> str:
+    """``project.dataset.table`` and ``table`` both map to ``table``."""
+    return str(table or "unknown").split(".")[-1]
+
+
+def placeholder_counts(template: str) -> Counter:
+    """How many times ``template`` references each ``{placeholder}``."""
+    return Counter(name for _, name, _, _ in string.Formatter().parse(template) if name)
+
+
+def ddl_columns(ddl: str) -> List[Tuple[str, str]]:
+    """``(column, line)`` for every top-level column definition in ``ddl``."""
+    columns = []
+    for line in ddl.splitlines():
+        match = _DDL_COLUMN.match(line)
+        if match:
+            columns.append((match.group(1), line))
+    return columns
+
+
+@dataclass
+class PromptSize:
+    bytes: int = 0
+    tokens: int = 0
+
+    def add(self, text: str, repeat: int = 1) -> None:
+        self.bytes += len(text.encode("utf-8")) * repeat
+        self.tokens += estimate_tokens(text) * repeat
+
+
+@dataclass
+class PromptProfile:
+    total: PromptSize = field(default_factory=PromptSize)
+    sections: Dict[str, PromptSize] = field(default_factory=dict)
+    tables: Dict[str, Dict[str, PromptSize]] = field(default_factory=dict)
+    columns: Dict[str, Dict[str, PromptSize]] = field(default_factory=dict)
+
+    def add_section(self, section: str, text: str, repeat: int = 1) -> None:
+        if text and repeat:
+            self.sections.setdefault(section, PromptSize()).add(text, repeat)
+
+    def attribute(self, section: str, text: str, table: Optional[str], column: Optional[str] = None, repeat: int = 1) -> None:
+        """Charge ``text`` (part of ``section``) to a table, or to one of its columns."""
+        if not text or not repeat:
+            return
+        name = table_key(table)
+        if column is None:
+            bucket = self.tables.setdefault(name, {})
+        else:
+            bucket = self.columns.setdefault(f"{name}.{column}", {})
+        bucket.setdefault(section, PromptSize()).add(text, repeat)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _size_of(parts: Mapping[str, PromptSize]) -> PromptSize:
+    return PromptSize(bytes=sum(p.bytes for p in parts.values()), tokens=sum(p.tokens for p in parts.values()))
+
+
+_LAST_PROFILE: Optional[PromptProfile] = None
+_LOCK = threading.Lock()
+
+
+def record_prompt_profile(profile: PromptProfile) -> None:
+    """Keep ``profile`` as the latest one and publish its gauges."""
+    global _LAST_PROFILE
+    with _LOCK:
+        _LAST_PROFILE = profile
+    registry = get_registry()
+    for section, size in [("total", profile.total), *profile.sections.items()]:
+        registry.set_gauge("selecta_prompt_bytes", size.bytes, section=section)
+        registry.set_gauge("selecta_prompt_tokens_estimate", size.tokens, section=section)
+    for table, parts in profile.tables.items():
+        for section, size in parts.items():
+            registry.set_gauge("selecta_prompt_table_tokens_estimate", size.tokens, table=table, section=section)
+
+
+def get_prompt_profile() -> Optional[PromptProfile]:
+    """Profile of the last rendered prompt, or None before the first render."""
+    with _LOCK:
+        return _LAST_PROFILE
+
+
+def _share(size: PromptSize, total: PromptSize) -> str:
+    return f"{100 * size.bytes / total.bytes:5.1f}%" if total.bytes else "    -"
+
+
+def _ranked(entries: Mapping[str, Dict[str, PromptSize]], top: int) -> List[Tuple[str, PromptSize, Dict[str, PromptSize]]]:
+    rows = [(name, _size_of(parts), parts) for name, parts in entries.items()]
+    rows.sort(key=lambda row: row[1].bytes, reverse=True)
+    return rows[:top]
+
+
+def format_report(profile: PromptProfile, top: int = 15) -> str:
+    total = profile.total
+    lines = [f"System prompt: {total.bytes:,} bytes, ~{total.tokens:,} tokens", "", "Sections:"]
+    for section, size in sorted(profile.sections.items(), key=lambda item: item[1].bytes, reverse=True):
+        lines.append(f"  {section:<36} {size.bytes:>10,} B  ~{size.tokens:>8,} tok  {_share(size, total)}")
+    for title, entries in (("Tables", profile.tables), ("Columns", profile.columns)):
+        if not entries:
+            continue
+        lines.extend(["", f"{title} (top {min(top, len(entries))} of {len(entries)}):"])
+        for name, size, parts in _ranked(entries, top):
+            breakdown = ", ".join(f"{section} {part.tokens:,}" for section, part in sorted(parts.items()))
+            lines.append(f"  {name:<36} {size.bytes:>10,} B  ~{size.tokens:>8,} tok  {_share(size, total)}  ({breakdown})")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Break the Selecta system prompt down by section, table and column.")
+    parser.add_argument("--top", type=int, default=15, help="Tables and columns to list.")
+    parser.add_argument("--json", action="store_true", help="Print the full profile as JSON.")
+    args = parser.parse_args(argv)
+
+    from .instructions import return_instructions_bigquery
+
+    return_instructions_bigquery()
+    profile = get_prompt_profile()
+    if profile is None:
+        print("The prompt was not rendered.", file=sys.stderr)
+        return 1
+    if args.json:
+        print(json.dumps(profile.to_dict(), indent=2))
+    else:
+        print(format_report(profile, args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
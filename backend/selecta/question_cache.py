@@ -0,0 +1,222 @@
+"""Cache of natural-language questions and the SQL that answered them.
+
+Every successful ``execute_bigquery_query`` call for the opening question of
+a session records that question (normalised: lower-case, punctuation and
+extra whitespace removed) and the SQL the model wrote for it, per dataset.
+Follow-up questions are not recorded because their meaning depends on the
+earlier turns. When the same question is asked again,
+:func:`selecta.callbacks.replay_cached_question` answers the model's SQL
+generation turn itself with a function call to ``execute_bigquery_query``, so
+only the summarising turn reaches the model.
+
+A question matches when its normalised text is identical or, if
+``SELECTA_QUESTION_CACHE_SIMILARITY`` is below 1, when both its
+``difflib`` ratio and token Jaccard similarity reach that threshold *and* it
+mentions exactly the same numbers (so "revenue in 2023" never replays the SQL
+for "revenue in 2024"). Entries carry the schema snapshot hash of the prompt
+they were produced under; a different snapshot drops the dataset's entries.
+Questions answered with more than one query in the same turn are not cached,
+since replaying a single query would answer them only in part. With a
+:mod:`selecta.shared_store` configured, exact matches are also shared between
+worker processes; near matches are only searched in the local cache.
+"""
+
+import difflib
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .constants import (
+    QUESTION_CACHE_MAX_ENTRIES,
+    QUESTION_CACHE_SIMILARITY,
+    QUESTION_CACHE_TTL_SECONDS,
+)
+from .shared_store import get_shared_store, register_type
+from .telemetry import get_registry
+
+# Session state key the replay callback uses to tell the tool its SQL came from the cache.
+QUESTION_REPLAY_STATE_KEY = "question_cache_replay"
+
+_PUNCTUATION = re.compile(r"[^\w\s.]|(?<!\d)\.|\.(?!\d)")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+def normalize_question(question: str) -> str:
+    text = _PUNCTUATION.sub(" ", question.lower())
+    return " ".join(text.split())
+
+
+def question_similarity(first: str, second: str) -> float:
+    """Lower of the character ratio and token Jaccard similarity of two normalised questions."""
+    if first == second:
+        return 1.0
+    first_tokens, second_tokens = set(first.split()), set(second.split())
+    union = first_tokens | second_tokens
+    jaccard = len(first_tokens & second_tokens) / len(union) if union else 0.0
+    ratio = difflib.SequenceMatcher(None, first, second).ratio()
+    return min(ratio, jaccard)
+
+
+def question_text(content: Any) -> str:
+    """Join the text parts of an ADK/genai ``Content`` (``""`` when absent)."""
+    parts = getattr(content, "parts", None) or []
+    return " ".join(part.text for part in parts if getattr(part, "text", None)).strip()
+
+
+@register_type
+@dataclass
+class QuestionEntry:
+    question: str
+    normalized: str
+    sql: str
+    snapshot: str
+    invocation_id: Optional[str]
+    created_at: float
+    hits: int = 0
+
+
+class QuestionCache:
+    def __init__(
+        self,
+        max_entries: int = QUESTION_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = QUESTION_CACHE_TTL_SECONDS,
+        similarity: float = QUESTION_CACHE_SIMILARITY,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._datasets: Dict[str, "OrderedDict[str, QuestionEntry]"] = {}
+        self._snapshots: Dict[str, str] = {}
+        self._multi_query: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def _entries(self, dataset_id: str, snapshot: str) -> "OrderedDict[str, QuestionEntry]":
+        """Return the dataset's entries, dropping them first if the schema changed (lock held)."""
+        if self._snapshots.get(dataset_id) != snapshot:
+            if dataset_id in self._datasets:
+                get_registry().increment("selecta_question_cache_invalidations_total", dataset=dataset_id)
+            self._datasets[dataset_id] = OrderedDict()
+            self._snapshots[dataset_id] = snapshot
+        return self._datasets[dataset_id]
+
+    def lookup(self, dataset_id: str, snapshot: str, question: str) -> Optional[Tuple[QuestionEntry, float]]:
+        if not self.enabled or not question.strip():
+            return None
+        normalized = normalize_question(question)
+        numbers = _NUMBER.findall(normalized)
+        now = self._clock()
+        best: Optional[Tuple[QuestionEntry, float]] = None
+        with self._lock:
+            entries = self._entries(dataset_id, snapshot)
+            for key, entry in list(entries.items()):
+                if now - entry.created_at > self.ttl_seconds:
+                    del entries[key]
+                    continue
+                if key == normalized:
+                    best = (entry, 1.0)
+                    break
+                if self.similarity >= 1 or _NUMBER.findall(key) != numbers:
+                    continue
+                score = question_similarity(normalized, key)
+                if score >= self.similarity and (best is None or score > best[1]):
+                    best = (entry, score)
+            if best is None:
+                shared_entry = self._shared_entry(dataset_id, snapshot, normalized, now)
+                if shared_entry is not None:
+                    entries[normalized] = shared_entry
+                    best = (shared_entry, 1.0)
+            if best is not None:
+                best[0].hits += 1
+                entries.move_to_end(best[0].normalized)
+        get_registry().increment(
+            "selecta_question_cache_requests_total",
+            outcome="miss" if best is None else ("hit" if best[1] == 1.0 else "similar_hit"),
+        )
+        return best
+
+    def _shared_entry(self, dataset_id: str, snapshot: str, normalized: str, now: float) -> Optional[QuestionEntry]:
+        shared = get_shared_store()
+        entry = shared.get(f"question:{dataset_id}", normalized) if shared is not None else None
+        if entry is None or entry.snapshot != snapshot or now - entry.created_at > self.ttl_seconds:
+            return None
+        return entry
+
+    def record(
+        self,
+        dataset_id: str,
+        snapshot: str,
+        question: str,
+        sql_query: str,
+        invocation_id: Optional[str] = None,
+    ) -> None:
+        if not self.enabled or not question.strip():
+            return
+        normalized = normalize_question(question)
+        with self._lock:
+            entries = self._entries(dataset_id, snapshot)
+            if invocation_id is not None and (invocation_id, normalized) in self._multi_query:
+                return
+            existing = entries.get(normalized)
+            if existing is not None and invocation_id is not None and existing.invocation_id == invocation_id:
+                if existing.sql != sql_query:
+                    # Several queries answered this turn; a single replay would be incomplete.
+                    del entries[normalized]
+                    self._shared_delete(dataset_id, normalized)
+                    self._multi_query[(invocation_id, normalized)] = None
+                    while len(self._multi_query) > 1024:
+                        self._multi_query.popitem(last=False)
+                return
+            entry = QuestionEntry(
+                question=question,
+                normalized=normalized,
+                sql=sql_query,
+                snapshot=snapshot,
+                invocation_id=invocation_id,
+                created_at=self._clock(),
+            )
+            entries[normalized] = entry
+            entries.move_to_end(normalized)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+        shared = get_shared_store()
+        if shared is not None:
+            shared.put(f"question:{dataset_id}", normalized, entry, self.ttl_seconds)
+
+    def _shared_delete(self, dataset_id: str, normalized: Optional[str] = None) -> None:
+        shared = get_shared_store()
+        if shared is not None:
+            shared.delete(f"question:{dataset_id}", normalized)
+
+    def invalidate(self, dataset_id: str, question: Optional[str] = None) -> None:
+        normalized = normalize_question(question) if question is not None else None
+        self._shared_delete(dataset_id, normalized)
+        with self._lock:
+            entries = self._datasets.get(dataset_id)
+            if entries is None:
+                return
+            if normalized is None:
+                entries.clear()
+            else:
+                entries.pop(normalized, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._datasets.clear()
+            self._snapshots.clear()
+            self._multi_query.clear()
+
+
+_QUESTION_CACHE = QuestionCache()
+
+
+def get_question_cache() -> QuestionCache:
+    return _QUESTION_CACHE
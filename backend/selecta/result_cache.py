@@ -0,0 +1,138 @@
+"""In-process cache of query outcomes keyed by canonical SQL.
+
+``execute_bigquery_query`` looks up :func:`selecta.singleflight.query_key`
+(the canonical form of the SQL plus the project and dataset) before
+submitting a job. A hit skips BigQuery entirely; the caller still gets a new
+result id and history entry, flagged with ``cacheHit``. Entries expire after
+``SELECTA_RESULT_CACHE_TTL_SECONDS`` and the least recently used entry is
+evicted beyond ``SELECTA_RESULT_CACHE_MAX_ENTRIES``. Queries calling
+volatile functions (``RAND()``, ``CURRENT_TIMESTAMP()`` ...) are never cached.
+
+Hits are counted separately for exact-text and canonical-only matches, so
+``selecta_result_cache_hits_total{match="canonical"}`` shows what
+canonicalization adds over plain text caching. When a
+:mod:`selecta.shared_store` is configured, entries are also written there and
+local misses are looked up in it, so workers share one cache.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from .constants import RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_ROWS, RESULT_CACHE_TTL_SECONDS
+from .shared_store import get_shared_store
+from .singleflight import normalize_sql_text
+from .telemetry import get_registry
+
+# The CURRENT_* functions may be called without parentheses.
+_VOLATILE_FUNCTIONS = re.compile(
+    r"\b(?:(?:RAND|GENERATE_UUID|SESSION_USER)\s*\(|CURRENT_(?:DATE|DATETIME|TIME|TIMESTAMP)\b)",
+    re.IGNORECASE,
+)
+
+
+def is_cacheable(sql_query: str) -> bool:
+    return _VOLATILE_FUNCTIONS.search(sql_query) is None
+
+
+@dataclass
+class _Entry:
+    value: Any
+    text: str
+    expires_at: float
+
+
+class ResultCache:
+    def __init__(
+        self,
+        max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = RESULT_CACHE_TTL_SECONDS,
+        max_rows: int = RESULT_CACHE_MAX_ROWS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_rows = max_rows
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._hits = 0
+        self._lookups = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _shared_entry(self, key: str) -> Optional[_Entry]:
+        shared = get_shared_store()
+        cached = shared.get("result", key) if shared is not None else None
+        if cached is None:
+            return None
+        text, value = cached
+        return _Entry(value=value, text=text, expires_at=self._clock() + self.ttl_seconds)
+
+    def get(self, key: str, sql_query: str) -> Optional[Any]:
+        if not self.enabled or not is_cacheable(sql_query):
+            return None
+        registry = get_registry()
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                del self._entries[key]
+                entry = None
+        if entry is None:
+            entry = self._shared_entry(key)
+        with self._lock:
+            self._lookups += 1
+            if entry is not None:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                self._hits += 1
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            hit_ratio = self._hits / self._lookups
+            size = len(self._entries)
+        registry.set_gauge("selecta_result_cache_hit_ratio", hit_ratio)
+        registry.set_gauge("selecta_result_cache_entries", size)
+        if entry is None:
+            registry.increment("selecta_result_cache_requests_total", outcome="miss")
+            return None
+        match = "exact" if entry.text == normalize_sql_text(sql_query) else "canonical"
+        registry.increment("selecta_result_cache_requests_total", outcome="hit")
+        registry.increment("selecta_result_cache_hits_total", match=match)
+        return entry.value
+
+    def put(self, key: str, sql_query: str, value: Any, row_count: int) -> None:
+        if not self.enabled or not is_cacheable(sql_query) or row_count > self.max_rows:
+            return
+        text = normalize_sql_text(sql_query)
+        with self._lock:
+            self._entries[key] = _Entry(value=value, text=text, expires_at=self._clock() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            size = len(self._entries)
+        get_registry().set_gauge("selecta_result_cache_entries", size)
+        shared = get_shared_store()
+        if shared is not None:
+            shared.put("result", key, (text, value), self.ttl_seconds)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._lookups = 0
+
+
+_RESULT_CACHE = ResultCache()
+
+
+def get_result_cache() -> ResultCache:
+    return _RESULT_CACHE
@@ -0,0 +1,207 @@
+"""Spill large results to local Arrow IPC files and serve row ranges from them.
+
+Results with more than ``SELECTA_SPILL_THRESHOLD_ROWS`` rows are written once
+to ``<spill dir>/<result id>.arrow``. Session state then only carries a
+preview, and :func:`read_result_range` pages through the full result by
+offset/limit (with optional sort and filters) by memory-mapping the file, so
+neither a new BigQuery job nor a Python copy of every row is needed.
+
+Spilling requires ``pyarrow`` (``pip install selecta[local]``); without it
+results stay in state exactly as before.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from .constants import (
+    RESULT_SPILL_DIR,
+    RESULT_SPILL_THRESHOLD_ROWS,
+    RESULT_SPILL_TTL_SECONDS,
+)
+from .telemetry import get_registry, stage
+
+logger = logging.getLogger(__name__)
+
+_RESULT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_\-]+$")
+
+FILTER_OPERATORS = {"==", "!=", ">", ">=", "<", "<=", "in", "contains"}
+
+
+def _pyarrow() -> Any:
+    try:
+        import pyarrow
+        import pyarrow.compute  # noqa: F401 - registers pyarrow.compute
+        import pyarrow.ipc  # noqa: F401 - registers pyarrow.ipc
+    except ImportError:
+        return None
+    return pyarrow
+
+
+class ResultNotFoundError(KeyError):
+    """Raised when no spilled file exists for a result id."""
+
+
+class ResultStore:
+    def __init__(
+        self,
+        directory: Path = RESULT_SPILL_DIR,
+        threshold_rows: int = RESULT_SPILL_THRESHOLD_ROWS,
+        ttl_seconds: float = RESULT_SPILL_TTL_SECONDS,
+    ) -> None:
+        self.directory = Path(directory)
+        self.threshold_rows = threshold_rows
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def available(self) -> bool:
+        return _pyarrow() is not None
+
+    def should_spill(self, row_count: int) -> bool:
+        return self.threshold_rows > 0 and row_count > self.threshold_rows and self.available()
+
+    def path_for(self, result_id: str) -> Path:
+        if not _RESULT_ID_PATTERN.match(result_id):
+            raise ValueError(f"Invalid result id: {result_id!r}")
+        return self.directory / f"{result_id}.arrow"
+
+    def has(self, result_id: str) -> bool:
+        try:
+            return self.path_for(result_id).exists()
+        except ValueError:
+            return False
+
+    def spill(self, result_id: str, rows: List[Dict[str, Any]]) -> Path:
+        """Write ``rows`` (already normalised) to an Arrow IPC file."""
+        pa = _pyarrow()
+        if pa is None:
+            raise RuntimeError("Spilling results requires pyarrow (pip install selecta[local]).")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        destination = self.path_for(result_id)
+        temporary = destination.with_suffix(".arrow.tmp")
+        with stage("result_spill"):
+            table = pa.Table.from_pylist(rows)
+            with pa.OSFile(str(temporary), "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(temporary, destination)
+        get_registry().increment("selecta_result_spills_total")
+        get_registry().increment("selecta_result_spill_bytes_total", destination.stat().st_size)
+        self._sweep()
+        return destination
+
+    def open_table(self, result_id: str) -> Any:
+        """Memory-map the spilled file; column buffers are not copied into Python."""
+        pa = _pyarrow()
+        if pa is None:
+            raise RuntimeError("Reading spilled results requires pyarrow (pip install selecta[local]).")
+        path = self.path_for(result_id)
+        if not path.exists():
+            raise ResultNotFoundError(result_id)
+        # The table's buffers keep the mapping alive after this function returns.
+        return pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+
+    def read_range(
+        self,
+        result_id: str,
+        offset: int = 0,
+        limit: int = 100,
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+        filters: Optional[Sequence[Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
+        pa = _pyarrow()
+        with stage("result_range_read"):
+            table = self.open_table(result_id)
+            if filters:
+                table = table.filter(_filter_mask(pa, table, filters))
+            if sort_by:
+                if sort_by not in table.column_names:
+                    raise ValueError(f"Unknown sort column: {sort_by}")
+                table = table.sort_by([(sort_by, "descending" if descending else "ascending")])
+            offset = max(0, int(offset))
+            limit = max(0, int(limit))
+            rows = table.slice(offset, limit).to_pylist()
+        return {
+            "resultId": result_id,
+            "rows": rows,
+            "columns": table.column_names,
+            "offset": offset,
+            "limit": limit,
+            "totalRows": table.num_rows,
+        }
+
+    def _sweep(self) -> None:
+        """Delete spill files older than the TTL (at most once a minute)."""
+        now = time.time()
+        if self.ttl_seconds <= 0 or now - self._last_sweep < 60:
+            return
+        with self._lock:
+            self._last_sweep = now
+            for path in self.directory.glob("*.arrow"):
+                try:
+                    if now - path.stat().st_mtime > self.ttl_seconds:
+                        path.unlink()
+                except OSError:
+                    continue
+
+
+def _filter_mask(pa: Any, table: Any, filters: Sequence[Dict[str, Any]]) -> Any:
+    pc = pa.compute
+    mask = None
+    for condition in filters:
+        column = condition.get("column")
+        operator = condition.get("op", "==")
+        value = condition.get("value")
+        if column not in table.column_names:
+            raise ValueError(f"Unknown filter column: {column}")
+        if operator not in FILTER_OPERATORS:
+            raise ValueError(f"Unsupported filter operator: {operator}")
+        field = table[column]
+        if value is None and operator in {"==", "!="}:
+            current = pc.is_null(field) if operator == "==" else pc.is_valid(field)
+        elif operator == "in":
+            current = pc.is_in(field, value_set=pa.array(list(value or [])))
+        elif operator == "contains":
+            current = pc.match_substring(pc.cast(field, pa.string()), str(value), ignore_case=True)
+        else:
+            function = {
+                "==": pc.equal,
+                "!=": pc.not_equal,
+                ">": pc.greater,
+                ">=": pc.greater_equal,
+                "<": pc.less,
+                "<=": pc.less_equal,
+            }[operator]
+            current = function(field, pa.scalar(value, type=field.type))
+        current = pc.fill_null(current, False)
+        mask = current if mask is None else pc.and_(mask, current)
+    return mask
+
+
+_RESULT_STORE = ResultStore()
+
+
+def get_result_store() -> ResultStore:
+    return _RESULT_STORE
+
+
+def read_result_range(
+    result_id: str,
+    offset: int = 0,
+    limit: int = 100,
+    sort_by: Optional[str] = None,
+    descending: bool = False,
+    filters: Optional[Sequence[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """Return ``limit`` rows starting at ``offset`` from a spilled result.
+
+    ``filters`` is a list of ``{"column", "op", "value"}`` conditions combined
+    with AND; ``op`` is one of ``==, !=, >, >=, <, <=, in, contains``.
+    """
+    return get_result_store().read_range(result_id, offset, limit, sort_by, descending, filters)
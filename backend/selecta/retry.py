@@ -0,0 +1,102 @@
+"""Retry policy for transient BigQuery failures.
+
+BigQuery reports transient problems (``rateLimitExceeded``, ``backendError``,
+HTTP 5xx) the same way it reports a bad query, so without this layer the
+agent would spend a whole model turn rewriting SQL that was fine. Only the
+reasons in :data:`RETRIABLE_REASONS` and server-side HTTP statuses are
+retried; everything else (``invalidQuery``, ``notFound``, ``accessDenied``,
+``quotaExceeded`` ...) is raised straight away.
+
+Delays use exponential backoff with "full jitter": attempt ``n`` sleeps a
+uniformly random time in ``[0, min(max_backoff, initial * multiplier**n)]``.
+"""
+
+import random
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from google.api_core import exceptions as google_exceptions
+
+from .constants import (
+    QUERY_RETRY_INITIAL_BACKOFF_SECONDS,
+    QUERY_RETRY_MAX_ATTEMPTS,
+    QUERY_RETRY_MAX_BACKOFF_SECONDS,
+    QUERY_RETRY_MULTIPLIER,
+)
+
+RETRIABLE_REASONS = frozenset(
+    {
+        "backendError",
+        "internalError",
+        "jobBackendError",
+        "jobInternalError",
+        "rateLimitExceeded",
+    }
+)
+
+_RETRIABLE_EXCEPTIONS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServerError,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+def error_reasons(exc: BaseException) -> List[str]:
+    """Return the BigQuery ``reason`` codes attached to an API error."""
+    reasons: List[str] = []
+    for error in getattr(exc, "errors", None) or []:
+        reason = error.get("reason") if isinstance(error, dict) else None
+        if reason:
+            reasons.append(str(reason))
+    return reasons
+
+
+def retry_reason(exc: BaseException) -> Optional[str]:
+    """Return why ``exc`` is worth retrying, or ``None`` for permanent errors."""
+    reasons = error_reasons(exc)
+    for reason in reasons:
+        if reason in RETRIABLE_REASONS:
+            return reason
+    if reasons:
+        # An explicit non-transient reason (e.g. invalidQuery) wins over the status code.
+        return None
+    if isinstance(exc, _RETRIABLE_EXCEPTIONS):
+        code = getattr(exc, "code", None)
+        return f"http_{int(code)}" if code else type(exc).__name__
+    return None
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = QUERY_RETRY_MAX_ATTEMPTS
+    initial_backoff_seconds: float = QUERY_RETRY_INITIAL_BACKOFF_SECONDS
+    max_backoff_seconds: float = QUERY_RETRY_MAX_BACKOFF_SECONDS
+    multiplier: float = QUERY_RETRY_MULTIPLIER
+    random: Callable[[], float] = field(default=random.random, compare=False, repr=False)
+
+    def should_retry(self, exc: BaseException, retries_so_far: int) -> Optional[str]:
+        """Return the retry reason if another attempt is allowed, else ``None``."""
+        if retries_so_far + 1 >= self.max_attempts:
+            return None
+        return retry_reason(exc)
+
+    def backoff(self, retries_so_far: int) -> float:
+        ceiling = min(
+            self.max_backoff_seconds,
+            self.initial_backoff_seconds * self.multiplier**retries_so_far,
+        )
+        return max(0.0, ceiling) * self.random()
+
+
+_POLICY = RetryPolicy()
+
+
+def get_retry_policy() -> RetryPolicy:
+    return _POLICY
+
+
+def set_retry_policy(policy: Optional[RetryPolicy]) -> None:
+    global _POLICY
+    _POLICY = policy or RetryPolicy()
+
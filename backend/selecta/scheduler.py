@@ -0,0 +1,202 @@
+"""Admission control and fair scheduling for concurrent query execution.
+
+:class:`QueryScheduler` caps the number of queries running at once, both
+globally and per user. Requests that cannot start immediately wait in a
+bounded queue grouped by session; freed slots are handed out round-robin
+across sessions so one chatty session (or an agent retrying in a loop)
+cannot starve the others. When the queue is full, or a request waits longer
+than the queue timeout, admission fails fast with :class:`AdmissionError`.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, Optional
+
+from .constants import (
+    QUERY_MAX_CONCURRENT,
+    QUERY_MAX_CONCURRENT_PER_USER,
+    QUERY_QUEUE_SIZE,
+    QUERY_QUEUE_TIMEOUT_SECONDS,
+)
+from .telemetry import get_registry, observe_stage
+
+ANONYMOUS = "anonymous"
+
+
+class AdmissionError(RuntimeError):
+    """Raised when a query cannot be admitted (queue full or wait timed out)."""
+
+    def __init__(self, message: str, reason: str) -> None:
+        super().__init__(message)
+        self.reason = reason
+
+
+@dataclass
+class _Ticket:
+    user_id: str
+    session_id: str
+    enqueued_at: float = field(default_factory=time.perf_counter)
+    granted: bool = False
+
+
+@dataclass(frozen=True)
+class Admission:
+    user_id: str
+    session_id: str
+    wait_ms: float
+
+
+def caller_identity(tool_context: Optional[Any]) -> "tuple[str, str]":
+    """Return ``(user_id, session_id)`` for an ADK tool context."""
+    user_id = getattr(tool_context, "user_id", None) or ANONYMOUS
+    session = getattr(tool_context, "session", None)
+    session_id = getattr(session, "id", None) or user_id
+    return str(user_id), str(session_id)
+
+
+class QueryScheduler:
+    def __init__(
+        self,
+        max_concurrent: int = QUERY_MAX_CONCURRENT,
+        max_per_user: int = QUERY_MAX_CONCURRENT_PER_USER,
+        max_queue: int = QUERY_QUEUE_SIZE,
+        queue_timeout_seconds: float = QUERY_QUEUE_TIMEOUT_SECONDS,
+    ) -> None:
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_per_user = max(1, max_per_user)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._running = 0
+        self._running_per_user: Dict[str, int] = {}
+        self._queues: "OrderedDict[str, Deque[_Ticket]]" = OrderedDict()
+        self._queued = 0
+
+    # -- introspection -----------------------------------------------------
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    # -- core bookkeeping (caller holds the lock) --------------------------
+
+    def _enqueue(self, ticket: _Ticket) -> None:
+        self._queues.setdefault(ticket.session_id, deque()).append(ticket)
+        self._queued += 1
+        self._dispatch()
+        if not ticket.granted and self._queued > self.max_queue:
+            self._remove(ticket)
+            get_registry().increment("selecta_admission_rejected_total", reason="queue_full")
+            raise AdmissionError(
+                f"Query queue is full ({self.max_queue} waiting, {self._running} running). "
+                "Please retry shortly.",
+                reason="queue_full",
+            )
+        self._publish_gauges()
+
+    def _remove(self, ticket: _Ticket) -> None:
+        queue = self._queues.get(ticket.session_id)
+        if queue is None or ticket not in queue:
+            return
+        queue.remove(ticket)
+        self._queued -= 1
+        if not queue:
+            del self._queues[ticket.session_id]
+
+    def _dispatch(self) -> None:
+        """Grant free slots round-robin across sessions, honouring per-user caps."""
+        granted_any = False
+        while self._running < self.max_concurrent and self._queues:
+            for session_id, queue in self._queues.items():
+                ticket = queue[0]
+                if self._running_per_user.get(ticket.user_id, 0) < self.max_per_user:
+                    break
+            else:
+                break
+            queue.popleft()
+            self._queued -= 1
+            # Move the session to the back so the next slot goes to someone else.
+            self._queues.move_to_end(session_id)
+            if not queue:
+                del self._queues[session_id]
+            self._running += 1
+            self._running_per_user[ticket.user_id] = self._running_per_user.get(ticket.user_id, 0) + 1
+            ticket.granted = True
+            granted_any = True
+        if granted_any:
+            self._condition.notify_all()
+
+    def _release(self, ticket: _Ticket) -> None:
+        with self._lock:
+            self._running -= 1
+            remaining = self._running_per_user.get(ticket.user_id, 1) - 1
+            if remaining:
+                self._running_per_user[ticket.user_id] = remaining
+            else:
+                self._running_per_user.pop(ticket.user_id, None)
+            self._dispatch()
+            self._publish_gauges()
+
+    def _timeout(self, ticket: _Ticket) -> AdmissionError:
+        self._remove(ticket)
+        self._publish_gauges()
+        get_registry().increment("selecta_admission_rejected_total", reason="timeout")
+        return AdmissionError(
+            f"Query waited more than {self.queue_timeout_seconds:.0f}s for an execution slot. Please retry shortly.",
+            reason="timeout",
+        )
+
+    def _admitted(self, ticket: _Ticket) -> Admission:
+        wait_ms = (time.perf_counter() - ticket.enqueued_at) * 1000
+        observe_stage("admission_wait", wait_ms)
+        return Admission(user_id=ticket.user_id, session_id=ticket.session_id, wait_ms=wait_ms)
+
+    def _publish_gauges(self) -> None:
+        registry = get_registry()
+        registry.set_gauge("selecta_scheduler_running", self._running)
+        registry.set_gauge("selecta_scheduler_queued", self._queued)
+
+    # -- public API ----------------------------------------------------------
+
+    @contextmanager
+    def admit(self, user_id: str = ANONYMOUS, session_id: Optional[str] = None) -> Iterator[Admission]:
+        """Block until a slot is free; raises :class:`AdmissionError` when rejected."""
+        ticket = _Ticket(user_id=user_id, session_id=session_id or user_id)
+        deadline = time.monotonic() + self.queue_timeout_seconds
+        with self._condition:
+            self._enqueue(ticket)
+            while not ticket.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise self._timeout(ticket)
+                self._condition.wait(remaining)
+        try:
+            yield self._admitted(ticket)
+        finally:
+            self._release(ticket)
+
+
+_SCHEDULER: Optional[QueryScheduler] = None
+_SCHEDULER_LOCK = threading.Lock()
+
+
+def get_scheduler() -> QueryScheduler:
+    global _SCHEDULER
+    with _SCHEDULER_LOCK:
+        if _SCHEDULER is None:
+            _SCHEDULER = QueryScheduler()
+        return _SCHEDULER
+
+
+def set_scheduler(scheduler: Optional[QueryScheduler]) -> None:
+    global _SCHEDULER
+    with _SCHEDULER_LOCK:
+        _SCHEDULER = scheduler
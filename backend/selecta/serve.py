@@ -0,0 +1,205 @@
+"""Serve the ADK API from several worker processes that share one schema context.
+
+``adk api_server`` runs a single process. Starting several copies means each
+one runs the ``INFORMATION_SCHEMA``, profile and sample queries again, renders
+its own prompt and warms its own caches. This entry point instead:
+
+1. builds the prompt, schema snapshot and partitioning metadata once, in the
+   parent (:func:`prepare_shared_context`), and imports the agent;
+2. freezes the resulting objects (``gc.freeze()``) so forked children share
+   their memory pages copy-on-write instead of touching them during GC;
+3. binds the listening socket once and forks ``--workers`` children that each
+   run uvicorn with ``get_fast_api_app`` on that socket (the kernel balances
+   ``accept()`` between them);
+4. points the result and question caches at a shared SQLite file
+   (:mod:`selecta.shared_store`), so a query cached by one worker is served by
+   all of them.
+
+Crashed workers are restarted; SIGINT/SIGTERM stop all of them. Sessions must
+live in a store all workers can reach: the default local SQLite session store
+under the agents directory, or ``--session_service_uri``.
+
+    uv run python -m selecta.serve app --workers 4 --port 8080 --allow_origins "*"
+"""
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import uvicorn
+
+from .constants import METRICS_PORT
+
+logger = logging.getLogger(__name__)
+
+AppFactory = Callable[[], Any]
+
+
+def prepare_shared_context(agents_dir: str) -> str:
+    """Build everything workers would otherwise build on their own; returns the schema snapshot."""
+    from google.adk.cli.utils.agent_loader import AgentLoader
+
+    from .instructions import return_instructions_bigquery, schema_snapshot
+
+    return_instructions_bigquery()
+    path = Path(agents_dir).resolve()
+    AgentLoader(str(path)).load_agent(path.name)
+    return schema_snapshot()
+
+
+def adk_app_factory(agents_dir: str, **options: Any) -> AppFactory:
+    def factory() -> Any:
+        from google.adk.cli.fast_api import get_fast_api_app
+
+        return get_fast_api_app(agents_dir=agents_dir, web=False, **options)
+
+    return factory
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(index: int, sock: socket.socket, app_factory: AppFactory, log_level: str) -> None:
+    """Body of a forked worker; never returns."""
+    from .telemetry import start_metrics_server
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    status = 0
+    try:
+        if METRICS_PORT:
+            start_metrics_server(METRICS_PORT + 1 + index)
+        config = uvicorn.Config(app_factory(), log_level=log_level, lifespan="auto")
+        uvicorn.Server(config).run(sockets=[sock])
+    except BaseException:
+        logger.exception("Worker %d crashed", index)
+        status = 1
+    finally:
+        os._exit(status)
+
+
+def _spawn(index: int, sock: socket.socket, app_factory: AppFactory, log_level: str) -> int:
+    pid = os.fork()
+    if pid == 0:
+        _run_worker(index, sock, app_factory, log_level)
+    logger.info("Started worker %d (pid %d)", index, pid)
+    return pid
+
+
+def serve(
+    app_factory: AppFactory,
+    workers: int = 2,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    prepare: Optional[Callable[[], Any]] = None,
+    shared_cache_path: Optional[Path] = None,
+    log_level: str = "info",
+    stop_event: Optional[threading.Event] = None,
+    sock: Optional[socket.socket] = None,
+) -> None:
+    """Prepare the shared context, fork ``workers`` uvicorn processes and supervise them."""
+    from .shared_store import SharedStore, get_shared_store, set_shared_store
+
+    if workers > 1 and get_shared_store() is None:
+        # mkdtemp creates a directory only this user can enter.
+        path = shared_cache_path or Path(tempfile.mkdtemp(prefix="selecta-shared-")) / "cache.sqlite3"
+        set_shared_store(SharedStore(path))
+        logger.info("Sharing result and question caches through %s", path)
+    if prepare is not None:
+        started = time.perf_counter()
+        prepare()
+        logger.info("Prepared shared context in %.2fs", time.perf_counter() - started)
+    gc.collect()
+    gc.freeze()
+
+    sock = sock or bind_socket(host, port)
+    stop_event = stop_event or threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop_event.set())
+
+    children: Dict[int, int] = {}
+    try:
+        for index in range(workers):
+            children[_spawn(index, sock, app_factory, log_level)] = index
+        while not stop_event.is_set():
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0 or pid not in children:
+                stop_event.wait(0.2)
+                continue
+            index = children.pop(pid)
+            if stop_event.is_set():
+                break
+            logger.warning("Worker %d (pid %d) exited with status %d; restarting", index, pid, status)
+            time.sleep(1.0)
+            children[_spawn(index, sock, app_factory, log_level)] = index
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        sock.close()
+        gc.unfreeze()
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve the Selecta ADK API from several worker processes.")
+    parser.add_argument("agents_dir", nargs="?", default="app", help="Agent directory, as for `adk api_server`.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--allow_origins", action="append", default=None)
+    parser.add_argument("--session_service_uri", default=None)
+    parser.add_argument("--shared_cache_path", type=Path, default=None)
+    parser.add_argument("--log_level", default="info")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = _parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper())
+    agents_dir = str(Path(args.agents_dir).resolve())
+    serve(
+        adk_app_factory(
+            agents_dir,
+            allow_origins=args.allow_origins,
+            session_service_uri=args.session_service_uri,
+            host=args.host,
+            port=args.port,
+        ),
+        workers=args.workers,
+        host=args.host,
+        port=args.port,
+        prepare=lambda: prepare_shared_context(agents_dir),
+        shared_cache_path=args.shared_cache_path,
+        log_level=args.log_level,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
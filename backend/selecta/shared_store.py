@@ -0,0 +1,182 @@
+"""SQLite-backed key/value store shared by the worker processes of one host.
+
+The result and question caches live in process memory. When
+``python -m selecta.serve`` runs several workers, each would otherwise warm
+its own copy. With ``SELECTA_SHARED_CACHE_PATH`` set (``selecta.serve`` sets
+it for multi-worker runs), both caches also read through to and write through
+to one SQLite file in WAL mode. A hit in one worker then serves all the
+others. Values carry their own expiry. The in-process caches stay in front, so
+the file is only read on a local miss.
+
+Values are stored as JSON, never pickled, so a tampered file cannot run code
+in the workers; dataclasses must be registered with :func:`register_type` to
+round-trip. The file must belong to the current user and must not be
+readable by anyone else, since it holds query results.
+"""
+
+import dataclasses
+import json
+import logging
+import os
+import sqlite3
+import stat
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Type, TypeVar
+
+from .constants import SHARED_CACHE_PATH
+from .telemetry import get_registry
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+)
+"""
+
+
+T = TypeVar("T")
+
+_TYPES: Dict[str, Type[Any]] = {}
+
+
+def register_type(cls: Type[T]) -> Type[T]:
+    """Allow instances of the dataclass ``cls`` to be stored; usable as a decorator."""
+    _TYPES[cls.__name__] = cls
+    return cls
+
+
+def _to_json(value: Any) -> Any:
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        name = type(value).__name__
+        if _TYPES.get(name) is not type(value):
+            raise TypeError(f"{name} is not registered with the shared store")
+        fields = {field.name: _to_json(getattr(value, field.name)) for field in dataclasses.fields(value)}
+        return {"__type__": name, "fields": fields}
+    if isinstance(value, tuple):
+        return {"__tuple__": [_to_json(item) for item in value]}
+    if isinstance(value, list):
+        return [_to_json(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): _to_json(item) for key, item in value.items()}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    raise TypeError(f"{type(value).__name__} values cannot be shared")
+
+
+def _from_json(value: Dict[str, Any]) -> Any:
+    if set(value) == {"__tuple__"}:
+        return tuple(value["__tuple__"])
+    if set(value) == {"__type__", "fields"}:
+        cls = _TYPES.get(value["__type__"])
+        if cls is None:
+            raise ValueError(f"unknown shared type {value['__type__']!r}")
+        return cls(**value["fields"])
+    return value
+
+
+def encode(value: Any) -> str:
+    return json.dumps(_to_json(value), separators=(",", ":"))
+
+
+def decode(text: str) -> Any:
+    return json.loads(text, object_hook=_from_json)
+
+
+def _ensure_private(path: Path) -> None:
+    """Create ``path`` readable by its owner only, or refuse a file someone else can reach."""
+    descriptor = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o600)
+    try:
+        info = os.fstat(descriptor)
+    finally:
+        os.close(descriptor)
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        raise PermissionError(f"Shared cache {path} is owned by another user")
+    if stat.S_IMODE(info.st_mode) & 0o077:
+        raise PermissionError(f"Shared cache {path} is accessible to other users; restrict it to mode 0600")
+
+
+class SharedStore:
+    def __init__(self, path: Path, clock: Callable[[], float] = time.time) -> None:
+        self.path = Path(path)
+        self._clock = clock
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        _ensure_private(self.path)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread and process; forked workers must not reuse the parent's.
+        connection = getattr(self._local, "connection", None)
+        if connection is None or getattr(self._local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(str(self.path), timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        try:
+            row = self._connect().execute(
+                "SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        except sqlite3.Error as exc:
+            logger.warning("Shared cache read failed: %s", exc)
+            return None
+        if row is None or row[1] <= self._clock():
+            get_registry().increment("selecta_shared_cache_requests_total", namespace=namespace, outcome="miss")
+            return None
+        try:
+            value = decode(row[0])
+        except (TypeError, ValueError) as exc:
+            logger.warning("Ignoring an unreadable shared cache entry: %s", exc)
+            get_registry().increment("selecta_shared_cache_requests_total", namespace=namespace, outcome="miss")
+            return None
+        get_registry().increment("selecta_shared_cache_requests_total", namespace=namespace, outcome="hit")
+        return value
+
+    def put(self, namespace: str, key: str, value: Any, ttl_seconds: float) -> None:
+        now = self._clock()
+        try:
+            text = encode(value)
+        except (TypeError, ValueError) as exc:
+            logger.debug("Not sharing %s entry %s: %s", namespace, key, exc)
+            return
+        try:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, text, now + ttl_seconds),
+            )
+            connection.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        except sqlite3.Error as exc:
+            logger.warning("Shared cache write failed: %s", exc)
+
+    def delete(self, namespace: str, key: Optional[str] = None) -> None:
+        try:
+            if key is None:
+                self._connect().execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+            else:
+                self._connect().execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+        except sqlite3.Error as exc:
+            logger.warning("Shared cache delete failed: %s", exc)
+
+
+_SHARED_STORE: Optional[SharedStore] = SharedStore(Path(SHARED_CACHE_PATH)) if SHARED_CACHE_PATH else None
+
+
+def get_shared_store() -> Optional[SharedStore]:
+    return _SHARED_STORE
+
+
+def set_shared_store(store: Optional[SharedStore]) -> None:
+    global _SHARED_STORE
+    _SHARED_STORE = store
@@ -0,0 +1,122 @@
+"""Single-flight coalescing of identical in-flight queries.
+
+Concurrent callers that ask for the same key share one execution: the first
+caller (the leader) runs the function and every caller that arrives while it
+is still running waits for, and receives, the same result or exception.
+Thread-based and asyncio callers share the same in-flight table, so a query
+started on a worker thread can be joined from the event loop and vice versa.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Tuple, TypeVar
+
+from .canonical_sql import canonicalize
+from .config_loader import BigQuerySettings
+from .telemetry import get_registry
+
+T = TypeVar("T")
+
+
+def normalize_sql_text(sql_query: str) -> str:
+    """Strip comments, collapse whitespace and drop a trailing semicolon.
+
+    Quoted strings and identifiers are left untouched.
+    """
+    output = []
+    index = 0
+    length = len(sql_query)
+    while index < length:
+        char = sql_query[index]
+        if char in "'\"`":
+            end = index + 1
+            while end < length and sql_query[end] != char:
+                end += 2 if sql_query[end] == "\\" else 1
+            output.append(sql_query[index : end + 1])
+            index = end + 1
+            continue
+        if sql_query.startswith("--", index) or char == "#":
+            newline = sql_query.find("\n", index)
+            index = length if newline == -1 else newline
+            continue
+        if sql_query.startswith("/*", index):
+            close = sql_query.find("*/", index + 2)
+            index = length if close == -1 else close + 2
+            if output and output[-1] != " ":
+                output.append(" ")
+            continue
+        if char.isspace():
+            if output and output[-1] != " ":
+                output.append(" ")
+            index += 1
+            continue
+        output.append(char)
+        index += 1
+    return "".join(output).strip().rstrip(";").strip()
+
+
+def query_key(sql_query: str, settings: BigQuerySettings) -> str:
+    """Key equivalent queries by their canonical form (see ``selecta.canonical_sql``)."""
+    try:
+        canonical = canonicalize(sql_query, settings)
+    except Exception:  # pragma: no cover - defensive fallback
+        canonical = normalize_sql_text(sql_query)
+    return "|".join(
+        (
+            settings.billing_project_id,
+            settings.data_project_id,
+            settings.dataset,
+            canonical,
+        )
+    )
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+
+    def _join_or_lead(self, key: str) -> Tuple[Future, bool]:
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                get_registry().increment("selecta_singleflight_shared_total")
+                return future, False
+            future = self._calls[key] = Future()
+            return future, True
+
+    def _finish(self, key: str, future: Future, fn: Callable[[], T]) -> None:
+        try:
+            future.set_result(fn())
+        except BaseException as exc:  # propagate to every waiter
+            future.set_exception(exc)
+        finally:
+            with self._lock:
+                if self._calls.get(key) is future:
+                    del self._calls[key]
+
+    def do(self, key: str, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """Run ``fn`` once per in-flight ``key``; returns ``(result, shared)``."""
+        future, leader = self._join_or_lead(key)
+        if leader:
+            self._finish(key, future, fn)
+        return future.result(), not leader
+
+    async def do_async(self, key: str, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """Asyncio flavour of :meth:`do`; the leader runs ``fn`` in a worker thread."""
+        future, leader = self._join_or_lead(key)
+        if leader:
+            await asyncio.to_thread(self._finish, key, future, fn)
+        return await asyncio.wrap_future(future), not leader
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+_SINGLE_FLIGHT = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    return _SINGLE_FLIGHT
@@ -0,0 +1,304 @@
+"""In-process latency histograms, counters and optional OpenTelemetry spans.
+
+Every stage of a question's lifecycle is wrapped in :func:`stage`, which
+records its duration in the ``selecta_stage_latency_ms`` histogram and, when
+``SELECTA_OTEL_ENABLED`` is set and ``opentelemetry`` is importable, emits a
+span with the same name. :func:`render_metrics` dumps the registry in the
+Prometheus text exposition format; set ``SELECTA_METRICS_PORT`` to serve it
+at ``/metrics`` from a background thread.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .constants import METRICS_PORT, OTEL_ENABLED
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LATENCY_BUCKETS_MS: Tuple[float, ...] = (
+    1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1_000, 2_500, 5_000, 10_000, 30_000, 60_000, 120_000,
+)
+
+STAGE_LATENCY_METRIC = "selecta_stage_latency_ms"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+
+class Histogram:
+    """Cumulative bucketed histogram with quantile estimation."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS_MS) -> None:
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the ``q`` quantile by linear interpolation inside its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else lower
+                fraction = (rank - cumulative) / bucket_count
+                return lower + (upper - lower) * fraction
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """Thread-safe registry of histograms, counters and gauges keyed by labels."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str) -> None:
+        self._help[name] = help_text
+
+    def observe(self, name: str, value: float, buckets: Optional[Sequence[float]] = None, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets or DEFAULT_LATENCY_BUCKETS_MS)
+            histogram.observe(value)
+
+    def increment(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def counter_value(self, name: str, **labels: Any) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def histogram(self, name: str, **labels: Any) -> Optional[Histogram]:
+        with self._lock:
+            return self._histograms.get(name, {}).get(_label_key(labels))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON-friendly view with count/sum/p50/p95/p99 per histogram."""
+        with self._lock:
+            histograms = {
+                name: [
+                    {
+                        "labels": dict(key),
+                        "count": histogram.count,
+                        "sum": histogram.total,
+                        "p50": histogram.quantile(0.50),
+                        "p95": histogram.quantile(0.95),
+                        "p99": histogram.quantile(0.99),
+                    }
+                    for key, histogram in series.items()
+                ]
+                for name, series in self._histograms.items()
+            }
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            gauges = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self._gauges.items()
+            }
+        return {"histograms": histograms, "counters": counters, "gauges": gauges}
+
+    def render_text(self) -> str:
+        """Render the registry in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(self._counters):
+                self._render_header(lines, name, "counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+            for name in sorted(self._gauges):
+                self._render_header(lines, name, "gauge")
+                for key, value in sorted(self._gauges[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+            for name in sorted(self._histograms):
+                self._render_header(lines, name, "histogram")
+                for key, histogram in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+                        cumulative += bucket_count
+                        bucket_key = key + (("le", _format_value(bound)),)
+                        lines.append(f"{name}_bucket{_format_labels(bucket_key)} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(key + (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(histogram.total)}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def _render_header(self, lines: List[str], name: str, metric_type: str) -> None:
+        if name in self._help:
+            lines.append(f"# HELP {name} {self._help[name]}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    rendered = ",".join(f'{label}="{_escape_label_value(value)}"' for label, value in key)
+    return "{" + rendered + "}"
+
+
+def _format_value(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+REGISTRY = MetricsRegistry()
+REGISTRY.describe(STAGE_LATENCY_METRIC, "Latency of each stage of a question's lifecycle in milliseconds.")
+
+
+def get_registry() -> MetricsRegistry:
+    return REGISTRY
+
+
+def render_metrics() -> str:
+    return REGISTRY.render_text()
+
+
+# ---------------------------------------------------------------------------
+# OpenTelemetry hook
+# ---------------------------------------------------------------------------
+
+_tracer: Any = None
+_tracer_resolved = False
+
+
+def _get_tracer() -> Any:
+    global _tracer, _tracer_resolved
+    if not _tracer_resolved:
+        _tracer_resolved = True
+        if OTEL_ENABLED:
+            try:
+                from opentelemetry import trace
+            except ImportError:
+                logger.warning("SELECTA_OTEL_ENABLED is set but opentelemetry is not installed.")
+            else:
+                _tracer = trace.get_tracer("selecta")
+    return _tracer
+
+
+def set_tracer(tracer: Any) -> None:
+    """Install an OpenTelemetry-compatible tracer (or ``None`` to disable spans)."""
+    global _tracer, _tracer_resolved
+    _tracer = tracer
+    _tracer_resolved = True
+
+
+@contextmanager
+def stage(name: str, **labels: Any) -> Iterator[Dict[str, Any]]:
+    """Time a lifecycle stage; yields a dict that callers may add span attributes to."""
+    attributes: Dict[str, Any] = {}
+    tracer = _get_tracer()
+    span_manager = tracer.start_as_current_span(f"selecta.{name}") if tracer is not None else None
+    span = span_manager.__enter__() if span_manager is not None else None
+    start = time.perf_counter()
+    error: Optional[BaseException] = None
+    try:
+        yield attributes
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        REGISTRY.observe(
+            STAGE_LATENCY_METRIC,
+            elapsed_ms,
+            stage=name,
+            outcome="error" if error is not None else "ok",
+            **labels,
+        )
+        if span is not None:
+            for key, value in {**labels, **attributes}.items():
+                if isinstance(value, (str, bool, int, float)):
+                    span.set_attribute(f"selecta.{key}", value)
+            if error is not None:
+                span.record_exception(error)
+            span_manager.__exit__(
+                type(error) if error else None, error, error.__traceback__ if error else None
+            )
+
+
+def observe_stage(name: str, elapsed_ms: float, **labels: Any) -> None:
+    """Record a stage measured outside :func:`stage` (e.g. across ADK callbacks)."""
+    REGISTRY.observe(STAGE_LATENCY_METRIC, elapsed_ms, stage=name, outcome="ok", **labels)
+
+
+# ---------------------------------------------------------------------------
+# /metrics endpoint
+# ---------------------------------------------------------------------------
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # noqa: N802 - http.server API
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - http.server API
+        return
+
+
+_metrics_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = "0.0.0.0") -> Optional[ThreadingHTTPServer]:
+    """Serve ``/metrics`` on ``port`` from a daemon thread (no-op when port is 0)."""
+    global _metrics_server
+    if not port or _metrics_server is not None:
+        return _metrics_server
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as exc:
+        logger.warning("Could not start metrics server on port %s: %s", port, exc)
+        return None
+    threading.Thread(target=server.serve_forever, name="selecta-metrics", daemon=True).start()
+    logger.info("Serving metrics on http://%s:%s/metrics", host, port)
+    _metrics_server = server
+    return server
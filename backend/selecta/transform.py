@@ -0,0 +1,137 @@
+"""Follow-up operations on a result that is already held locally.
+
+"Sort that by revenue", "only the top 5" or "pivot by month" do not need a new
+BigQuery job: the rows are either in session state or spilled to an Arrow file
+by :mod:`selecta.result_store`. :func:`transform_table` applies the requested
+steps to the result as a ``pyarrow`` table, in a fixed order:
+
+1. ``filters`` - ``{"column", "op", "value"}`` conditions combined with AND,
+   using the same operators as :func:`selecta.result_store.read_result_range`;
+2. ``group_by`` + ``aggregations`` - ``{"column", "function", "alias"}`` with
+   ``function`` one of :data:`AGGREGATIONS`, **or** ``pivot`` -
+   ``{"index", "columns", "values", "function"}``;
+3. ``sort_by`` / ``descending``;
+4. ``limit`` (top-N).
+
+Requires ``pyarrow`` (``pip install selecta[local]``).
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+from .result_store import _filter_mask, _pyarrow, get_result_store
+
+AGGREGATIONS = {
+    "sum": "sum",
+    "avg": "mean",
+    "mean": "mean",
+    "min": "min",
+    "max": "max",
+    "count": "count",
+    "count_distinct": "count_distinct",
+}
+MAX_PIVOT_COLUMNS = 50
+
+
+class TransformError(ValueError):
+    """Raised when a transform refers to unknown columns or unsupported operations."""
+
+
+def load_result_table(result: Dict[str, Any]) -> Any:
+    """Return the full rows of a result payload as an Arrow table.
+
+    Spilled results are memory-mapped from the result store; otherwise the
+    rows in state are used, provided they are the complete result.
+    """
+    pa = _pyarrow()
+    if pa is None:
+        raise RuntimeError("Transforming results requires pyarrow (pip install selecta[local]).")
+    store = get_result_store()
+    result_id = result.get("id")
+    if result_id and store.has(result_id):
+        return store.open_table(result_id)
+    rows = result.get("rows") or []
+    if len(rows) != result.get("rowCount", len(rows)):
+        raise TransformError("Only a preview of this result is available; run a new query instead.")
+    if not rows:
+        return pa.table({column: pa.array([], type=pa.null()) for column in result.get("columns") or []})
+    return pa.Table.from_pylist(rows)
+
+
+def _require_columns(table: Any, columns: Sequence[str]) -> None:
+    missing = [column for column in columns if column not in table.column_names]
+    if missing:
+        raise TransformError(
+            f"Unknown column(s): {', '.join(missing)}. Available: {', '.join(table.column_names)}"
+        )
+
+
+def _aggregate(table: Any, keys: List[str], aggregations: Sequence[Dict[str, Any]]) -> Any:
+    specs = []
+    names = list(keys)
+    for aggregation in aggregations or [{"function": "count"}]:
+        function = str(aggregation.get("function", "sum")).lower()
+        if function not in AGGREGATIONS:
+            raise TransformError(f"Unsupported aggregation: {function}. Use one of {', '.join(sorted(AGGREGATIONS))}.")
+        column = aggregation.get("column")
+        if function == "count" and not column:
+            specs.append(([], "count_all"))
+            names.append(aggregation.get("alias") or "count")
+            continue
+        _require_columns(table, [column])
+        specs.append((column, AGGREGATIONS[function]))
+        names.append(aggregation.get("alias") or f"{function}_{column}")
+    grouped = table.group_by(keys).aggregate(specs)
+    # pyarrow names aggregates "<column>_<function>" and their position varies by version.
+    produced = [f"{column}_{function}" if column else function for column, function in specs]
+    return grouped.select(keys + produced).rename_columns(names)
+
+
+def _pivot(table: Any, pivot: Dict[str, Any]) -> Any:
+    pa = _pyarrow()
+    index, columns, values = pivot.get("index"), pivot.get("columns"), pivot.get("values")
+    if not index or not columns:
+        raise TransformError("pivot needs 'index' and 'columns' (and usually 'values').")
+    function = str(pivot.get("function", "sum" if values else "count")).lower()
+    if not values and function != "count":
+        raise TransformError(f"pivot with function {function} needs a 'values' column.")
+    _require_columns(table, [index, columns] + ([values] if values else []))
+    long = _aggregate(table, [index, columns], [{"column": values, "function": function, "alias": "__value"}])
+    labels = sorted({str(label) for label in long[columns].to_pylist()})
+    if len(labels) > MAX_PIVOT_COLUMNS:
+        raise TransformError(f"Pivoting on {columns} would create {len(labels)} columns (max {MAX_PIVOT_COLUMNS}).")
+    wide: Dict[Any, Dict[str, Any]] = {}
+    for row in long.to_pylist():
+        target = wide.setdefault(row[index], {index: row[index], **{label: None for label in labels}})
+        target[str(row[columns])] = row["__value"]
+    return pa.Table.from_pylist(list(wide.values())) if wide else pa.table({index: pa.array([])})
+
+
+def transform_table(
+    table: Any,
+    filters: Optional[Sequence[Dict[str, Any]]] = None,
+    group_by: Optional[Sequence[str]] = None,
+    aggregations: Optional[Sequence[Dict[str, Any]]] = None,
+    pivot: Optional[Dict[str, Any]] = None,
+    sort_by: Optional[str] = None,
+    descending: bool = False,
+    limit: int = 0,
+) -> Any:
+    pa = _pyarrow()
+    if filters:
+        try:
+            table = table.filter(_filter_mask(pa, table, filters))
+        except ValueError as exc:
+            raise TransformError(str(exc)) from exc
+    if pivot and group_by:
+        raise TransformError("Use either group_by or pivot, not both.")
+    if group_by:
+        _require_columns(table, list(group_by))
+        table = _aggregate(table, list(group_by), aggregations or [])
+    elif pivot:
+        table = _pivot(table, pivot)
+    if sort_by:
+        _require_columns(table, [sort_by])
+        table = table.sort_by([(sort_by, "descending" if descending else "ascending")])
+    if limit and limit > 0:
+        table = table.slice(0, int(limit))
+    return table
@@ -276,3 +276,52 @@ def get_table_ddl_strings() -> List[Dict[str, Any]]:
             "Failed to fetch table DDL after %.2f seconds", duration, exc_info=True
         )
         return []
+
+
+def fetch_table_partitioning() -> Dict[str, Dict[str, Any]]:
+    """Return partitioning and clustering columns per table from INFORMATION_SCHEMA.COLUMNS."""
+    settings = get_bigquery_settings()
+    billing_client, _ = _get_bq_clients()
+    if billing_client is None:
+        logger.info("Skipping partitioning metadata; BigQuery client unavailable.")
+        return {}
+    start_time = time.time()
+
+    query = f"""
+        SELECT
+            table_name,
+            column_name,
+            data_type,
+            is_partitioning_column,
+            clustering_ordinal_position
+        FROM `{settings.data_project_id}.{settings.dataset}.INFORMATION_SCHEMA.COLUMNS`
+        WHERE (is_partitioning_column = 'YES' OR clustering_ordinal_position IS NOT NULL)
+    """
+    if settings.tables:
+        formatted_names = ", ".join(f"'{table}'" for table in settings.tables)
+        query += f" AND table_name IN ({formatted_names})"
+
+    try:
+        rows = billing_client.query(query).result()
+        tables: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            entry = tables.setdefault(
+                row.table_name,
+                {"partition_column": None, "partition_data_type": None, "clustering_columns": []},
+            )
+            if row.is_partitioning_column == "YES":
+                entry["partition_column"] = row.column_name
+                entry["partition_data_type"] = row.data_type
+            if row.clustering_ordinal_position is not None:
+                entry["clustering_columns"].append((row.clustering_ordinal_position, row.column_name))
+        for entry in tables.values():
+            entry["clustering_columns"] = [name for _, name in sorted(entry["clustering_columns"])]
+        logger.info(
+            "Fetched partitioning metadata for %d tables in %.2f seconds",
+            len(tables),
+            time.time() - start_time,
+        )
+        return tables
+    except Exception as exc:  # pragma: no cover - defensive logging
+        logger.error("Failed to fetch partitioning metadata: %s", exc, exc_info=True)
+        return {}
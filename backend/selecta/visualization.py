@@ -128,6 +128,9 @@ def build_chart_spec(rows: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
 
 def _classify_column(column: str, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
     values = [row.get(column) for row in rows if row.get(column) is not None]
+    if any(isinstance(value, (list, dict)) for value in values):
+        # ARRAY / STRUCT columns are not chartable and cannot be hashed for distinct counts.
+        return {"type": "other", "distinct": 0}
     info: Dict[str, Any] = {"type": "other", "distinct": len(set(values))}
 
     if not values:
@@ -0,0 +1,399 @@
+"""Offline analysis of the query log, and routing to summary tables.
+
+With ``SELECTA_QUERY_LOG_PATH`` set, every published query result appends one
+JSON line to that file: the SQL that ran, dataset, row count, latency, cache
+and coalescing flags and the job's bytes and slot usage (the same fields the
+result payload carries). ``python -m selecta.workload queries.jsonl`` then:
+
+1. clusters the logged queries by their canonical form (see
+   :mod:`selecta.canonical_sql`) with literal values replaced by ``?``, so
+   "revenue for March" and "revenue for April" land in one cluster;
+2. ranks clusters by ``runs x mean bytes processed x mean latency``, using
+   only runs that were not served from a cache for the means;
+3. proposes DDL for the most frequent variant of each top cluster: a
+   ``CREATE MATERIALIZED VIEW`` when the query is a single-table ``GROUP BY``
+   BigQuery can maintain incrementally, otherwise a ``CREATE TABLE ... AS``
+   summary table to refresh with a scheduled query.
+
+Once a summary exists, list it under ``summary_tables`` in the dataset YAML.
+:func:`route_to_summary` (called from :func:`selecta.cost_lint.lint_query`)
+then rewrites any query whose canonical form matches the summary's ``sql`` to
+read the summary instead, keeping a trailing ``ORDER BY`` / ``LIMIT`` on plain
+column names. Matching is exact: a filter on another value does not match.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .canonical_sql import _TOKEN_PATTERN, canonicalize, tokenize
+from .config_loader import BigQuerySettings, SummaryTable
+from .constants import QUERY_LOG_PATH
+
+logger = logging.getLogger(__name__)
+
+# Aggregates BigQuery can maintain incrementally in a materialized view.
+_MV_AGGREGATES = frozenset(
+    """
+    APPROX_COUNT_DISTINCT AVG BIT_AND BIT_OR BIT_XOR COUNT COUNTIF HLL_COUNT LOGICAL_AND LOGICAL_OR
+    MAX MIN STDDEV STDDEV_POP STDDEV_SAMP SUM VAR_POP VAR_SAMP VARIANCE
+    """.split()
+)
+_OTHER_AGGREGATES = frozenset(
+    """
+    ANY_VALUE APPROX_QUANTILES APPROX_TOP_COUNT APPROX_TOP_SUM ARRAY_AGG ARRAY_CONCAT_AGG CORR
+    COVAR_POP COVAR_SAMP PERCENTILE_CONT PERCENTILE_DISC STRING_AGG
+    """.split()
+)
+_NON_DETERMINISTIC = frozenset(
+    """
+    CURRENT_DATE CURRENT_DATETIME CURRENT_TIME CURRENT_TIMESTAMP GENERATE_UUID RAND SESSION_USER
+    """.split()
+)
+_SIMPLE_TAIL = re.compile(
+    r"^(?:ORDER\s+BY\s+[\w`]+(?:\s+(?:ASC|DESC))?(?:\s*,\s*[\w`]+(?:\s+(?:ASC|DESC))?)*)?"
+    r"\s*(?:LIMIT\s+\d+(?:\s+OFFSET\s+\d+)?)?\s*;?\s*$",
+    re.IGNORECASE,
+)
+
+
+# ---------------------------------------------------------------------------
+# Query log
+# ---------------------------------------------------------------------------
+
+
+class QueryLog:
+    """Append-only JSONL file; one ``write`` per line so worker processes can share it."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        line = (json.dumps(entry, default=str, separators=(",", ":")) + "\n").encode("utf-8")
+        try:
+            with self._lock:
+                descriptor = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(descriptor, line)
+                finally:
+                    os.close(descriptor)
+        except OSError as exc:
+            logger.warning("Could not append to query log %s: %s", self.path, exc)
+
+
+_QUERY_LOG: Optional[QueryLog] = QueryLog(Path(QUERY_LOG_PATH)) if QUERY_LOG_PATH else None
+
+
+def get_query_log() -> Optional[QueryLog]:
+    return _QUERY_LOG
+
+
+def set_query_log(query_log: Optional[QueryLog]) -> None:
+    global _QUERY_LOG
+    _QUERY_LOG = query_log
+
+
+def read_query_log(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield the entries of a query log, skipping lines that are not valid JSON."""
+    with Path(path).open("r", encoding="utf-8") as handle:
+        for number, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning("Skipping malformed query log line %d in %s", number, path)
+
+
+# ---------------------------------------------------------------------------
+# SQL helpers
+# ---------------------------------------------------------------------------
+
+
+def _settings_for(entry: Dict[str, Any]) -> BigQuerySettings:
+    return BigQuerySettings(
+        billing_project_id=entry.get("billingProjectId") or "",
+        data_project_id=entry.get("projectId") or "",
+        dataset=entry.get("dataset") or "",
+        location="",
+        tables=[],
+    )
+
+
+def split_order_and_limit(sql_query: str) -> Tuple[str, str]:
+    """Split off a top-level trailing ``ORDER BY`` / ``LIMIT``; returns ``(body, tail)``."""
+    depth = 0
+    matches = list(_TOKEN_PATTERN.finditer(sql_query))
+    for position, match in enumerate(matches):
+        kind, text = match.lastgroup, match.group(0)
+        if kind != "op" and kind != "word":
+            continue
+        if text == "(":
+            depth += 1
+        elif text == ")":
+            depth -= 1
+        elif depth == 0 and kind == "word":
+            upper = text.upper()
+            following = next((m for m in matches[position + 1 :] if m.lastgroup not in {"ws", "comment"}), None)
+            if upper == "LIMIT" or (upper == "ORDER" and following is not None and following.group(0).upper() == "BY"):
+                return sql_query[: match.start()].rstrip(), sql_query[match.start() :].strip()
+    return sql_query.strip().rstrip(";").rstrip(), ""
+
+
+def template_key(sql_query: str, settings: Optional[BigQuerySettings] = None) -> str:
+    """Canonical form of ``sql_query`` with string and number literals replaced by ``?``."""
+    canonical = canonicalize(sql_query, settings)
+    return " ".join("?" if kind in {"string", "number"} else text for kind, text in tokenize(canonical))
+
+
+def _materialized_view_blockers(sql_query: str) -> List[str]:
+    """Reasons ``sql_query`` cannot be an incremental materialized view (empty if it can)."""
+    tokens = tokenize(sql_query)
+    words = [(index, text.upper()) for index, (kind, text) in enumerate(tokens) if kind == "word"]
+    depth_at: List[int] = []
+    depth = 0
+    for _, text in tokens:
+        if text == ")":
+            depth -= 1
+        depth_at.append(depth)
+        if text == "(":
+            depth += 1
+    top_level = [upper for index, upper in words if depth_at[index] == 0]
+
+    blockers = []
+    if not tokens or tokens[0][1].upper() != "SELECT":
+        blockers.append("not a plain SELECT (CTEs and set operations are not supported)")
+    if "GROUP" not in top_level:
+        blockers.append("no GROUP BY, so there is nothing to pre-aggregate")
+    if top_level.count("FROM") != 1 or "JOIN" in top_level or "UNION" in top_level:
+        blockers.append("reads more than one table")
+    if any(upper in {"HAVING", "QUALIFY", "OVER", "WINDOW"} for upper in top_level):
+        blockers.append("uses HAVING, QUALIFY or window functions")
+    for index, upper in words:
+        next_token = tokens[index + 1] if index + 1 < len(tokens) else None
+        if upper in _NON_DETERMINISTIC:
+            blockers.append(f"calls non-deterministic {upper}")
+        elif next_token == ("op", "(") and upper in _OTHER_AGGREGATES:
+            blockers.append(f"uses {upper}, which materialized views cannot maintain")
+        elif next_token == ("op", "(") and upper in _MV_AGGREGATES:
+            argument = tokens[index + 2][1].upper() if index + 2 < len(tokens) else ""
+            if argument == "DISTINCT":
+                blockers.append(f"uses {upper}(DISTINCT ...); APPROX_COUNT_DISTINCT can be maintained instead")
+        elif upper == "SELECT" and depth_at[index] > 0:
+            blockers.append("contains a subquery")
+    return list(dict.fromkeys(blockers))
+
+
+# ---------------------------------------------------------------------------
+# Analysis
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class Materialization:
+    kind: str
+    table: str
+    ddl: str
+    notes: List[str] = field(default_factory=list)
+
+
+@dataclass
+class WorkloadCluster:
+    key: str
+    runs: int
+    variants: int
+    cached_runs: int
+    mean_bytes_processed: float
+    mean_latency_ms: float
+    score: float
+    sql: str
+    proposal: Optional[Materialization] = None
+
+
+def propose_materialization(sql_query: str, table: str) -> Materialization:
+    """DDL that precomputes ``sql_query`` into ``table`` (``project.dataset.name``)."""
+    body, _ = split_order_and_limit(sql_query)
+    blockers = _materialized_view_blockers(body)
+    if not blockers:
+        ddl = (
+            f"CREATE MATERIALIZED VIEW `{table}`\n"
+            "OPTIONS (enable_refresh = true, refresh_interval_minutes = 60)\n"
+            f"AS\n{body}"
+        )
+        return Materialization(kind="materialized_view", table=table, ddl=ddl)
+    ddl = f"CREATE OR REPLACE TABLE `{table}` AS\n{body}"
+    notes = [f"Not a materialized view: {reason}." for reason in blockers]
+    notes.append("Refresh it with a scheduled query that re-runs this statement.")
+    return Materialization(kind="summary_table", table=table, ddl=ddl, notes=notes)
+
+
+def _mean(values: Sequence[float]) -> float:
+    return sum(values) / len(values) if values else 0.0
+
+
+def analyze_workload(
+    entries: Iterable[Dict[str, Any]],
+    top: int = 10,
+    min_runs: int = 2,
+    target_dataset: Optional[str] = None,
+) -> List[WorkloadCluster]:
+    """Cluster logged queries, rank them and propose a materialization for the top ``top``.
+
+    ``target_dataset`` (``project.dataset``) is where proposed tables go; it
+    defaults to ``<billing project>.selecta_summaries``.
+    """
+    groups: Dict[str, List[Tuple[Dict[str, Any], str]]] = {}
+    for entry in entries:
+        sql_query = entry.get("sql")
+        if not sql_query:
+            continue
+        settings = _settings_for(entry)
+        try:
+            key = template_key(sql_query, settings)
+            variant = canonicalize(sql_query, settings)
+        except Exception as exc:  # pragma: no cover - defensive logging
+            logger.debug("Could not canonicalize logged query: %s", exc)
+            continue
+        groups.setdefault(key, []).append((entry, variant))
+
+    clusters: List[Tuple[WorkloadCluster, Dict[str, Any]]] = []
+    for key, members in groups.items():
+        if len(members) < min_runs:
+            continue
+        executed = [entry for entry, _ in members if not entry.get("cacheHit")] or [entry for entry, _ in members]
+        mean_bytes = _mean([float(entry.get("bytesProcessed") or 0) for entry in executed])
+        mean_latency = _mean([float(entry.get("executionMs") or 0) for entry in executed])
+        variants = Counter(variant for _, variant in members)
+        common = variants.most_common(1)[0][0]
+        representative = [entry for entry, variant in members if variant == common][-1]
+        cluster = WorkloadCluster(
+            key=key,
+            runs=len(members),
+            variants=len(variants),
+            cached_runs=sum(1 for entry, _ in members if entry.get("cacheHit")),
+            mean_bytes_processed=mean_bytes,
+            mean_latency_ms=mean_latency,
+            score=len(members) * mean_bytes * mean_latency / 1000,
+            sql=representative["sql"],
+        )
+        clusters.append((cluster, representative))
+
+    clusters.sort(key=lambda item: (item[0].score, item[0].runs), reverse=True)
+    ranked = []
+    for cluster, representative in clusters[:top]:
+        dataset = target_dataset or f"{representative.get('billingProjectId') or 'PROJECT'}.selecta_summaries"
+        name = hashlib.sha256(cluster.key.encode("utf-8")).hexdigest()[:8]
+        cluster.proposal = propose_materialization(cluster.sql, f"{dataset}.summary_{name}")
+        if cluster.variants > 1:
+            cluster.proposal.notes.append(
+                f"{cluster.variants} variants differ only in literal values; this covers the most frequent one."
+            )
+        ranked.append(cluster)
+    return ranked
+
+
+# ---------------------------------------------------------------------------
+# Routing
+# ---------------------------------------------------------------------------
+
+
+@lru_cache(maxsize=256)
+def _summary_key(sql_query: str, data_project_id: str, dataset: str) -> str:
+    settings = BigQuerySettings(
+        billing_project_id="", data_project_id=data_project_id, dataset=dataset, location="", tables=[]
+    )
+    return canonicalize(split_order_and_limit(sql_query)[0], settings)
+
+
+def _qualified_summary(table: str, settings: BigQuerySettings) -> str:
+    parts = table.split(".")
+    if len(parts) == 2:
+        parts = [settings.billing_project_id] + parts
+    return ".".join(parts)
+
+
+def route_to_summary(
+    sql_query: str, summary_tables: Sequence[SummaryTable], settings: BigQuerySettings
+) -> Optional[Tuple[SummaryTable, str]]:
+    """Return the summary that answers ``sql_query`` and the rewritten SQL, or ``None``."""
+    if not summary_tables:
+        return None
+    body, tail = split_order_and_limit(sql_query)
+    if tail and not _SIMPLE_TAIL.match(tail):
+        return None
+    key = _summary_key(body, settings.data_project_id, settings.dataset)
+    for summary in summary_tables:
+        if _summary_key(summary.sql, settings.data_project_id, settings.dataset) == key:
+            rewritten = f"SELECT * FROM `{_qualified_summary(summary.table, settings)}`"
+            return summary, rewritten + (f"\n{tail.rstrip(';').rstrip()}" if tail else "")
+    return None
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+
+def _format_bytes(value: float) -> str:
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if value < 1024 or unit == "TB":
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TB"
+
+
+def format_report(clusters: Sequence[WorkloadCluster]) -> str:
+    if not clusters:
+        return "No repeated queries in the log."
+    lines: List[str] = []
+    for rank, cluster in enumerate(clusters, start=1):
+        lines.append(
+            f"#{rank}  runs {cluster.runs} ({cluster.variants} variant(s), {cluster.cached_runs} cached)  "
+            f"avg {_format_bytes(cluster.mean_bytes_processed)}  avg {cluster.mean_latency_ms:.0f} ms  "
+            f"score {cluster.score:.3g}"
+        )
+        lines.extend("    " + line for line in cluster.sql.strip().splitlines())
+        proposal = cluster.proposal
+        if proposal is not None:
+            lines.append(f"  proposed {proposal.kind.replace('_', ' ')}:")
+            lines.extend("    " + line for line in proposal.ddl.splitlines())
+            lines.extend(f"    -- {note}" for note in proposal.notes)
+            lines.append("  route matching queries by adding to the dataset YAML:")
+            lines.append("    summary_tables:")
+            lines.append(f"      - table: \"{proposal.table}\"")
+            lines.append(f"        sql: {json.dumps(' '.join(cluster.sql.split()))}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Recommend materializations from a Selecta query log.")
+    parser.add_argument("log", type=Path, help="JSONL file written via SELECTA_QUERY_LOG_PATH.")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--min-runs", type=int, default=2, help="Ignore clusters seen fewer times.")
+    parser.add_argument("--target-dataset", default=None, help="project.dataset for proposed tables.")
+    parser.add_argument("--json", action="store_true", help="Print the clusters as JSON.")
+    args = parser.parse_args(argv)
+
+    clusters = analyze_workload(read_query_log(args.log), args.top, args.min_runs, args.target_dataset)
+    if args.json:
+        print(json.dumps([asdict(cluster) for cluster in clusters], indent=2))
+    else:
+        print(format_report(clusters))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
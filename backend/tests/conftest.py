@@ -0,0 +1,46 @@
+from pathlib import Path
+
+import pytest
+import yaml
+
+from selecta import config_loader, question_cache, result_cache
+
+_INSTRUCTIONS = Path(config_loader.__file__).resolve().parent / "instructions.yaml"
+
+
+@pytest.fixture
+def dataset_config(tmp_path, monkeypatch):
+    """Activate a temporary dataset YAML; call with overrides merged into the defaults."""
+
+    def _activate(**overrides):
+        raw = {
+            "id": "test",
+            "model": "test-model",
+            "prompt": {"instruction_file": str(_INSTRUCTIONS)},
+            "bigquery": {
+                "billing_project_id": "billing",
+                "data_project_id": "data",
+                "dataset": "shop",
+                "location": "US",
+                "tables": ["orders", "users"],
+            },
+        }
+        raw.update(overrides)
+        path = tmp_path / "dataset.yaml"
+        path.write_text(yaml.safe_dump(raw), encoding="utf-8")
+        monkeypatch.setattr(config_loader, "_DATASET_CONFIG_OVERRIDE", path.resolve())
+        config_loader.get_dataset_config.cache_clear()
+        return config_loader.get_dataset_config()
+
+    yield _activate
+    config_loader.get_dataset_config.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def _empty_caches():
+    """Keep cached outcomes and questions from leaking between tests that reuse the same SQL."""
+    result_cache.get_result_cache().clear()
+    question_cache.get_question_cache().clear()
+    yield
+    result_cache.get_result_cache().clear()
+    question_cache.get_question_cache().clear()
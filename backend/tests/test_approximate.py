@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from benchmarks.fake_bigquery import FakeBigQueryClient, make_synthetic_table
+from selecta import custom_tools
+from selecta.approximate import approximate_query
+from selecta.config_loader import ApproximateSettings
+
+SAMPLED = ApproximateSettings(sample_percent=10, large_tables=["orders"])
+
+
+def test_counts_are_scaled_over_a_sample_of_a_large_table(dataset_config):
+    settings = dataset_config().bigquery
+    sql = (
+        "SELECT status, COUNT(*) AS n, COUNT(DISTINCT user_id) AS buyers, SUM(total) AS revenue, AVG(total) AS basket\n"
+        "FROM `data.shop.orders` o WHERE o.note != 'COUNT(*)' GROUP BY status HAVING COUNT(*) > 100"
+    )
+
+    result = approximate_query(sql, SAMPLED, settings)
+
+    assert result.sql == (
+        "SELECT status, CAST(ROUND(COUNT(*) / 0.1) AS INT64) AS n, APPROX_COUNT_DISTINCT(user_id) AS buyers, "
+        "(SUM(total) / 0.1) AS revenue, AVG(total) AS basket\n"
+        "FROM `data.shop.orders` o TABLESAMPLE SYSTEM (10 PERCENT) WHERE o.note != 'COUNT(*)' GROUP BY status "
+        "HAVING CAST(ROUND(COUNT(*) / 0.1) AS INT64) > 100"
+    )
+    assert (result.sampling_rate, result.sampled_tables) == (0.1, ("orders",))
+    assert [rewrite["rule"] for rewrite in result.rewrites] == ["approx_count_distinct", "tablesample"]
+    assert "not scaled" in result.rewrites[1]["message"]
+
+
+def test_sampling_is_skipped_where_one_factor_cannot_scale_the_result(dataset_config):
+    settings = dataset_config().bigquery
+    for sql in (
+        "SELECT COUNT(DISTINCT o.user_id) FROM orders o JOIN users u ON u.id = o.user_id",
+        "SELECT COUNT(*) FROM (SELECT user_id FROM orders GROUP BY user_id)",
+        "SELECT user_id, COUNT(*) OVER (PARTITION BY user_id) FROM orders",
+        "SELECT SUM(DISTINCT total) FROM orders",
+        "SELECT COUNT(*) FROM users",
+        "SELECT COUNT(*) FROM `other.shop.orders`",
+    ):
+        result = approximate_query(sql, SAMPLED, settings)
+        assert result.sampling_rate == 1.0 and "TABLESAMPLE" not in result.sql, sql
+
+    assert approximate_query("SELECT COUNT(*) FROM users", SAMPLED, settings).approximate is False
+    exact = approximate_query("SELECT COUNT(DISTINCT user_id) FROM users", SAMPLED, settings)
+    assert exact.sql == "SELECT APPROX_COUNT_DISTINCT(user_id) FROM users" and exact.approximate
+
+
+def test_approximate_results_are_flagged_and_offer_the_exact_sql(dataset_config):
+    config = dataset_config(approximate={"sample_percent": 5, "large_tables": ["orders"]})
+    assert config.approximate == ApproximateSettings(sample_percent=5, large_tables=["orders"])
+    client = FakeBigQueryClient(table=make_synthetic_table(num_rows=3))
+    context = SimpleNamespace(state={})
+    sql = "SELECT COUNT(*) AS n FROM orders"
+    with mock.patch.object(custom_tools.bigquery, "Client", client):
+        custom_tools.execute_bigquery_query(sql, tool_context=context, approximate=True)
+        approximate = context.state["latest_result"]
+        custom_tools.execute_bigquery_query(approximate["exactSql"], tool_context=context)
+        exact = context.state["latest_result"]
+
+    assert client.queries == [
+        "SELECT CAST(ROUND(COUNT(*) / 0.05) AS INT64) AS n FROM orders TABLESAMPLE SYSTEM (5 PERCENT)",
+        sql,
+    ]
+    assert (approximate["approximate"], approximate["samplingRate"], approximate["exactSql"]) == (True, 0.05, sql)
+    assert approximate["originalSql"] == sql and approximate["rewrites"][0]["rule"] == "tablesample"
+    assert (exact["approximate"], exact["samplingRate"], exact["exactSql"]) == (False, None, None)
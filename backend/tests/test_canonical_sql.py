@@ -0,0 +1,118 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from benchmarks.fake_bigquery import FakeBigQueryClient, make_synthetic_table
+from selecta import custom_tools
+from selecta.canonical_sql import canonicalize
+from selecta.config_loader import BigQuerySettings
+from selecta.result_cache import ResultCache, is_cacheable
+from selecta.telemetry import get_registry
+
+SETTINGS = BigQuerySettings(
+    billing_project_id="billing",
+    data_project_id="data",
+    dataset="shop",
+    location="US",
+    tables=["orders"],
+    data_profiles_table=None,
+)
+
+
+@pytest.mark.parametrize(
+    "variant",
+    [
+        "SELECT ord.status, COUNT(*) AS n FROM `data.shop.orders` AS ord\n"
+        "WHERE ord.status != 'x' AND ord.created_at >= '2024-01-01' GROUP BY ord.status",
+        "select orders.status, count(*) as n from shop.orders -- all orders\n"
+        'where orders.created_at >= "2024-01-01" and orders.status <> \'x\' group by orders.status;',
+        "SELECT o.status,COUNT(*) AS n FROM data.shop.orders o WHERE o.created_at>='2024-01-01' AND o.status!='x' GROUP BY o.status",
+    ],
+)
+def test_equivalent_variants_share_one_canonical_form(variant):
+    reference = (
+        "SELECT o.status, COUNT(*) AS n FROM orders o "
+        "WHERE o.created_at >= '2024-01-01' AND o.status != 'x' GROUP BY o.status"
+    )
+    assert canonicalize(variant, SETTINGS) == canonicalize(reference, SETTINGS)
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ("SELECT a FROM t WHERE b = 1", "SELECT a FROM t WHERE b = 2"),
+        ("SELECT a FROM t WHERE b = 'X'", "SELECT a FROM t WHERE b = 'x'"),
+        ("SELECT a AS Total FROM t", "SELECT a AS total FROM t"),
+        ("SELECT a FROM t WHERE b = 1 AND c = 2 OR d = 3", "SELECT a FROM t WHERE c = 2 AND b = 1 OR d = 3"),
+        ("SELECT a FROM t", "SELECT a FROM other.t"),
+        ("SELECT o FROM orders o", "SELECT o FROM orders x"),
+        ("SELECT value AS Value FROM t", "SELECT value AS value FROM t"),
+        ("SELECT year FROM t", "SELECT YEAR FROM t"),
+    ],
+)
+def test_semantically_different_queries_stay_distinct(first, second):
+    assert canonicalize(first, SETTINGS) != canonicalize(second, SETTINGS)
+
+
+def test_between_case_and_nested_clauses_are_sorted_safely():
+    first = "SELECT * FROM t WHERE x BETWEEN 1 AND 5 AND y IN (SELECT id FROM u WHERE b = 1 AND a = 2)"
+    second = "SELECT * FROM t WHERE y IN (SELECT id FROM u WHERE a = 2 AND b = 1) AND x BETWEEN 1 AND 5"
+    assert canonicalize(first, SETTINGS) == canonicalize(second, SETTINGS)
+    assert "BETWEEN 1 AND 5" in canonicalize(first, SETTINGS)
+    assert "EXTRACT ( YEAR FROM created_at )" in canonicalize("SELECT EXTRACT(year FROM created_at) FROM t", SETTINGS)
+
+
+def test_keyword_like_identifiers_keep_their_case_outside_keyword_position():
+    sql = (
+        "select year, value as Value, date_trunc(d, month) from t "
+        "where d >= date_sub(current_date(), interval 7 day) order by year nulls last limit 5 offset 10"
+    )
+    assert canonicalize(sql, SETTINGS) == (
+        "SELECT year , value AS Value , DATE_TRUNC ( d , MONTH ) FROM `data.shop.t` AS __t1 "
+        "WHERE d >= DATE_SUB ( CURRENT_DATE ( ) , INTERVAL 7 DAY ) ORDER BY year NULLS LAST LIMIT 5 OFFSET 10"
+    )
+    assert canonicalize("SELECT o FROM orders o", SETTINGS) == "SELECT o FROM `data.shop.orders` AS o"
+
+
+def test_result_cache_expires_evicts_and_skips_volatile_queries():
+    now = [0.0]
+    cache = ResultCache(max_entries=2, ttl_seconds=10, max_rows=5, clock=lambda: now[0])
+    cache.put("a", "SELECT 1", "A", row_count=1)
+    cache.put("b", "SELECT 2", "B", row_count=1)
+    cache.put("big", "SELECT 3", "C", row_count=6)
+    cache.put("rand", "SELECT RAND()", "R", row_count=1)
+    assert cache.get("a", "SELECT 1") == "A"
+    cache.put("c", "SELECT 3", "C", row_count=1)
+    assert cache.get("b", "SELECT 2") is None
+    assert cache.get("rand", "SELECT RAND()") is None
+    now[0] = 11
+    assert cache.get("a", "SELECT 1") is None
+
+
+@pytest.mark.parametrize("function", ["CURRENT_DATE", "CURRENT_DATETIME", "CURRENT_TIME", "CURRENT_TIMESTAMP"])
+def test_current_date_and_time_functions_are_volatile_with_or_without_parentheses(function):
+    assert not is_cacheable(f"SELECT * FROM orders WHERE created_at < {function}()")
+    assert not is_cacheable(f"SELECT * FROM orders WHERE created_at < {function.lower()} ( 'UTC' )")
+    assert not is_cacheable(f"SELECT * FROM orders WHERE created_at < {function}")
+    assert is_cacheable(f"SELECT {function.lower()}_bucket FROM orders")
+
+
+def test_equivalent_query_is_served_from_cache_without_a_new_job(dataset_config):
+    dataset_config()
+    registry = get_registry()
+    canonical_hits = registry.counter_value("selecta_result_cache_hits_total", match="canonical")
+    client = FakeBigQueryClient(table=make_synthetic_table(num_rows=4))
+    context = SimpleNamespace(state={})
+    with mock.patch.object(custom_tools.bigquery, "Client", client):
+        first = custom_tools.execute_bigquery_query("SELECT * FROM orders o WHERE o.a = 1 AND o.b = 2", context)
+        second = custom_tools.execute_bigquery_query(
+            "select * from `data.shop.orders` x where x.b = 2 and x.a = 1", context
+        )
+
+    assert len(client.queries) == 1
+    assert first == second
+    history = context.state["results_history"]
+    assert [entry["cacheHit"] for entry in history] == [False, True]
+    assert history[0]["id"] != history[1]["id"]
+    assert registry.counter_value("selecta_result_cache_hits_total", match="canonical") == canonical_hits + 1
@@ -0,0 +1,44 @@
+import os
+from pathlib import Path
+
+from selecta.config_loader import DatasetCatalog
+
+
+def _write(path: Path, body: str, mtime_ns: int) -> None:
+    path.write_text(body, encoding="utf-8")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_dataset_catalog_reparses_only_changed_files(tmp_path, monkeypatch):
+    _write(tmp_path / "a.yaml", "id: a\n", 1_000_000_000)
+    _write(tmp_path / "b.yaml", "id: b\n", 1_000_000_000)
+
+    loads = []
+    from selecta import config_loader
+
+    original = config_loader._load_yaml
+    monkeypatch.setattr(
+        config_loader, "_load_yaml", lambda path: loads.append(path.name) or original(path)
+    )
+
+    catalog = DatasetCatalog(tmp_path.resolve())
+    assert [d.id for d in catalog.descriptors()] == ["a", "b"]
+    assert sorted(loads) == ["a.yaml", "b.yaml"]
+
+    loads.clear()
+    catalog.descriptors()
+    assert loads == []
+
+    _write(tmp_path / "b.yaml", "id: b2\n", 2_000_000_000)
+    _write(tmp_path / "c.yaml", "id: c\n", 2_000_000_000)
+    assert [d.id for d in catalog.descriptors()] == ["a", "b2", "c"]
+    assert sorted(loads) == ["b.yaml", "c.yaml"]
+
+
+def test_dataset_catalog_drops_removed_files(tmp_path):
+    _write(tmp_path / "a.yaml", "id: a\n", 1_000_000_000)
+    catalog = DatasetCatalog(tmp_path.resolve())
+    assert len(catalog.descriptors()) == 1
+
+    (tmp_path / "a.yaml").unlink()
+    assert catalog.descriptors() == []
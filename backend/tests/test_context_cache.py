@@ -0,0 +1,120 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from selecta import callbacks
+from selecta.context_cache import InstructionCache
+
+
+class StubCaches:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.created = []
+        self.deleted = []
+
+    def create(self, model, config):
+        if self.fail:
+            raise RuntimeError("400 Cached content is too small")
+        self.created.append((model, config))
+        return SimpleNamespace(
+            name=f"cachedContents/{len(self.created)}",
+            expire_time=datetime.now(timezone.utc) + timedelta(hours=1),
+        )
+
+    def delete(self, name):
+        self.deleted.append(name)
+
+
+def _request(instruction="You write BigQuery SQL."):
+    tool = types.Tool(function_declarations=[types.FunctionDeclaration(name="execute_bigquery_query")])
+    return LlmRequest(
+        model="gemini-2.5-flash",
+        contents=[types.Content(role="user", parts=[types.Part(text="orders per day")])],
+        config=types.GenerateContentConfig(system_instruction=instruction, tools=[tool]),
+    )
+
+
+def test_instruction_is_cached_once_and_recreated_on_snapshot_change():
+    caches = StubCaches()
+    cache = InstructionCache(client_factory=lambda: SimpleNamespace(caches=caches))
+
+    first, second = _request(), _request()
+    assert cache.apply(first, "s1") == "cachedContents/1"
+    assert cache.apply(second, "s1") == "cachedContents/1"
+    assert len(caches.created) == 1
+    model, config = caches.created[0]
+    assert model == "gemini-2.5-flash" and config.system_instruction == "You write BigQuery SQL."
+    assert config.tools[0].function_declarations[0].name == "execute_bigquery_query"
+    assert second.config.cached_content == "cachedContents/1"
+    assert second.config.system_instruction is None and second.config.tools is None
+    assert len(second.contents) == 1
+
+    assert cache.apply(_request("New schema."), "s2") == "cachedContents/2"
+    assert caches.deleted == ["cachedContents/1"]
+
+
+def test_concurrent_requests_create_one_cache_without_holding_the_lock():
+    caches = StubCaches()
+    entered, release = threading.Event(), threading.Event()
+    create = caches.create
+
+    def slow_create(model, config):
+        if model == "gemini-2.5-flash":
+            entered.set()
+            release.wait(5)
+        return create(model, config)
+
+    caches.create = slow_create
+    cache = InstructionCache(client_factory=lambda: SimpleNamespace(caches=caches))
+    names = []
+    threads = [threading.Thread(target=lambda: names.append(cache.apply(_request(), "s1"))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    assert entered.wait(5)
+
+    other = _request()
+    other.model = "gemini-2.5-pro"
+    assert cache.apply(other, "s1") == "cachedContents/1"
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert names == ["cachedContents/2"] * 3
+    assert [model for model, _ in caches.created] == ["gemini-2.5-pro", "gemini-2.5-flash"]
+
+
+def test_provider_failure_leaves_request_unchanged_and_backs_off():
+    caches = StubCaches(fail=True)
+    now = [0.0]
+    cache = InstructionCache(client_factory=lambda: SimpleNamespace(caches=caches), retry_seconds=60, clock=lambda: now[0])
+
+    request = _request()
+    assert cache.apply(request, "s1") is None
+    assert request.config.system_instruction == "You write BigQuery SQL."
+    assert request.config.cached_content is None
+
+    caches.fail = False
+    assert cache.apply(_request(), "s1") is None
+    assert caches.created == []
+    now[0] = 61
+    assert cache.apply(_request(), "s1") == "cachedContents/1"
+
+
+def test_model_error_callback_drops_the_cached_instruction(monkeypatch):
+    caches = StubCaches()
+    cache = InstructionCache(client_factory=lambda: SimpleNamespace(caches=caches))
+    monkeypatch.setattr(callbacks, "get_instruction_cache", lambda: cache)
+    monkeypatch.setattr(callbacks, "CONTEXT_CACHE_ENABLED", True)
+    monkeypatch.setattr(callbacks, "schema_snapshot", lambda: "s1")
+
+    request = _request()
+    assert callbacks.use_cached_instruction(SimpleNamespace(), request) is None
+    assert request.config.cached_content == "cachedContents/1"
+
+    callbacks.drop_failed_instruction_cache(SimpleNamespace(), request, RuntimeError("403 cache expired"))
+    retry = _request()
+    callbacks.use_cached_instruction(SimpleNamespace(), retry)
+    assert retry.config.cached_content == "cachedContents/2"
@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from benchmarks.fake_bigquery import FakeBigQueryClient, make_synthetic_table
+from selecta import cost_lint, custom_tools
+from selecta.cost_lint import CostLintError, has_partition_predicate, is_exploratory_select, lint_query
+
+PARTITIONING = {
+    "orders": {"partition_column": "created_at", "partition_data_type": "TIMESTAMP", "clustering_columns": ["status"]},
+    "events": {"partition_column": "_PARTITIONTIME", "partition_data_type": "TIMESTAMP"},
+}
+
+
+@pytest.fixture
+def partitioned(dataset_config):
+    settings = dataset_config().bigquery
+    return cost_lint.set_table_partitioning(PARTITIONING, settings), settings
+
+
+def test_partition_predicate_detection_ignores_comments_literals_and_select_lists():
+    assert has_partition_predicate("SELECT * FROM orders WHERE DATE(created_at) >= '2024-01-01'", "created_at")
+    assert has_partition_predicate("SELECT 1 FROM events WHERE _PARTITIONDATE = CURRENT_DATE()", "_PARTITIONTIME")
+    assert not has_partition_predicate("SELECT created_at FROM orders WHERE status = 'created_at'", "created_at")
+    assert not has_partition_predicate("SELECT 1 FROM orders -- WHERE created_at > x", "created_at")
+    assert not has_partition_predicate("SELECT 1 FROM orders WHERE id = 1 ORDER BY created_at", "created_at")
+
+
+def test_missing_partition_filter_warns_or_rejects(partitioned):
+    partitioning, settings = partitioned
+    sql = "SELECT status FROM `data.shop.orders` o JOIN users u ON u.id = o.user_id WHERE o.status = 'x'"
+
+    result = lint_query(sql, partitioning, mode="warn", auto_limit_rows=0, settings=settings)
+    assert [warning["table"] for warning in result.warnings] == ["orders"]
+    assert "status" in result.warnings[0]["message"]
+    assert result.sql == sql
+
+    with pytest.raises(CostLintError, match="partitioned by `created_at`"):
+        lint_query(sql, partitioning, mode="reject", auto_limit_rows=0, settings=settings)
+
+    filtered = sql + " AND o.created_at >= TIMESTAMP '2024-01-01'"
+    assert lint_query(filtered, partitioning, mode="reject", auto_limit_rows=0, settings=settings).warnings == []
+    assert lint_query(sql, partitioning, mode="off", auto_limit_rows=0, settings=settings).warnings == []
+
+
+def test_auto_limit_only_rewrites_exploratory_selects():
+    assert is_exploratory_select("SELECT id, name FROM users WHERE country = 'DE';")
+    assert not is_exploratory_select("SELECT country, COUNT(*) FROM users GROUP BY country")
+    assert not is_exploratory_select("SELECT id FROM users LIMIT 10")
+    assert not is_exploratory_select("INSERT INTO t SELECT 1")
+
+    result = lint_query("SELECT id FROM users;", {}, mode="off", auto_limit_rows=500)
+    assert result.sql == "SELECT id FROM users\nLIMIT 500"
+    assert result.rewrites[0]["rule"] == "auto_limit"
+
+
+def test_rewrites_and_warnings_are_reported_in_the_payload(partitioned):
+    client = FakeBigQueryClient(table=make_synthetic_table(num_rows=3))
+    context = SimpleNamespace(state={})
+    with mock.patch.object(custom_tools.bigquery, "Client", client), mock.patch.object(
+        custom_tools, "lint_query", lambda sql: lint_query(sql, mode="warn", auto_limit_rows=100)
+    ):
+        custom_tools.execute_bigquery_query("SELECT * FROM orders", tool_context=context)
+
+    result = context.state["latest_result"]
+    assert client.queries == ["SELECT * FROM orders\nLIMIT 100"]
+    assert result["sql"] == client.queries[0]
+    assert result["originalSql"] == "SELECT * FROM orders"
+    assert result["rewrites"][0]["rule"] == "auto_limit"
+    assert result["lintWarnings"][0]["rule"] == "missing_partition_filter"
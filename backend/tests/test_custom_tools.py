@@ -1,8 +1,18 @@
+import time
+from unittest import mock
+
 import pytest
 
+from benchmarks.fake_bigquery import FakeBigQueryClient, make_synthetic_table
+from selecta import custom_tools, execution
 from selecta.custom_tools import _ensure_supported_temporal_intervals
 
 
+class _ToolContext:
+    def __init__(self):
+        self.state = {}
+
+
 def test_temporal_interval_validator_allows_supported_units():
     sql = "SELECT TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 10 DAY)"
     # Should not raise
@@ -21,3 +31,160 @@ def test_temporal_interval_validator_blocks_unsupported_units(sql_snippet: str):
     with pytest.raises(ValueError) as exc:
         _ensure_supported_temporal_intervals(sql_snippet)
     assert "TIMESTAMP" in str(exc.value) or "DATETIME" in str(exc.value)
+
+
+def test_execute_bigquery_query_records_latest_result_with_nested_columns():
+    client = FakeBigQueryClient(table=make_synthetic_table(num_rows=5))
+    context = _ToolContext()
+    with mock.patch.object(custom_tools.bigquery, "Client", client):
+        rows = custom_tools.execute_bigquery_query("SELECT 1", tool_context=context)
+
+    assert len(rows) == 5
+    result = context.state["latest_result"]
+    assert result["rowCount"] == 5
+    assert result["jobId"].startswith("fake_")
+    assert isinstance(rows[0]["numeric_2"], float)
+    assert rows[0]["record_9"]["at"] == "2024-01-01"
+    assert context.state["results_history"][-1]["id"] == result["id"]
+
+
+def test_short_query_mode_runs_without_a_job_and_falls_back_when_one_is_needed():
+    client = FakeBigQueryClient(table=make_synthetic_table(num_rows=5), jobless_max_rows=10)
+    context = _ToolContext()
+    with mock.patch.object(custom_tools.bigquery, "Client", client), mock.patch.object(
+        execution, "SHORT_QUERY_MODE", True
+    ):
+        custom_tools.execute_bigquery_query("SELECT 1", tool_context=context)
+        short = context.state["latest_result"]
+        assert client.jobless_queries == ["SELECT 1"] and client.jobs == {}
+        assert (short["executionPath"], short["jobId"], short["rowCount"]) == ("jobless", None, 5)
+        assert short["jobStats"]["totalBytesProcessed"] == 64 * 5 * 10
+
+        client.table = make_synthetic_table(num_rows=50)
+        custom_tools.execute_bigquery_query("SELECT 2", tool_context=context)
+        long = context.state["latest_result"]
+        assert long["executionPath"] == "job"
+        assert long["jobId"] in client.jobs
+
+    with mock.patch.object(custom_tools.bigquery, "Client", client):
+        custom_tools.execute_bigquery_query("SELECT 3", tool_context=context)
+    assert context.state["latest_result"]["executionPath"] == "job"
+    assert client.jobless_queries == ["SELECT 1"]
+
+
+def test_fetch_more_rows_pages_the_job_destination_without_a_new_query():
+    client = FakeBigQueryClient(table=make_synthetic_table(num_rows=250, column_types=["INT64", "STRING"]))
+    context = _ToolContext()
+    with mock.patch.object(custom_tools.bigquery, "Client", client):
+        custom_tools.execute_bigquery_query("SELECT 1", tool_context=context)
+        job_id = next(iter(client.jobs))
+        # Only a preview is left in state, as after the spill file expired.
+        entry = context.state["results_history"][-1]
+        entry["rows"] = entry["rows"][:25]
+
+        first = custom_tools.fetch_more_rows(job_id=job_id, start_index=100, max_rows=100, tool_context=context)
+        second = custom_tools.fetch_more_rows(
+            job_id=job_id, page_token=first["nextPageToken"], max_rows=100, tool_context=context
+        )
+
+    assert len(client.queries) == 1
+    assert first["source"] == "destination_table"
+    assert first["totalRows"] == 250
+    assert first["rows"][0] == custom_tools._normalize_rows([dict(client.table.rows[100].items())])[0]
+    assert second["rowCount"] == 50
+    assert second["nextPageToken"] is None
+
+
+def test_fetch_more_rows_refuses_jobs_outside_the_session_history():
+    client = FakeBigQueryClient(table=make_synthetic_table(num_rows=250, column_types=["INT64"]))
+    with mock.patch.object(custom_tools.bigquery, "Client", client):
+        custom_tools.execute_bigquery_query("SELECT 1", tool_context=_ToolContext())
+        job_id = next(iter(client.jobs))
+
+        for kwargs in ({"tool_context": _ToolContext()}, {}):
+            with pytest.raises(RuntimeError, match="previous result in this session"):
+                custom_tools.fetch_more_rows(job_id=job_id, **kwargs)
+            with pytest.raises(RuntimeError, match="previous result in this session"):
+                custom_tools.fetch_more_rows(result_id="another-session-result", **kwargs)
+
+    assert client.get_job_calls == [] and client.list_rows_calls == []
+
+
+def test_fetch_more_rows_defaults_to_the_latest_result_in_state():
+    client = FakeBigQueryClient(table=make_synthetic_table(num_rows=30, column_types=["INT64"]))
+    context = _ToolContext()
+    with mock.patch.object(custom_tools.bigquery, "Client", client):
+        custom_tools.execute_bigquery_query("SELECT 1", tool_context=context)
+        page = custom_tools.fetch_more_rows(start_index=20, max_rows=5, tool_context=context)
+
+    assert page["source"] == "state"
+    assert page["resultId"] == context.state["latest_result"]["id"]
+    assert [row["int64_0"] for row in page["rows"]] == [
+        row["int64_0"] for row in context.state["latest_result"]["rows"][20:25]
+    ]
+    assert page["nextPageToken"] == "25"
+    assert client.list_rows_calls == []
+
+
+def test_execute_bigquery_queries_runs_statements_concurrently_with_separate_results():
+    client = FakeBigQueryClient(table=make_synthetic_table(num_rows=3), wait_latency_s=0.2)
+    context = _ToolContext()
+    sql_queries = [
+        "SELECT 1 AS a",
+        "SELECT 2 AS b",
+        "SELECT TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 12 MONTH)",
+    ]
+    with mock.patch.object(custom_tools.bigquery, "Client", client):
+        started = time.perf_counter()
+        results = custom_tools.execute_bigquery_queries(sql_queries, tool_context=context)
+        elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.35
+    assert len(client.queries) == 2
+    assert [len(entry.get("rows", [])) for entry in results] == [3, 3, 0]
+    assert "MONTH" in results[2]["error"]
+    history = context.state["results_history"]
+    assert [entry["sql"] for entry in history] == sql_queries[:2]
+    assert len({entry["id"] for entry in history}) == 2
+    assert history[0]["batch"]["id"] == history[1]["batch"]["id"]
+    assert [entry["batch"]["index"] for entry in history] == [0, 1]
+    assert context.state["latest_error"]["sql"] == sql_queries[2]
+
+
+def test_schema_driven_normalization_matches_the_generic_path():
+    from datetime import date, datetime, time as time_of_day
+    from decimal import Decimal
+
+    from google.cloud import bigquery
+
+    table = make_synthetic_table(num_rows=40)
+    data = table.as_dicts()
+    assert repr(custom_tools._normalize_rows(data, table.schema)) == repr(custom_tools._normalize_rows(data))
+
+    schema = [
+        bigquery.SchemaField("n", "NUMERIC"),
+        bigquery.SchemaField("t", "TIME"),
+        bigquery.SchemaField("ts", "TIMESTAMP"),
+        bigquery.SchemaField("tags", "STRING", mode="REPEATED"),
+        bigquery.SchemaField("j", "JSON"),
+        bigquery.SchemaField(
+            "items",
+            "RECORD",
+            mode="REPEATED",
+            fields=(bigquery.SchemaField("price", "BIGNUMERIC"), bigquery.SchemaField("raw", "BYTES")),
+        ),
+    ]
+    rows = [
+        {
+            "n": Decimal("1.50"),
+            "t": time_of_day(12, 30),
+            "ts": datetime(2024, 1, 1, 8),
+            "tags": ["a", "b"],
+            "j": {"at": date(2024, 1, 2), "v": [Decimal("2")]},
+            "items": [{"price": Decimal("3.25"), "raw": b"x", "extra": Decimal("1")}],
+        },
+        {"n": None, "t": None, "ts": None, "tags": [], "j": None, "items": []},
+    ]
+    assert repr(custom_tools._normalize_rows(rows, schema)) == repr(custom_tools._normalize_rows(rows))
+    mismatched = [{"other": Decimal("1")}]
+    assert custom_tools._normalize_rows(mismatched, schema) == [{"other": 1.0}]
@@ -0,0 +1,100 @@
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+
+from benchmarks.fake_bigquery import FakeBigQueryClient
+from selecta import custom_tools
+from selecta.execution import referenced_tables, rewrite_for_local
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+pytest.importorskip("duckdb")
+
+
+class _ToolContext:
+    def __init__(self):
+        self.state = {}
+
+
+def test_referenced_tables_ignores_ctes_and_foreign_datasets(dataset_config):
+    settings = dataset_config().bigquery
+    sql = """
+        WITH recent AS (SELECT * FROM `data.shop.orders`)
+        SELECT * FROM recent JOIN shop.users u ON TRUE
+        JOIN `other.shop.products` p ON TRUE, UNNEST(tags) AS tag
+    """
+    assert referenced_tables(sql, settings) == {"orders", "users", "other.shop.products"}
+
+
+def test_rewrite_for_local_replaces_qualified_references():
+    sql = "SELECT * FROM `data.shop.orders` o JOIN `data`.`shop`.`users` u ON o.user_id = u.id"
+    assert rewrite_for_local(sql, ["orders", "users"]) == (
+        'SELECT * FROM "orders" o JOIN "users" u ON o.user_id = u.id'
+    )
+
+
+def test_from_inside_extract_is_not_a_table_reference(dataset_config):
+    settings = dataset_config().bigquery
+    sql = "SELECT EXTRACT(YEAR FROM created) y, COUNT(*) FROM orders WHERE note != 'from notes' GROUP BY y"
+    assert referenced_tables(sql, settings) == {"orders"}
+    assert rewrite_for_local(sql, ["orders", "created"]) == sql.replace("FROM orders", 'FROM "orders"')
+
+
+def _write_extract(directory, name, table):
+    directory.mkdir(parents=True, exist_ok=True)
+    pq.write_table(table, directory / f"{name}.parquet")
+
+
+def test_auto_backend_routes_extracted_tables_to_duckdb(dataset_config, tmp_path):
+    extracts = tmp_path / "extracts"
+    _write_extract(
+        extracts,
+        "orders",
+        pa.table(
+            {
+                "order_id": [1, 2, 3],
+                "amount": pa.array([Decimal("1.50"), Decimal("2.25"), Decimal("3.00")], pa.decimal128(9, 2)),
+                "created": [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 2)],
+            }
+        ),
+    )
+    dataset_config(
+        execution={
+            "backend": "auto",
+            "local_extracts": {"directory": str(extracts), "tables": ["orders"]},
+        }
+    )
+
+    fake_client = FakeBigQueryClient()
+    context = _ToolContext()
+    with mock.patch.object(custom_tools.bigquery, "Client", fake_client):
+        rows = custom_tools.execute_bigquery_query(
+            "SELECT created, SUM(amount) AS total FROM `data.shop.orders` GROUP BY created ORDER BY created",
+            tool_context=context,
+        )
+        assert fake_client.queries == []
+        assert rows == [{"created": "2024-01-01", "total": 1.5}, {"created": "2024-01-02", "total": 5.25}]
+        assert context.state["latest_result"]["executionBackend"] == "duckdb"
+
+        custom_tools.execute_bigquery_query("SELECT * FROM `data.shop.users`", tool_context=context)
+        assert len(fake_client.queries) == 1
+        assert context.state["latest_result"]["executionBackend"] == "bigquery"
+
+
+def test_auto_backend_falls_back_to_bigquery_on_local_error(dataset_config, tmp_path):
+    extracts = tmp_path / "extracts"
+    _write_extract(extracts, "orders", pa.table({"order_id": [1]}))
+    dataset_config(
+        execution={"backend": "auto", "local_extracts": {"directory": str(extracts), "tables": ["orders"]}}
+    )
+
+    fake_client = FakeBigQueryClient()
+    context = _ToolContext()
+    with mock.patch.object(custom_tools.bigquery, "Client", fake_client):
+        custom_tools.execute_bigquery_query(
+            "SELECT SAFE_DIVIDE(order_id, 0) FROM `data.shop.orders`", tool_context=context
+        )
+    assert len(fake_client.queries) == 1
+    assert context.state["latest_result"]["executionBackend"] == "bigquery"
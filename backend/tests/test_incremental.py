@@ -0,0 +1,118 @@
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from google.cloud import bigquery
+from google.cloud.bigquery.table import Row
+
+from benchmarks.fake_bigquery import FakeBigQueryClient, SyntheticTable
+from selecta import cost_lint, custom_tools, incremental
+from selecta.incremental import incremental_sql, plan_incremental
+from selecta.result_cache import get_result_cache
+
+DAILY = (
+    "SELECT DATE(o.created_at) AS day, COUNT(*) AS orders\n"
+    "FROM `data.shop.orders` AS o\n"
+    "WHERE o.status != 'Cancelled' AND o.created_at >= TIMESTAMP(DATE_SUB(CURRENT_DATE(), INTERVAL 9 DAY))\n"
+    "GROUP BY day\n"
+    "ORDER BY day"
+)
+
+
+def _table(columns, rows):
+    schema = [bigquery.SchemaField(name, field_type, mode=mode) for name, field_type, mode in columns]
+    index = {name: position for position, (name, _, _) in enumerate(columns)}
+    return SyntheticTable(schema=schema, rows=[Row(tuple(row), index) for row in rows])
+
+
+def _days(counts):
+    return _table([("day", "DATE", "NULLABLE"), ("orders", "INTEGER", "NULLABLE")], sorted(counts.items()))
+
+
+def _probe(lower, changed):
+    checked_at = datetime(2024, 5, 20, 6, tzinfo=timezone.utc)
+    bound = datetime.combine(lower, datetime.min.time(), tzinfo=timezone.utc)
+    return _table(
+        [("checked_at", "TIMESTAMP", "NULLABLE"), ("changed_partitions", "STRING", "REPEATED"), ("bound_0", "TIMESTAMP", "NULLABLE")],
+        [(checked_at, changed, bound)],
+    )
+
+
+def test_plan_accepts_day_buckets_and_rejects_other_shapes(dataset_config):
+    settings = dataset_config().bigquery
+    partitioning = cost_lint.set_table_partitioning(
+        {"orders": {"partition_column": "created_at", "partition_data_type": "TIMESTAMP"}}, settings
+    )
+
+    plan = plan_incremental(DAILY, partitioning, settings)
+    assert (plan.table, plan.column_ref, plan.bucket_column) == (("data", "shop", "orders"), "o.created_at", "day")
+    assert [(bound.op, bound.on_bucket) for bound in plan.bounds] == [(">=", False)]
+    assert plan.order_by == (("day", False),)
+    assert "(o.status != 'Cancelled' AND o.created_at >= TIMESTAMP(DATE_SUB(CURRENT_DATE(), INTERVAL 9 DAY)))" \
+        " AND o.created_at >= TIMESTAMP '2024-05-10'\nGROUP BY day" in incremental_sql(plan, date(2024, 5, 10))
+
+    unfiltered = plan_incremental("SELECT DATE(created_at) AS d, SUM(x) FROM orders GROUP BY 1", partitioning, settings)
+    assert unfiltered.bounds == ()
+    assert incremental_sql(unfiltered, date(2024, 1, 1)).endswith("FROM orders WHERE created_at >= TIMESTAMP '2024-01-01'\nGROUP BY 1")
+
+    for sql in (
+        DAILY + " LIMIT 5",
+        "SELECT status, COUNT(*) FROM orders WHERE created_at >= TIMESTAMP '2024-01-01' GROUP BY status",
+        "SELECT DATE(created_at) AS d, COUNT(*) FROM orders WHERE EXTRACT(YEAR FROM created_at) = 2024 GROUP BY d",
+        "SELECT DATE(o.created_at) AS d, COUNT(*) FROM orders o JOIN users u ON u.id = o.user_id GROUP BY d",
+        "SELECT DATE(created_at) AS d, COUNT(*) FROM orders GROUP BY d ORDER BY COUNT(*) DESC",
+    ):
+        assert plan_incremental(sql, partitioning, settings) is None, sql
+
+
+def test_later_runs_only_scan_changed_partitions_and_match_a_full_run(dataset_config):
+    settings = dataset_config().bigquery
+    cost_lint.set_table_partitioning({"orders": {"partition_column": "created_at", "partition_data_type": "TIMESTAMP"}}, settings)
+    first_day = date(2024, 5, 1)
+    counts = {first_day + timedelta(days=offset): 10 + offset for offset in range(10)}
+    state = {"probe": _probe(first_day, []), "counts": counts}
+
+    def table_for_sql(sql):
+        if "checked_at" in sql:
+            return state["probe"]
+        start = date.fromisoformat(sql.split(">= TIMESTAMP '")[1][:10]) if ">= TIMESTAMP '" in sql else first_day
+        return _days({day: count for day, count in state["counts"].items() if day >= start})
+
+    client = FakeBigQueryClient(table_for_sql=table_for_sql)
+    context = SimpleNamespace(state={})
+    with mock.patch.object(custom_tools.bigquery, "Client", client), mock.patch.object(
+        custom_tools, "INCREMENTAL_REFRESH_ENABLED", True
+    ), mock.patch.object(incremental, "_INCREMENTAL_CACHE", incremental.IncrementalCache()):
+        custom_tools.execute_bigquery_query(DAILY, tool_context=context)
+        first = context.state["latest_result"]
+        assert len(client.queries) == 2 and first["rowCount"] == 10 and first["incremental"] is None
+        full_bytes = first["jobStats"]["totalBytesProcessed"]
+
+        # A day later: the window moved by one day, the 10th was updated and the 11th arrived.
+        state["probe"] = _probe(first_day + timedelta(days=1), ["20240510", "20240511"])
+        counts[date(2024, 5, 10)] = 99
+        counts[date(2024, 5, 11)] = 7
+        get_result_cache().clear()
+        custom_tools.execute_bigquery_query(DAILY, tool_context=context)
+        second = context.state["latest_result"]
+
+        assert "INFORMATION_SCHEMA.PARTITIONS" in client.queries[2]
+        assert "o.created_at >= TIMESTAMP '2024-05-10'" in client.queries[3]
+        expected = [{"day": day.isoformat(), "orders": count} for day, count in sorted(counts.items()) if day > first_day]
+        assert second["rows"] == expected
+        info = second["incremental"]
+        assert (info["refreshedFrom"], info["bucketsReused"], info["bucketsRefreshed"]) == ("2024-05-10", 8, 2)
+        assert info["fullRunBytes"] == full_bytes
+        assert info["bytesSaved"] == full_bytes - info["bytesProcessed"] > 0
+        assert (second["jobId"], second["jobStats"]) == (None, None)
+        assert [job["role"] for job in info["jobs"]] == ["probe", "refresh"]
+        assert sum(job["jobStats"]["totalBytesProcessed"] for job in info["jobs"]) == info["bytesProcessed"]
+
+        # Nothing changed since: the cached buckets are served after the probe alone.
+        state["probe"] = _probe(first_day + timedelta(days=1), [])
+        get_result_cache().clear()
+        custom_tools.execute_bigquery_query(DAILY, tool_context=context)
+        third = context.state["latest_result"]
+        assert len(client.queries) == 5
+        assert third["rows"] == expected
+        assert third["incremental"]["refreshedFrom"] is None
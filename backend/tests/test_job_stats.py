@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from google.cloud.bigquery.job import QueryPlanEntry
+
+from benchmarks.fake_bigquery import FakeBigQueryClient, make_synthetic_table
+from selecta import custom_tools
+from selecta.job_stats import slowest_stages, summarize_job
+
+
+def _entry(name, duration_ms, **timings):
+    return QueryPlanEntry.from_api_repr(
+        {
+            "name": name,
+            "id": name,
+            "startMs": "1000",
+            "endMs": str(1000 + duration_ms),
+            **{key: str(value) for key, value in timings.items()},
+        }
+    )
+
+
+def test_slowest_stages_ranks_by_duration_with_breakdown():
+    plan = [
+        _entry("S00", 50),
+        _entry("S01", 900, waitMsMax=700, computeMsMax=150),
+        _entry("S02", 300),
+    ]
+    stages = slowest_stages(plan, limit=2)
+    assert [stage["name"] for stage in stages] == ["S01", "S02"]
+    assert stages[0]["durationMs"] == 900
+    assert stages[0]["waitMsMax"] == 700
+    assert stages[0]["computeMsMax"] == 150
+
+
+def test_summarize_job_separates_queue_from_run_time():
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    job = SimpleNamespace(
+        created=created,
+        started=created + timedelta(milliseconds=400),
+        ended=created + timedelta(milliseconds=1400),
+        total_bytes_processed=2048,
+        total_bytes_billed=10485760,
+        slot_millis=5000,
+        cache_hit=False,
+        query_plan=[],
+    )
+    stats = summarize_job(job)
+    assert stats["queueMs"] == 400
+    assert stats["runMs"] == 1000
+    assert stats["totalBytesBilled"] == 10485760
+    assert stats["slowestStages"] == []
+
+
+def test_summarize_job_returns_none_without_statistics():
+    assert summarize_job(SimpleNamespace(job_id="local_1")) is None
+
+
+def test_execute_bigquery_query_attaches_job_stats():
+    client = FakeBigQueryClient(table=make_synthetic_table(num_rows=4, width=2))
+    context = SimpleNamespace(state={})
+    with mock.patch.object(custom_tools.bigquery, "Client", client):
+        custom_tools.execute_bigquery_query("SELECT 1", tool_context=context)
+
+    stats = context.state["latest_result"]["jobStats"]
+    assert stats["totalBytesProcessed"] == 64 * 4 * 2
+    assert stats["cacheHit"] is False
+    assert stats["planStageCount"] == 2
+    assert stats["slowestStages"][0]["name"] == "S00: Input"
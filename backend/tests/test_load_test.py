@@ -0,0 +1,40 @@
+import asyncio
+
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from benchmarks.load_test import ScriptedLlm, run_load_test
+
+
+def _collect(llm, contents):
+    async def run():
+        return [response async for response in llm.generate_content_async(LlmRequest(contents=contents))]
+
+    return asyncio.run(run())
+
+
+def test_scripted_llm_calls_the_query_tool_then_summarises():
+    llm = ScriptedLlm()
+    question = types.Content(role="user", parts=[types.Part(text="orders per day")])
+    (call,) = _collect(llm, [question])
+    function_call = call.content.parts[0].function_call
+    assert function_call.name == "execute_bigquery_query"
+    assert _collect(llm, [question])[0].content == call.content
+
+    tool_reply = types.Content(
+        role="user",
+        parts=[types.Part(function_response=types.FunctionResponse(name="execute_bigquery_query", response={"result": [{}, {}]}))],
+    )
+    (summary,) = _collect(llm, [question, call.content, tool_reply])
+    assert summary.content.parts[0].text == "The query returned 2 rows."
+
+
+def test_load_test_drives_sse_sessions_through_the_fake_model_and_bigquery():
+    report = run_load_test(sessions=2, concurrency=2, turns=2, rows=5, bq_latency_ms=0, model_latency_ms=0)
+
+    assert report["turns"] == 4
+    assert report["errors"] == 0
+    assert report["bigquery_jobs"] == 4
+    assert report["events_per_turn"] >= 3
+    assert report["latency_ms"]["p50"] > 0 and report["first_event_ms"]["p99"] is not None
+    assert report["event_bytes"]["total"] > 0
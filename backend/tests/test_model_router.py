@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from selecta import callbacks
+from selecta.config_loader import ModelRoutingSettings
+from selecta.model_router import choose_model, last_query_failed, mentioned_tables
+
+MODELS = ["gemini-2.5-flash", "gemini-2.5-pro"]
+TABLES = ["orders", "order_items", "products", "users"]
+
+
+def test_signals_pick_the_fast_or_strong_model():
+    settings = ModelRoutingSettings(fast_max_words=8, fast_max_tables=1)
+
+    assert choose_model(MODELS, settings, "How many users signed up yesterday?", TABLES).tier == "fast"
+    assert choose_model(MODELS, settings, "Revenue of order items by product category", TABLES).reason == "many_tables"
+    long_question = "Show me the weekly trend of returning customers split by acquisition channel please"
+    assert choose_model(MODELS, settings, long_question, TABLES).reason == "long_question"
+    assert choose_model(MODELS, settings, "users?", TABLES, query_failed=True).model == "gemini-2.5-pro"
+    assert choose_model(["only-model"], settings, long_question, TABLES).model == "only-model"
+
+    assert mentioned_tables("top order items per user", TABLES) == ["order_items", "users"]
+    assert last_query_failed({"latest_error": {"timestamp": 20}, "latest_result": {"createdAt": 10}})
+    assert not last_query_failed({"latest_error": {"timestamp": 5}, "latest_result": {"createdAt": 10}})
+
+
+def test_route_model_callback_rewrites_the_request_and_escalates_after_a_sql_error(dataset_config):
+    dataset_config(models=MODELS, model_routing={"fast_max_words": 10})
+    state = {}
+    context = SimpleNamespace(invocation_id="inv-1", state=state)
+    request = LlmRequest(
+        model="gemini-2.5-pro",
+        contents=[
+            types.Content(role="user", parts=[types.Part(text="orders per day")]),
+            types.Content(
+                role="user",
+                parts=[types.Part(function_response=types.FunctionResponse(name="execute_bigquery_query", response={}))],
+            ),
+        ],
+    )
+
+    assert callbacks.route_model(context, request) is None
+    assert request.model == "gemini-2.5-flash"
+
+    state["latest_error"] = {"timestamp": 2, "message": "Unrecognized name: order_date"}
+    state["latest_result"] = {"createdAt": 1}
+    callbacks.route_model(context, request)
+    assert request.model == "gemini-2.5-pro"
+
+    callbacks.start_model_turn_timer(context, request)
+    callbacks.stop_model_turn_timer(context, SimpleNamespace(model_version=None, partial=False))
+    assert "inv-1" not in callbacks._ROUTED_MODELS
+
+
+def test_failed_model_calls_leave_no_turn_state(dataset_config):
+    dataset_config(models=MODELS)
+    context = SimpleNamespace(invocation_id="inv-3", state={})
+    request = LlmRequest(model="gemini-2.5-pro", contents=[types.Content(role="user", parts=[types.Part(text="hi")])])
+    callbacks.start_model_turn_timer(context, request)
+    callbacks.route_model(context, request)
+    callbacks.stop_model_turn_timer(context, SimpleNamespace(model_version=None, partial=True))
+    assert "inv-3" in callbacks._ROUTED_MODELS and "inv-3" in callbacks._FIRST_RESPONSE_SEEN
+
+    callbacks.drop_failed_instruction_cache(context, request, RuntimeError("503 unavailable"))
+    for turns in (callbacks._MODEL_TURN_STARTS, callbacks._FIRST_RESPONSE_SEEN, callbacks._ROUTED_MODELS):
+        assert "inv-3" not in turns
+
+
+def test_single_model_datasets_are_not_rerouted(dataset_config):
+    config = dataset_config()
+    assert config.models == ["test-model"]
+    request = LlmRequest(model="test-model", contents=[types.Content(role="user", parts=[types.Part(text="hi")])])
+    callbacks.route_model(SimpleNamespace(invocation_id="inv-2", state={}), request)
+    assert request.model == "test-model"
@@ -0,0 +1,66 @@
+from unittest import mock
+
+from selecta import cost_lint, instructions, prompt_profile
+from selecta.prompt_profile import estimate_tokens, format_report, get_prompt_profile
+from selecta.telemetry import get_registry
+
+DDLS = [
+    {"table_name": "orders", "ddl": "CREATE TABLE `data.shop.orders`\n(\n  id INT64,\n  status STRING OPTIONS(description='Order status')\n);"},
+    {"table_name": "users", "ddl": "CREATE TABLE `data.shop.users`\n(\n  id INT64\n);"},
+]
+PROFILES = [
+    {"source_table_id": "data.shop.orders", "source_column_name": "status", "top_n": [{"value": "Shipped", "count": 9}]},
+]
+
+
+def _render(profiles=PROFILES, samples=()):
+    with mock.patch.object(instructions, "get_table_ddl_strings", lambda: DDLS), mock.patch.object(
+        instructions, "fetch_bigquery_data_profiles", lambda: list(profiles)
+    ), mock.patch.object(instructions, "fetch_sample_data_for_tables", lambda num_rows: list(samples)), mock.patch.object(
+        instructions, "load_table_partitioning", lambda settings=None: cost_lint.set_table_partitioning({}, settings)
+    ):
+        return instructions._build_instructions()
+
+
+def test_sections_tables_and_columns_add_up_to_the_rendered_prompt(dataset_config):
+    dataset_config()
+    rendered = _render()
+    profile = get_prompt_profile()
+
+    assert profile.total.bytes == len(rendered.encode("utf-8"))
+    assert profile.total.tokens == estimate_tokens(rendered)
+    assert {"overall_workflow", "few_shot_examples", "ddl", "profiles", "samples"} <= set(profile.sections)
+    # Everything but the newlines joining the template sections is attributed.
+    joiners = len([section for section in profile.sections if section in instructions._TEMPLATE_SECTIONS]) - 1
+    assert sum(size.bytes for size in profile.sections.values()) + joiners == profile.total.bytes
+
+    # The template injects the profiles twice, and each copy is charged.
+    profile_text = "Data profile for column 'status' in table 'data.shop.orders':"
+    assert rendered.count(profile_text) == 2
+    status = profile.columns["orders.status"]
+    assert status["profiles"].bytes > 2 * len(profile_text)
+    assert status["ddl"].bytes == len("  status STRING OPTIONS(description='Order status')")
+    assert set(profile.tables) == {"orders", "users"}
+    assert "users.id" in profile.columns and "orders.id" in profile.columns
+
+    gauge = {(item["labels"]["section"]): item["value"] for item in get_registry().snapshot()["gauges"]["selecta_prompt_bytes"]}
+    assert gauge["total"] == profile.total.bytes
+    assert gauge["few_shot_examples"] == profile.sections["few_shot_examples"].bytes
+
+    report = format_report(profile, top=1)
+    assert report.startswith(f"System prompt: {profile.total.bytes:,} bytes")
+    assert "Tables (top 1 of 2):\n  orders" in report
+
+
+def test_samples_are_charged_per_table_and_column_without_profiles(dataset_config, capsys):
+    dataset_config()
+    samples = [{"table_name": "data.shop.users", "sample_rows": [{"id": 1, "email": "a@example.com"}] * 3}]
+    _render(profiles=(), samples=samples)
+    profile = get_prompt_profile()
+
+    assert profile.tables["users"]["samples"].bytes > 0
+    assert profile.columns["users.email"]["samples"].bytes == 3 * len('{"email": "a@example.com"}')
+
+    with mock.patch.object(instructions, "return_instructions_bigquery", lambda: _render(profiles=(), samples=samples)):
+        assert prompt_profile.main(["--top", "1"]) == 0
+    assert "users.email" in capsys.readouterr().out
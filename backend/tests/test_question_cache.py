@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from google.genai import types
+
+from benchmarks.fake_bigquery import FakeBigQueryClient, make_synthetic_table
+from selecta import callbacks, custom_tools
+from selecta.question_cache import QuestionCache, normalize_question
+
+
+def _content(text):
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+def test_lookup_matches_normalized_and_similar_questions_but_not_other_numbers():
+    cache = QuestionCache(similarity=0.8)
+    cache.record("shop", "s1", "What were the top 5 products by revenue in 2024?", "SELECT 1")
+
+    assert normalize_question("  What were the TOP 5 products, by revenue in 2024 ") == (
+        "what were the top 5 products by revenue in 2024"
+    )
+    assert cache.lookup("shop", "s1", "what were the top 5 products by revenue in 2024")[1] == 1.0
+    entry, score = cache.lookup("shop", "s1", "What were the top 5 products by total revenue in 2024?")
+    assert entry.sql == "SELECT 1" and 0.8 <= score < 1
+    assert cache.lookup("shop", "s1", "What were the top 5 products by revenue in 2023?") is None
+    assert cache.lookup("other", "s1", "What were the top 5 products by revenue in 2024?") is None
+    assert QuestionCache().lookup("shop", "s1", "What were the top 5 products by total revenue in 2024?") is None
+
+
+def test_schema_change_and_multi_query_turns_drop_entries():
+    cache = QuestionCache()
+    cache.record("shop", "s1", "Orders per day", "SELECT 1")
+    assert cache.lookup("shop", "s2", "Orders per day") is None
+    assert cache.lookup("shop", "s1", "Orders per day") is None
+
+    cache.record("shop", "s1", "Compare regions", "SELECT 1", invocation_id="inv")
+    cache.record("shop", "s1", "Compare regions", "SELECT 2", invocation_id="inv")
+    cache.record("shop", "s1", "Compare regions", "SELECT 3", invocation_id="inv")
+    assert cache.lookup("shop", "s1", "Compare regions") is None
+
+
+def test_repeated_question_is_replayed_without_the_model_and_flagged(dataset_config):
+    dataset_config()
+    client = FakeBigQueryClient(table=make_synthetic_table(num_rows=3))
+    state = {}
+    first = SimpleNamespace(state=state, user_content=_content("Top products?"), invocation_id="inv-1")
+    with mock.patch.object(custom_tools.bigquery, "Client", client), mock.patch.object(
+        custom_tools, "schema_snapshot", return_value="s1"
+    ), mock.patch.object(callbacks, "schema_snapshot", return_value="s1"):
+        custom_tools.execute_bigquery_query("SELECT name FROM products", tool_context=first)
+
+        tool_reply = types.Content(
+            role="user",
+            parts=[types.Part(function_response=types.FunctionResponse(name="execute_bigquery_query", response={}))],
+        )
+        follow_up = SimpleNamespace(contents=[_content("top products"), tool_reply])
+        assert callbacks.replay_cached_question(SimpleNamespace(state=state), follow_up) is None
+
+        response = callbacks.replay_cached_question(
+            SimpleNamespace(state=state), SimpleNamespace(contents=[_content("top products")])
+        )
+        call = response.content.parts[0].function_call
+        assert call.name == "execute_bigquery_query"
+        assert call.args == {"sql_query": "SELECT name FROM products"}
+        assert response.custom_metadata["questionCacheHit"] is True
+
+        second = SimpleNamespace(state=state, user_content=_content("top products"), invocation_id="inv-2")
+        custom_tools.execute_bigquery_query(call.args["sql_query"], tool_context=second)
+
+    assert [entry["questionCacheHit"] for entry in state["results_history"]] == [False, True]
+    assert state[callbacks.QUESTION_REPLAY_STATE_KEY] is None
@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from benchmarks.fake_bigquery import FakeBigQueryClient, make_synthetic_table
+from selecta import custom_tools
+from selecta.result_store import ResultNotFoundError, ResultStore
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultStore(directory=tmp_path, threshold_rows=10)
+
+
+def _rows(count):
+    return [{"id": i, "region": "north" if i % 2 else "south", "revenue": float(i * 10)} for i in range(count)]
+
+
+def test_read_range_pages_sorts_and_filters(store):
+    store.spill("r1", _rows(100))
+
+    page = store.read_range("r1", offset=10, limit=5)
+    assert [row["id"] for row in page["rows"]] == [10, 11, 12, 13, 14]
+    assert page["totalRows"] == 100
+
+    page = store.read_range(
+        "r1",
+        limit=3,
+        sort_by="revenue",
+        descending=True,
+        filters=[{"column": "region", "op": "==", "value": "south"}, {"column": "id", "op": "<", "value": 50}],
+    )
+    assert [row["id"] for row in page["rows"]] == [48, 46, 44]
+    assert page["totalRows"] == 25
+
+
+def test_read_range_validates_input(store):
+    store.spill("r1", _rows(20))
+    with pytest.raises(ValueError):
+        store.read_range("r1", sort_by="missing")
+    with pytest.raises(ValueError):
+        store.read_range("r1", filters=[{"column": "id", "op": "like", "value": 1}])
+    with pytest.raises(ResultNotFoundError):
+        store.read_range("nope")
+    with pytest.raises(ValueError):
+        store.read_range("../etc/passwd")
+
+
+def test_large_results_are_spilled_and_state_keeps_a_preview(store):
+    client = FakeBigQueryClient(table=make_synthetic_table(num_rows=300, column_types=["INT64", "STRING"]))
+    context = SimpleNamespace(state={})
+    with mock.patch.object(custom_tools, "get_result_store", return_value=store), mock.patch.object(
+        custom_tools, "RESULT_SPILL_PREVIEW_ROWS", 25
+    ), mock.patch.object(custom_tools.bigquery, "Client", client):
+        rows = custom_tools.execute_bigquery_query("SELECT 1", tool_context=context)
+
+    result = context.state["latest_result"]
+    assert result["spilled"] is True
+    assert result["rowCount"] == 300
+    assert len(result["rows"]) == len(rows) == 25
+    assert store.read_range(result["id"], offset=290, limit=50)["rows"][-1]["int64_0"] is not None
+    assert store.read_range(result["id"])["totalRows"] == 300
+
+
+def test_fetch_more_rows_reads_spilled_results(store):
+    client = FakeBigQueryClient(table=make_synthetic_table(num_rows=300, column_types=["INT64", "STRING"]))
+    context = SimpleNamespace(state={})
+    with mock.patch.object(custom_tools, "get_result_store", return_value=store), mock.patch.object(
+        custom_tools, "RESULT_SPILL_PREVIEW_ROWS", 25
+    ), mock.patch.object(custom_tools.bigquery, "Client", client):
+        custom_tools.execute_bigquery_query("SELECT 1", tool_context=context)
+        page = custom_tools.fetch_more_rows(page_token="25", max_rows=275, tool_context=context)
+
+    assert page["source"] == "spill"
+    assert page["startIndex"] == 25
+    assert page["rowCount"] == 275
+    assert page["nextPageToken"] is None
+    assert client.list_rows_calls == []
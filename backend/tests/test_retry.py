@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from benchmarks.fake_bigquery import FakeBigQueryClient, make_synthetic_table
+from selecta import custom_tools, retry
+from selecta.retry import RetryPolicy, retry_reason
+
+
+def _rate_limited():
+    return google_exceptions.Forbidden("Exceeded rate limits", errors=[{"reason": "rateLimitExceeded"}])
+
+
+def _invalid_query():
+    return google_exceptions.BadRequest("Syntax error", errors=[{"reason": "invalidQuery"}])
+
+
+@pytest.fixture
+def no_sleep_policy():
+    retry.set_retry_policy(RetryPolicy(max_attempts=3, random=lambda: 0.0))
+    yield
+    retry.set_retry_policy(None)
+
+
+def test_retry_reason_separates_transient_from_sql_errors():
+    assert retry_reason(_rate_limited()) == "rateLimitExceeded"
+    assert retry_reason(google_exceptions.InternalServerError("boom")) == "http_500"
+    assert retry_reason(google_exceptions.ServiceUnavailable("down")) == "http_503"
+    assert retry_reason(_invalid_query()) is None
+    assert retry_reason(google_exceptions.InternalServerError("x", errors=[{"reason": "invalidQuery"}])) is None
+    assert retry_reason(ValueError("bad")) is None
+
+
+def test_backoff_is_exponential_with_full_jitter():
+    policy = RetryPolicy(initial_backoff_seconds=1, max_backoff_seconds=5, multiplier=2, random=lambda: 1.0)
+    assert [policy.backoff(attempt) for attempt in range(4)] == [1, 2, 4, 5]
+    assert RetryPolicy(random=lambda: 0.5).backoff(0) == pytest.approx(0.5 * policy.initial_backoff_seconds)
+    assert policy.should_retry(_rate_limited(), retries_so_far=0) == "rateLimitExceeded"
+    assert RetryPolicy(max_attempts=2).should_retry(_rate_limited(), retries_so_far=1) is None
+
+
+def _run(client):
+    context = SimpleNamespace(state={})
+    with mock.patch.object(custom_tools.bigquery, "Client", client):
+        rows = custom_tools.execute_bigquery_query("SELECT 1", tool_context=context)
+    return rows, context.state["latest_result"]
+
+
+def test_flaky_wait_reattaches_to_the_running_job(no_sleep_policy):
+    client = FakeBigQueryClient(table=make_synthetic_table(num_rows=3), wait_errors=[_rate_limited()])
+    rows, result = _run(client)
+
+    assert len(rows) == 3
+    assert len(client.queries) == 1
+    assert client.get_job_calls == [result["jobId"]]
+    assert result["retries"] == 1
+
+
+def test_failed_job_is_resubmitted(no_sleep_policy):
+    client = FakeBigQueryClient(
+        table=make_synthetic_table(num_rows=3),
+        job_errors=[google_exceptions.InternalServerError("backend", errors=[{"reason": "backendError"}])],
+        submit_errors=[google_exceptions.ServiceUnavailable("unavailable")],
+    )
+    rows, result = _run(client)
+
+    assert len(rows) == 3
+    assert len(client.queries) == 3
+    assert result["retries"] == 2
+
+
+def test_sql_errors_and_exhausted_retries_are_not_retried(no_sleep_policy):
+    client = FakeBigQueryClient(job_errors=[_invalid_query()])
+    context = SimpleNamespace(state={})
+    with mock.patch.object(custom_tools.bigquery, "Client", client), pytest.raises(RuntimeError):
+        custom_tools.execute_bigquery_query("SELEC 1", tool_context=context)
+    assert len(client.queries) == 1
+    assert context.state["latest_error"]["jobId"].startswith("fake_")
+
+    client = FakeBigQueryClient(submit_errors=[_rate_limited() for _ in range(3)])
+    with mock.patch.object(custom_tools.bigquery, "Client", client), pytest.raises(RuntimeError):
+        custom_tools.execute_bigquery_query("SELECT 1", tool_context=SimpleNamespace(state={}))
+    assert len(client.queries) == 3
@@ -0,0 +1,111 @@
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from benchmarks.fake_bigquery import FakeBigQueryClient
+from selecta import custom_tools, scheduler
+from selecta.scheduler import AdmissionError, QueryScheduler
+
+
+def _hold(sched, user, session, started, release, order=None):
+    def run():
+        with sched.admit(user, session):
+            if order is not None:
+                order.append(session)
+            started.release()
+            release.wait(5)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_queue_full_fails_fast():
+    sched = QueryScheduler(max_concurrent=1, max_per_user=1, max_queue=0, queue_timeout_seconds=5)
+    started, release = threading.Semaphore(0), threading.Event()
+    holder = _hold(sched, "u1", "s1", started, release)
+    assert started.acquire(timeout=5)
+
+    with pytest.raises(AdmissionError) as exc:
+        with sched.admit("u2", "s2"):
+            pass
+    assert exc.value.reason == "queue_full"
+
+    release.set()
+    holder.join(5)
+    assert sched.running == 0
+
+
+def test_wait_times_out():
+    sched = QueryScheduler(max_concurrent=1, max_queue=4, queue_timeout_seconds=0.05)
+    started, release = threading.Semaphore(0), threading.Event()
+    holder = _hold(sched, "u1", "s1", started, release)
+    assert started.acquire(timeout=5)
+
+    with pytest.raises(AdmissionError) as exc:
+        with sched.admit("u2", "s2"):
+            pass
+    assert exc.value.reason == "timeout"
+    assert sched.queued == 0
+    release.set()
+    holder.join(5)
+
+
+def test_slots_rotate_across_sessions():
+    sched = QueryScheduler(max_concurrent=1, max_per_user=4, max_queue=10, queue_timeout_seconds=5)
+    started, release = threading.Semaphore(0), threading.Event()
+    order = []
+    blocker = _hold(sched, "u0", "blocker", started, release, order)
+    assert started.acquire(timeout=5)
+
+    # Session "a" queues three requests before "b" queues one; "b" must not wait behind all of "a".
+    gate = threading.Event()
+    threads = []
+    for session in ["a", "a", "a", "b"]:
+        threads.append(_hold(sched, "u1", session, started, gate, order))
+        deadline = time.monotonic() + 5
+        while sched.queued < len(threads) and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+    gate.set()
+    release.set()
+    for thread in [blocker, *threads]:
+        thread.join(5)
+    assert order == ["blocker", "a", "b", "a", "a"]
+
+
+def test_per_user_limit_lets_other_users_through():
+    sched = QueryScheduler(max_concurrent=4, max_per_user=1, max_queue=10, queue_timeout_seconds=5)
+    started, release = threading.Semaphore(0), threading.Event()
+    holder = _hold(sched, "u1", "s1", started, release)
+    assert started.acquire(timeout=5)
+
+    with sched.admit("u2", "s2") as admission:
+        assert admission.wait_ms < 1000
+    sched.queue_timeout_seconds = 0.01
+    with pytest.raises(AdmissionError):
+        with sched.admit("u1", "s1b"):
+            pass
+    release.set()
+    holder.join(5)
+
+
+def test_rejected_query_is_recorded_in_errors_history():
+    sched = QueryScheduler(max_concurrent=1, max_queue=0)
+    started, release = threading.Semaphore(0), threading.Event()
+    holder = _hold(sched, "u1", "s1", started, release)
+    assert started.acquire(timeout=5)
+
+    context = SimpleNamespace(state={}, user_id="u2", session=SimpleNamespace(id="s2"))
+    with mock.patch.object(scheduler, "_SCHEDULER", sched), mock.patch.object(
+        custom_tools.bigquery, "Client", FakeBigQueryClient()
+    ):
+        with pytest.raises(RuntimeError, match="queue is full"):
+            custom_tools.execute_bigquery_query("SELECT 1", tool_context=context)
+
+    assert context.state["errors_history"][-1]["type"] == "AdmissionError"
+    release.set()
+    holder.join(5)
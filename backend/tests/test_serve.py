@@ -0,0 +1,115 @@
+import json
+import multiprocessing
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import urllib.request
+
+import pytest
+
+from selecta import serve as serve_module
+from selecta.custom_tools import _QueryOutcome
+from selecta.result_cache import ResultCache
+from selecta.shared_store import SharedStore, set_shared_store
+
+_PREPARED = {}
+
+
+def _write_from_child(path):
+    SharedStore(path).put("result", "k", ("select 1", {"rows": [1]}), 60)
+
+
+def test_shared_store_is_visible_across_processes_and_backs_the_result_cache(tmp_path):
+    path = tmp_path / "shared.sqlite3"
+    store = SharedStore(path)
+    process = multiprocessing.get_context("fork").Process(target=_write_from_child, args=(path,))
+    process.start()
+    process.join(10)
+
+    assert store.get("result", "k") == ("select 1", {"rows": [1]})
+    set_shared_store(store)
+    try:
+        assert ResultCache().get("k", "SELECT 1") == {"rows": [1]}
+        ResultCache().put("k2", "SELECT 2", {"rows": [2]}, row_count=1)
+        assert store.get("result", "k2")[1] == {"rows": [2]}
+    finally:
+        set_shared_store(None)
+    assert SharedStore(path, clock=lambda: time.time() + 120).get("result", "k") is None
+
+
+def test_shared_store_keeps_values_as_json_in_a_private_file(tmp_path):
+    path = tmp_path / "shared.sqlite3"
+    store = SharedStore(path)
+    outcome = _QueryOutcome(rows=[{"n": 1}], job_id="job-1", backend="bigquery", job_stats=None, admission_wait_ms=0.0)
+    store.put("result", "k", ("select 1", outcome), 60)
+
+    assert store.get("result", "k") == ("select 1", outcome)
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    with sqlite3.connect(path) as connection:
+        connection.execute("UPDATE entries SET value = ?", (pickle.dumps({"rows": []}),))
+    assert store.get("result", "k") is None
+
+    store.put("result", "unshareable", object(), 60)
+    assert store.get("result", "unshareable") is None
+
+    exposed = tmp_path / "exposed.sqlite3"
+    exposed.touch()
+    exposed.chmod(0o644)
+    with pytest.raises(PermissionError):
+        SharedStore(exposed)
+
+
+def _app():
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        body = json.dumps({"pid": os.getpid(), "snapshot": _PREPARED.get("snapshot")}).encode()
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+    return app
+
+
+def test_workers_inherit_the_context_prepared_by_the_parent(tmp_path):
+    prepared = []
+
+    def prepare():
+        prepared.append(os.getpid())
+        _PREPARED["snapshot"] = "abc123"
+
+    sock = serve_module.bind_socket("127.0.0.1", 0)
+    port = sock.getsockname()[1]
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=serve_module.serve,
+        kwargs=dict(
+            app_factory=_app,
+            workers=2,
+            prepare=prepare,
+            shared_cache_path=tmp_path / "shared.sqlite3",
+            log_level="warning",
+            stop_event=stop,
+            sock=sock,
+        ),
+    )
+    thread.start()
+    try:
+        responses = []
+        deadline = time.time() + 15
+        while len(responses) < 4 and time.time() < deadline:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=2) as response:
+                    responses.append(json.loads(response.read()))
+            except OSError:
+                time.sleep(0.1)
+    finally:
+        stop.set()
+        thread.join(15)
+        set_shared_store(None)
+
+    assert prepared == [os.getpid()]
+    assert len(responses) == 4
+    assert all(entry["snapshot"] == "abc123" and entry["pid"] != os.getpid() for entry in responses)
+    assert not thread.is_alive()
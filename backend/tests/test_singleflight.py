@@ -0,0 +1,93 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from benchmarks.fake_bigquery import FakeBigQueryClient, make_synthetic_table
+from selecta import custom_tools
+from selecta.singleflight import SingleFlight, normalize_sql_text
+
+
+def test_normalize_sql_text_ignores_comments_and_whitespace_but_not_literals():
+    first = "SELECT  a -- note\n FROM `p.d.t`\nWHERE b = 'x  y' ;"
+    second = "/* generated */ SELECT a FROM `p.d.t` WHERE b = 'x  y'"
+    assert normalize_sql_text(first) == normalize_sql_text(second) == "SELECT a FROM `p.d.t` WHERE b = 'x  y'"
+    assert normalize_sql_text("SELECT 'x y'") != normalize_sql_text("SELECT 'x  y'")
+
+
+def test_single_flight_shares_result_and_errors():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return "rows"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(3)]
+    threads[0].start()
+    while flight.in_flight() == 0:
+        pass
+    for thread in threads[1:]:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [1]
+    assert sorted(shared for _, shared in results) == [False, True, True]
+    assert {value for value, _ in results} == {"rows"}
+    assert flight.in_flight() == 0
+
+    with pytest.raises(ValueError):
+        flight.do("k", lambda: (_ for _ in ()).throw(ValueError("boom")))
+
+
+def test_async_callers_join_a_query_led_by_a_thread():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return "rows"
+
+    async def main():
+        leader = asyncio.create_task(asyncio.to_thread(flight.do, "k", slow))
+        while flight.in_flight() == 0:
+            await asyncio.sleep(0.01)
+        followers = [asyncio.create_task(flight.do_async("k", slow)) for _ in range(2)]
+        asyncio.get_running_loop().call_later(0.05, release.set)
+        return await asyncio.gather(leader, *followers)
+
+    assert asyncio.run(main()) == [("rows", False), ("rows", True), ("rows", True)]
+    assert calls == [1]
+    assert asyncio.run(flight.do_async("k", lambda: "again")) == ("again", False)
+    assert flight.in_flight() == 0
+
+
+def test_concurrent_identical_queries_share_one_job_with_distinct_results():
+    client = FakeBigQueryClient(table=make_synthetic_table(num_rows=2, width=2), wait_latency_s=0.2)
+    contexts = [SimpleNamespace(state={}, user_id=f"u{i}", session=SimpleNamespace(id=f"s{i}")) for i in range(2)]
+
+    async def main():
+        return await asyncio.gather(
+            asyncio.to_thread(custom_tools.execute_bigquery_query, "SELECT 1", contexts[0]),
+            asyncio.to_thread(custom_tools.execute_bigquery_query, "SELECT   1 ;", contexts[1]),
+        )
+
+    with mock.patch.object(custom_tools.bigquery, "Client", client):
+        first, second = asyncio.run(main())
+
+    assert len(client.queries) == 1
+    assert first == second
+    results = [context.state["latest_result"] for context in contexts]
+    assert results[0]["id"] != results[1]["id"]
+    assert results[0]["jobId"] == results[1]["jobId"]
+    assert sorted(result["coalesced"] for result in results) == [False, True]
+    assert all(len(context.state["results_history"]) == 1 for context in contexts)
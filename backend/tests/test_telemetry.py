@@ -0,0 +1,80 @@
+from unittest import mock
+
+import pytest
+
+from benchmarks.fake_bigquery import FakeBigQueryClient, make_synthetic_table
+from selecta import custom_tools, telemetry
+from selecta.telemetry import STAGE_LATENCY_METRIC, Histogram, MetricsRegistry
+
+
+class _ToolContext:
+    def __init__(self):
+        self.state = {}
+
+
+@pytest.fixture(autouse=True)
+def _reset_registry():
+    telemetry.get_registry().reset()
+    yield
+    telemetry.get_registry().reset()
+
+
+def test_histogram_quantiles_interpolate_within_buckets():
+    histogram = Histogram(buckets=(10, 100))
+    for value in [5] * 90 + [50] * 10:
+        histogram.observe(value)
+    assert histogram.quantile(0.5) == pytest.approx(10 * 50 / 90)
+    assert 10 < histogram.quantile(0.99) <= 100
+
+
+def test_render_text_uses_prometheus_exposition_format():
+    registry = MetricsRegistry()
+    registry.describe("latency_ms", "Latency.")
+    registry.observe("latency_ms", 3, buckets=(1, 5), stage="job_wait")
+    registry.increment("queries_total", outcome="ok")
+    text = registry.render_text()
+    assert "# TYPE queries_total counter\nqueries_total{outcome=\"ok\"} 1" in text
+    assert "# HELP latency_ms Latency." in text
+    assert 'latency_ms_bucket{stage="job_wait",le="1"} 0' in text
+    assert 'latency_ms_bucket{stage="job_wait",le="5"} 1' in text
+    assert 'latency_ms_bucket{stage="job_wait",le="+Inf"} 1' in text
+    assert 'latency_ms_count{stage="job_wait"} 1' in text
+
+
+def test_stage_emits_span_through_tracer_hook():
+    tracer = mock.MagicMock()
+    telemetry.set_tracer(tracer)
+    try:
+        with pytest.raises(ValueError):
+            with telemetry.stage("sql_validation") as attributes:
+                attributes["rows"] = 3
+                raise ValueError("bad sql")
+    finally:
+        telemetry.set_tracer(None)
+
+    tracer.start_as_current_span.assert_called_once_with("selecta.sql_validation")
+    span = tracer.start_as_current_span.return_value.__enter__.return_value
+    span.set_attribute.assert_called_with("selecta.rows", 3)
+    span.record_exception.assert_called_once()
+    histogram = telemetry.get_registry().histogram(STAGE_LATENCY_METRIC, stage="sql_validation", outcome="error")
+    assert histogram.count == 1
+
+
+def test_execute_bigquery_query_records_each_stage():
+    client = FakeBigQueryClient(table=make_synthetic_table(num_rows=3))
+    with mock.patch.object(custom_tools.bigquery, "Client", client):
+        custom_tools.execute_bigquery_query("SELECT 1", tool_context=_ToolContext())
+
+    stages = {
+        dict(entry["labels"])["stage"]
+        for entry in telemetry.get_registry().snapshot()["histograms"][STAGE_LATENCY_METRIC]
+    }
+    assert {
+        "sql_validation",
+        "job_submit",
+        "job_wait",
+        "row_fetch",
+        "normalization",
+        "chart_build",
+        "state_write",
+    } <= stages
@@ -0,0 +1,86 @@
+from unittest import mock
+
+import pytest
+
+from benchmarks.fake_bigquery import FakeBigQueryClient, make_synthetic_table
+from selecta import custom_tools
+from selecta.result_store import ResultStore
+from selecta.transform import TransformError, load_result_table, transform_table
+
+
+class _ToolContext:
+    def __init__(self, rows):
+        self.state = {
+            "latest_result": {"id": "src", "sql": "SELECT 1", "rows": rows, "columns": list(rows[0]), "rowCount": len(rows)},
+            "results_history": [],
+        }
+
+
+ROWS = [
+    {"month": "2024-01", "category": "A", "revenue": 10.0},
+    {"month": "2024-01", "category": "B", "revenue": 5.0},
+    {"month": "2024-02", "category": "A", "revenue": 7.0},
+    {"month": "2024-02", "category": "B", "revenue": 12.0},
+    {"month": "2024-02", "category": "B", "revenue": 1.0},
+]
+
+
+def test_transform_table_filters_groups_pivots_sorts_and_limits():
+    table = load_result_table({"rows": ROWS, "rowCount": len(ROWS)})
+
+    grouped = transform_table(
+        table,
+        filters=[{"column": "revenue", "op": ">", "value": 6}],
+        group_by=["category"],
+        aggregations=[{"column": "revenue", "function": "sum", "alias": "total"}, {"function": "count"}],
+        sort_by="total",
+        descending=True,
+        limit=1,
+    )
+    assert grouped.to_pylist() == [{"category": "A", "total": 17.0, "count": 2}]
+
+    pivoted = transform_table(table, pivot={"index": "month", "columns": "category", "values": "revenue"}, sort_by="month")
+    assert pivoted.to_pylist() == [
+        {"month": "2024-01", "A": 10.0, "B": 5.0},
+        {"month": "2024-02", "A": 7.0, "B": 13.0},
+    ]
+
+    with pytest.raises(TransformError, match="Unknown column"):
+        transform_table(table, sort_by="profit")
+    with pytest.raises(TransformError, match="preview"):
+        load_result_table({"rows": ROWS[:2], "rowCount": 5})
+
+
+def test_transform_result_publishes_a_linked_result_without_a_query():
+    client = FakeBigQueryClient(table=make_synthetic_table(num_rows=1))
+    context = _ToolContext(ROWS)
+    with mock.patch.object(custom_tools.bigquery, "Client", client):
+        rows = custom_tools.transform_result(sort_by="revenue", descending=True, limit=3, tool_context=context)
+
+    assert client.queries == []
+    assert [row["revenue"] for row in rows] == [12.0, 10.0, 7.0]
+    result = context.state["latest_result"]
+    assert result["sourceResultId"] == "src"
+    assert result["sql"] is None and result["originalSql"] is None
+    assert result["transform"] == {"sortBy": "revenue", "descending": True, "limit": 3}
+    assert result["executionBackend"] == "arrow"
+    assert result["chart"] is not None
+    assert context.state["results_history"][-1]["id"] == result["id"]
+
+
+def test_transform_result_reads_spilled_results(tmp_path):
+    store = ResultStore(directory=tmp_path, threshold_rows=2)
+    store.spill("big", ROWS)
+    context = _ToolContext(ROWS[:2])
+    context.state["latest_result"].update(id="big", rowCount=len(ROWS), spilled=True)
+    with mock.patch.object(custom_tools, "get_result_store", return_value=store), mock.patch(
+        "selecta.transform.get_result_store", return_value=store
+    ):
+        rows = custom_tools.transform_result(
+            filters=[{"column": "category", "op": "==", "value": "B"}],
+            group_by=["category"],
+            aggregations=[{"column": "revenue", "function": "max"}],
+            tool_context=context,
+        )
+
+    assert rows == [{"category": "B", "max_revenue": 12.0}]
@@ -0,0 +1,102 @@
+import json
+from types import SimpleNamespace
+from unittest import mock
+
+from benchmarks.fake_bigquery import FakeBigQueryClient, make_synthetic_table
+from selecta import custom_tools, workload
+from selecta.config_loader import SummaryTable
+from selecta.cost_lint import lint_query
+from selecta.workload import QueryLog, analyze_workload, propose_materialization, read_query_log, route_to_summary
+
+REVENUE = "SELECT status, SUM(sale_price) AS revenue FROM `data.shop.orders` WHERE country = '{}' GROUP BY status"
+LATEST = "SELECT id, created_at FROM `data.shop.orders` ORDER BY created_at DESC LIMIT 10"
+
+
+def _entry(sql, bytes_processed, execution_ms, cache_hit=False):
+    return {
+        "sql": sql,
+        "billingProjectId": "billing",
+        "projectId": "data",
+        "dataset": "shop",
+        "bytesProcessed": bytes_processed,
+        "executionMs": execution_ms,
+        "cacheHit": cache_hit,
+    }
+
+
+def test_analyzer_clusters_literal_variants_and_ranks_by_cost():
+    entries = (
+        [_entry(REVENUE.format("DE"), 10_000_000, 2_000)] * 3
+        + [_entry(REVENUE.format("FR").replace("SUM", "sum"), 10_000_000, 2_000)]
+        + [_entry(REVENUE.format("DE"), 10_000_000, 5, cache_hit=True)]
+        + [_entry(LATEST, 50_000, 300)] * 8
+        + [_entry("SELECT 1", 0, 10)]
+    )
+
+    clusters = analyze_workload(entries, top=5, min_runs=2)
+
+    assert [cluster.runs for cluster in clusters] == [5, 8]
+    revenue = clusters[0]
+    assert (revenue.variants, revenue.cached_runs) == (2, 1)
+    assert revenue.mean_latency_ms == 2_000
+    assert revenue.sql == REVENUE.format("DE")
+    assert revenue.proposal.kind == "materialized_view"
+    assert revenue.proposal.table.startswith("billing.selecta_summaries.summary_")
+    assert revenue.proposal.ddl.endswith(REVENUE.format("DE"))
+    assert "2 variants" in revenue.proposal.notes[-1]
+
+    latest = clusters[1]
+    assert latest.proposal.kind == "summary_table"
+    assert "ORDER BY" not in latest.proposal.ddl
+    assert any("GROUP BY" in note for note in latest.proposal.notes)
+
+
+def test_materialized_view_blockers_fall_back_to_a_summary_table():
+    blocked = {
+        "SELECT user_id, COUNT(DISTINCT id) FROM orders GROUP BY user_id": "COUNT(DISTINCT",
+        "SELECT u.country, SUM(o.total) FROM orders o JOIN users u ON u.id = o.user_id GROUP BY 1": "more than one table",
+        "SELECT status, COUNT(*) FROM orders WHERE created_at > CURRENT_DATE() GROUP BY status": "CURRENT_DATE",
+        "SELECT status, ARRAY_AGG(id) FROM orders GROUP BY status": "ARRAY_AGG",
+    }
+    for sql, reason in blocked.items():
+        proposal = propose_materialization(sql, "p.d.t")
+        assert proposal.kind == "summary_table", sql
+        assert any(reason in note for note in proposal.notes), (sql, proposal.notes)
+        assert proposal.ddl.startswith("CREATE OR REPLACE TABLE `p.d.t` AS")
+
+
+def test_matching_queries_are_routed_to_a_summary_table(dataset_config):
+    settings = dataset_config().bigquery
+    summary = SummaryTable(table="summaries.revenue_de", sql=REVENUE.format("DE") + " ORDER BY status")
+
+    routed = route_to_summary(
+        "select status, sum(sale_price) as revenue from shop.orders where country = 'DE' group by status "
+        "order by revenue desc limit 5;",
+        [summary],
+        settings,
+    )
+    assert routed == (summary, "SELECT * FROM `billing.summaries.revenue_de`\norder by revenue desc limit 5")
+    assert route_to_summary(REVENUE.format("FR"), [summary], settings) is None
+    assert route_to_summary(REVENUE.format("DE") + " ORDER BY SUM(sale_price)", [summary], settings) is None
+
+    result = lint_query(REVENUE.format("DE"), {}, mode="warn", auto_limit_rows=0, settings=settings, summary_tables=[summary])
+    assert result.sql == "SELECT * FROM `billing.summaries.revenue_de`"
+    assert result.rewrites[0]["rule"] == "summary_table"
+
+
+def test_published_queries_are_appended_to_the_query_log(tmp_path, dataset_config):
+    dataset_config()
+    client = FakeBigQueryClient(table=make_synthetic_table(num_rows=4))
+    log = QueryLog(tmp_path / "queries.jsonl")
+    with mock.patch.object(custom_tools.bigquery, "Client", client), mock.patch.object(
+        workload, "_QUERY_LOG", log
+    ):
+        for _ in range(2):
+            custom_tools.execute_bigquery_query(LATEST, tool_context=SimpleNamespace(state={}))
+
+    entries = list(read_query_log(log.path))
+    assert [entry["cacheHit"] for entry in entries] == [False, True]
+    assert entries[0]["sql"] == LATEST
+    assert entries[0]["bytesProcessed"] == next(iter(client.jobs.values())).total_bytes_processed
+    assert json.loads(log.path.read_text().splitlines()[1])["rowCount"] == 4
+    assert analyze_workload(entries)[0].runs == 2